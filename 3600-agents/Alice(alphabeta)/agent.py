@@ -0,0 +1,258 @@
+import time
+from collections.abc import Callable
+from typing import List, Tuple
+
+from game.board import Board
+from game.enums import DECODED_MOVES, MoveType, Result
+from game.trapdoor_manager import TrapdoorBelief
+from game.ttable import Bound, TranspositionTable
+
+"""
+Alice searches: iterative deepening negamax alpha-beta over push_move/pop_move,
+with a transposition table and killer moves for move ordering. She splits her
+remaining time evenly over her remaining turns and prints how many nodes she
+searched per second, so she is both a strength baseline and a benchmark of the
+engine's search primitives.
+
+Trapdoors are not searched over. Instead, the evaluation charges each chicken
+the trapdoor penalty times the probability, from a TrapdoorBelief, that it is
+standing on one.
+"""
+
+WIN_SCORE = 10000.0
+MAX_PLY = 128
+
+# the clock is checked every this many nodes, which must be a power of two
+CHECK_EVERY = 1024
+
+# seconds kept back on every move for the engine's overhead
+SAFETY_MARGIN = 0.05
+
+# a new iteration is not started after this fraction of the move's budget,
+# since it would most likely not finish
+START_FRACTION = 0.4
+
+MOBILITY_WEIGHT = 0.05
+
+# order of the moves with no other information, by move type
+MOVE_TYPE_ORDER = {MoveType.EGG: 0, MoveType.TURD: 1, MoveType.PLAIN: 2}
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class PlayerAgent:
+    """
+    /you may add functions, however, __init__ and play are the entry points for
+    your program and should not be changed.
+    """
+
+    def __init__(self, board: Board, time_left: Callable):
+        game_map = board.game_map
+        self.dim = game_map.MAP_SIZE
+        self.trapdoor_penalty = -game_map.TRAPDOOR_PENALTY
+        self.table = TranspositionTable(64)
+        self.belief = TrapdoorBelief(game_map)
+        self.risk = [0.0] * (self.dim * self.dim)
+        self.killers = [[-1, -1] for _ in range(MAX_PLY)]
+        self.nodes = 0
+        self.deadline = 0.0
+        self.best_move = -1
+        self.total_nodes = 0
+        self.total_time = 0.0
+
+    def play(
+        self,
+        board: Board,
+        sensor_data: List[Tuple[bool, bool]],
+        time_left: Callable,
+    ):
+        start = time.perf_counter()
+        moves = board.get_valid_moves_encoded()
+        if not moves:
+            return None
+
+        self.update_belief(board, sensor_data)
+        budget = self.get_budget(board, time_left)
+        self.deadline = start + budget
+        self.table.new_search()
+        self.killers = [[-1, -1] for _ in range(MAX_PLY)]
+        self.nodes = 0
+
+        best_move = moves[0]
+        best_score = 0.0
+        depth = 0
+        # the game ends after both players' remaining turns, so searching deeper is pointless
+        max_depth = min(board.turns_left_player + board.turns_left_enemy, MAX_PLY - 1)
+        while depth < max_depth:
+            if time.perf_counter() - start > budget * START_FRACTION:
+                break
+            self.best_move = -1
+            try:
+                score = self.search(board, depth + 1, -float("inf"), float("inf"), 0)
+            except SearchTimeout:
+                break
+            depth += 1
+            best_score = score
+            if self.best_move >= 0:
+                best_move = self.best_move
+            # the result is decided, deeper searches cannot change it
+            if abs(score) >= WIN_SCORE / 2:
+                break
+
+        elapsed = time.perf_counter() - start
+        self.total_nodes += self.nodes
+        self.total_time += elapsed
+        print(
+            f"Alice: depth {depth}, score {best_score:.2f}, {self.nodes} nodes in {elapsed:.2f}s "
+            f"({self.nodes / max(elapsed, 1e-9):.0f} nodes/s, "
+            f"{self.total_nodes / max(self.total_time, 1e-9):.0f} over the game)"
+        )
+        return DECODED_MOVES[best_move]
+
+    def get_budget(self, board: Board, time_left: Callable) -> float:
+        """
+        Returns the seconds to spend on this move: an even share of the time left
+        over the turns left.
+        """
+        remaining = min(time_left(), board.player_time) - SAFETY_MARGIN
+        return max(0.0, remaining / max(board.turns_left_player, 1))
+
+    def update_belief(self, board: Board, sensor_data: List[Tuple[bool, bool]]):
+        belief = self.belief
+        belief.update(board.chicken_player.get_location(), sensor_data)
+        for loc in board.found_trapdoors:
+            belief.set_found(loc)
+        # a chicken has stood on every cell with a chicken, egg or turd on it
+        safe = (
+            board.eggs_player_bb
+            | board.eggs_enemy_bb
+            | board.turds_player_bb
+            | board.turds_enemy_bb
+        ) & ~board.found_trapdoors_bb
+        safe |= board.loc_bit(board.chicken_player.get_location())
+        safe |= board.loc_bit(board.chicken_enemy.get_location())
+        for index in range(self.dim * self.dim):
+            x, y = index % self.dim, index // self.dim
+            if (safe >> index) & 1 and belief.posteriors[(x + y) % 2, x, y] > 0:
+                belief.mark_safe((x, y))
+
+        # indexed like the bitboards, by y * dim + x
+        posterior = belief.posteriors.sum(axis=0).T.flatten()
+        self.risk = (posterior * self.trapdoor_penalty).tolist()
+        for loc in board.found_trapdoors:
+            self.risk[loc[1] * self.dim + loc[0]] = 0.0
+
+    def evaluate(self, board: Board) -> float:
+        """
+        Scores a position for the player to move: the egg difference, less the
+        expected trapdoor penalty of each chicken, plus a little mobility.
+        """
+        player = board.chicken_player.state
+        enemy = board.chicken_enemy.state
+        (x, y) = player[0]
+        (enemy_x, enemy_y) = enemy[0]
+        dim = self.dim
+        risk = self.risk
+        return (
+            player[3]
+            - enemy[3]
+            - risk[y * dim + x]
+            + risk[enemy_y * dim + enemy_x]
+            + MOBILITY_WEIGHT
+            * (
+                len(board.get_valid_moves_encoded())
+                - len(board.get_valid_moves_encoded(enemy=True))
+            )
+        )
+
+    def terminal_score(self, board: Board, ply: int) -> float:
+        # the winner is relative to the player who made the last move, not the player to move
+        margin = board.chicken_player.state[3] - board.chicken_enemy.state[3]
+        if board.winner == Result.TIE:
+            return 0.0
+        if board.winner == Result.PLAYER:
+            return -WIN_SCORE + ply + margin
+        return WIN_SCORE - ply + margin
+
+    def order_moves(self, moves: List[int], tt_move: int, ply: int) -> List[int]:
+        killers = self.killers[ply]
+        first = []
+        rest = []
+        for code in moves:
+            if code == tt_move:
+                first.insert(0, code)
+            elif code == killers[0] or code == killers[1]:
+                first.append(code)
+            else:
+                rest.append(code)
+        rest.sort(key=lambda code: MOVE_TYPE_ORDER[code % 3])
+        return first + rest
+
+    def search(
+        self, board: Board, depth: int, alpha: float, beta: float, ply: int
+    ) -> float:
+        """
+        Negamax alpha-beta search, scored for the player to move.
+        At the root the best move is left in best_move.
+        """
+        self.nodes += 1
+        if not self.nodes & (CHECK_EVERY - 1) and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+
+        if board.winner is not None:
+            return self.terminal_score(board, ply)
+        if depth == 0:
+            return self.evaluate(board)
+
+        key = board.get_hash()
+        tt_move = -1
+        entry = self.table.probe(key)
+        if entry is not None:
+            entry_depth, bound, score, tt_move = entry
+            if entry_depth >= depth and ply > 0:
+                if bound == Bound.EXACT:
+                    return score
+                if bound == Bound.LOWER and score >= beta:
+                    return score
+                if bound == Bound.UPPER and score <= alpha:
+                    return score
+
+        moves = board.get_valid_moves_encoded()
+        if not moves:
+            return self.evaluate(board)
+
+        original_alpha = alpha
+        best_score = -float("inf")
+        best_move = -1
+        for code in self.order_moves(moves, tt_move, ply):
+            dir, move_type = DECODED_MOVES[code]
+            undo = board.push_move(dir, move_type, check_ok=False, reverse=True)
+            try:
+                score = -self.search(board, depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                board.pop_move(undo)
+
+            if score > best_score:
+                best_score = score
+                best_move = code
+                if score > alpha:
+                    alpha = score
+                    if ply == 0:
+                        self.best_move = code
+                    if alpha >= beta:
+                        killers = self.killers[ply]
+                        if code != killers[0]:
+                            killers[1] = killers[0]
+                            killers[0] = code
+                        break
+
+        if best_score <= original_alpha:
+            bound = Bound.UPPER
+        elif best_score >= beta:
+            bound = Bound.LOWER
+        else:
+            bound = Bound.EXACT
+        self.table.store(key, depth, bound, best_score, best_move)
+        return best_score
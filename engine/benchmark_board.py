@@ -0,0 +1,170 @@
+import sys
+import time
+import tracemalloc
+
+from game.board import COMPILED, COPIED_STATE, Board
+from game.game_map import GameMap
+
+
+class AttributeChicken:
+    """
+    A dict-backed chicken, as Chicken was before it packed its state.
+    """
+
+    def __init__(self, max_turds=0, copy=False):
+        if not copy:
+            self.turds_left = max_turds
+            self.eggs_laid = 0
+
+    def get_copy(self):
+        new_chicken = AttributeChicken(copy=True)
+        new_chicken.even_chicken = self.even_chicken
+        new_chicken.eggs_laid = self.eggs_laid
+        new_chicken.turds_left = self.turds_left
+        new_chicken.loc = self.loc
+        new_chicken.spawn = self.spawn
+        return new_chicken
+
+
+class AttributeBoard:
+    """
+    The bitboard Board's state without __slots__, copied the way Board.get_copy
+    did before Board used __slots__: through __init__, then one attribute at a
+    time. It only holds state, so it can be copied but not played on.
+    """
+
+    def __init__(self, game_map, build_history=False, copy=False):
+        self.game_map = game_map
+
+    @classmethod
+    def from_board(cls, board):
+        attribute_board = cls(board.game_map, copy=True)
+        for name in COPIED_STATE:
+            setattr(attribute_board, name, getattr(board, name))
+        for name in ("chicken_player", "chicken_enemy"):
+            chicken = getattr(board, name)
+            attribute_chicken = AttributeChicken(copy=True)
+            for field in ("loc", "spawn", "even_chicken", "eggs_laid", "turds_left"):
+                setattr(attribute_chicken, field, getattr(chicken, field))
+            setattr(attribute_board, name, attribute_chicken)
+        attribute_board.build_history = False
+        return attribute_board
+
+    def get_copy(self, build_history=False):
+        board_copy = AttributeBoard(self.game_map, build_history=build_history, copy=True)
+
+        board_copy.eggs_player_bb = self.eggs_player_bb
+        board_copy.eggs_enemy_bb = self.eggs_enemy_bb
+        board_copy.turds_player_bb = self.turds_player_bb
+        board_copy.turds_enemy_bb = self.turds_enemy_bb
+        board_copy.found_trapdoors_bb = self.found_trapdoors_bb
+        board_copy.is_as_turn = self.is_as_turn
+
+        board_copy.chicken_player = self.chicken_player.get_copy()
+        board_copy.chicken_enemy = self.chicken_enemy.get_copy()
+
+        board_copy.turn_count = self.turn_count
+
+        board_copy.MAX_TURNS = self.MAX_TURNS
+        board_copy.turns_left_player = self.turns_left_player
+        board_copy.turns_left_enemy = self.turns_left_enemy
+
+        board_copy.winner = self.winner
+
+        board_copy.time_to_play = self.time_to_play
+        board_copy.player_time = self.player_time
+        board_copy.enemy_time = self.enemy_time
+        board_copy.win_reason = self.win_reason
+        board_copy.chicken_blocked = self.chicken_blocked
+        board_copy.zobrist_hash = self.zobrist_hash
+
+        board_copy.build_history = build_history
+        if build_history:
+            board_copy.history = self.history
+
+        return board_copy
+
+
+def make_midgame_board(num_moves=20):
+    """
+    Returns a board after num_moves deterministic moves, with eggs and turds on it.
+    """
+    game_map = GameMap()
+    board = Board(game_map, 360)
+    board.chicken_player.start((0, 3), 0)
+    board.chicken_enemy.start((7, 4), 1)
+    for i in range(num_moves):
+        moves = board.get_valid_moves()
+        if not moves or board.is_game_over():
+            break
+        board.apply_move(*moves[(i * 7) % len(moves)])
+        board.reverse_perspective()
+    return board
+
+
+def time_per_call(func, repeats=5, number=20000):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def bytes_per_call(func, number=1000):
+    # keep every result alive so that allocations are not reused
+    results = []
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for _ in range(number):
+        results.append(func())
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / number
+
+
+def main():
+    if len(sys.argv) != 1:
+        print(f"Usage: python3 {sys.argv[0]}")
+        sys.exit(1)
+
+    board = make_midgame_board()
+    move = board.get_valid_moves()[0]
+
+    forecast = lambda: board.forecast_move(*move)
+    baseline_board = AttributeBoard.from_board(board)
+
+    copy_time = time_per_call(board.get_copy)
+    copy_bytes = bytes_per_call(board.get_copy)
+    forecast_time = time_per_call(forecast)
+    forecast_bytes = bytes_per_call(forecast)
+    baseline_copy_time = time_per_call(baseline_board.get_copy)
+    baseline_copy_bytes = bytes_per_call(baseline_board.get_copy)
+    # AttributeBoard cannot apply moves, so its forecast_move is estimated as its
+    # get_copy plus the apply_move of the current board
+    baseline_forecast_time = forecast_time - copy_time + baseline_copy_time
+    baseline_forecast_bytes = forecast_bytes - copy_bytes + baseline_copy_bytes
+
+    print(f"Board compiled with Cython: {COMPILED}")
+    print(f"{'':15s}{'pre-slots':>17s}{'current':>17s}")
+    rows = (
+        ("get_copy", baseline_copy_time, baseline_copy_bytes, copy_time, copy_bytes),
+        (
+            "forecast_move*",
+            baseline_forecast_time,
+            baseline_forecast_bytes,
+            forecast_time,
+            forecast_bytes,
+        ),
+    )
+    for name, base_time, base_bytes, new_time, new_bytes in rows:
+        print(
+            f"{name + ':':15s}{base_time * 1e6:8.2f} us {base_bytes:5.0f} B"
+            f"{new_time * 1e6:8.2f} us {new_bytes:5.0f} B"
+        )
+    print("* pre-slots estimated as its get_copy plus the current apply_move")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 import numpy as np
 from game.board import Board
-from game.enums import Cell, MoveType, WinReason
+from game.enums import Cell, WinReason
 from game.history import History
 
 
@@ -68,52 +68,67 @@ def get_board_string(board: Board, trapdoors=set()):
 
 
 def get_history_dict(board: Board,trapdoors=[],spawns = [[], []], errlog_a="", errlog_b=""):
-    board_hist = board.history
+    return build_history_dict(
+        board.history,
+        trapdoors,
+        spawns,
+        errlog_a,
+        errlog_b,
+        board.time_to_play,
+        board.MAX_TURNS,
+        board.turn_count,
+        board.winner,
+        board.win_reason,
+    )
+
+
+def build_history_dict(
+    board_hist: History,
+    trapdoors,
+    spawns,
+    errlog_a,
+    errlog_b,
+    start_time,
+    start_moves,
+    turn_count,
+    result,
+    reason,
+):
+    """
+    Builds the renderer's view of a game from its history and outcome. Used by
+    get_history_dict for a finished board, and by match_archive for an archived match.
+    """
     history_dict = {
-        "pos": board_hist.pos,
-        "left_behind_enums": board_hist.left_behind_enums,
-        "a_eggs_laid": board_hist.a_eggs_laid,
-        "b_eggs_laid": board_hist.b_eggs_laid,
-        "a_turds_left": board_hist.a_turds_left,
-        "b_turds_left": board_hist.b_turds_left,
-        "a_time_left": board_hist.a_time_left,
-        "b_time_left": board_hist.b_time_left,
-        "a_moves_left": board_hist.a_moves_left,
-        "b_moves_left": board_hist.b_moves_left,
-        "trapdoor_triggered": board_hist.trapdoor_triggered,
+        "seed": board_hist.seed,
+        "pos": board_hist.pos.tolist(),
+        "a_eggs_laid": board_hist.a_eggs_laid.tolist(),
+        "b_eggs_laid": board_hist.b_eggs_laid.tolist(),
+        "a_turds_left": board_hist.a_turds_left.tolist(),
+        "b_turds_left": board_hist.b_turds_left.tolist(),
+        "a_time_left": board_hist.a_time_left.tolist(),
+        "b_time_left": board_hist.b_time_left.tolist(),
+        "a_moves_left": board_hist.a_moves_left.tolist(),
+        "b_moves_left": board_hist.b_moves_left.tolist(),
+        "trapdoor_triggered": board_hist.trapdoor_triggered.tolist(),
+        "memory": board_hist.get_memory_list(),
+        "a_peak_memory": board_hist.a_peak_memory,
+        "b_peak_memory": board_hist.b_peak_memory,
+        "left_behind": board_hist.get_left_behind().tolist(),
     }
 
-    left_behind = []
-    for val in history_dict["left_behind_enums"]:
-        match val:
-            case MoveType.PLAIN:
-                left_behind.append("plain")
-            case MoveType.EGG:
-                left_behind.append("egg")
-            case MoveType.TURD:
-                left_behind.append("turd")
-            case _:
-                left_behind.append("plain")
-    history_dict["left_behind"] = left_behind
-    history_dict.pop("left_behind_enums", None)
-
-    history_dict.pop("map", None)
-
     history_dict["errlog_a"] = errlog_a
     history_dict["errlog_b"] = errlog_b
 
-    history_dict["start_time"] = board.time_to_play
-    history_dict["start_moves"] = board.MAX_TURNS
+    history_dict["start_time"] = start_time
+    history_dict["start_moves"] = start_moves
 
-    history_dict["turn_count"] = board.turn_count
-    history_dict["result"] = board.winner
-    history_dict["reason"] = WinReason(board.win_reason).name
+    history_dict["turn_count"] = turn_count
+    history_dict["result"] = result
+    history_dict["reason"] = WinReason(reason).name
     history_dict["trapdoors"] = trapdoors
 
-    
     history_dict["spawn_a"] = spawns[0]
     history_dict["spawn_b"] = spawns[1]
-    
 
     return history_dict
 
@@ -122,6 +137,13 @@ def get_history_json(board: Board, trapdoors= [], spawns = [], err_a="", err_b="
     """
     Encodes the entire history of the game in a format readable by the renderer.
     """
+    return encode_history_dict(get_history_dict(board, trapdoors, spawns, err_a, err_b))
+
+
+def encode_history_dict(history_dict):
+    """
+    Encodes a dict from get_history_dict or build_history_dict as JSON.
+    """
     import json
 
     class NpEncoder(json.JSONEncoder):
@@ -134,4 +156,4 @@ def get_history_json(board: Board, trapdoors= [], spawns = [], err_a="", err_b="
                 return obj.tolist()
             return super(NpEncoder, self).default(obj)
 
-    return json.dumps(get_history_dict(board, trapdoors, spawns, err_a, err_b), cls=NpEncoder)
+    return json.dumps(history_dict, cls=NpEncoder)
@@ -0,0 +1,53 @@
+import glob
+import os
+import pathlib
+import shutil
+import sys
+
+# Modules that can be compiled with Cython. Their .pxd files declare the typed
+# fields; the .py sources are used unchanged when the extensions are not built.
+EXTENSION_SOURCES = ["game/board.py", "game/chicken.py"]
+
+
+def find_built_extensions(engine_dir):
+    built = []
+    for source in EXTENSION_SOURCES:
+        stem = os.path.join(engine_dir, source[: -len(".py")])
+        built += glob.glob(stem + ".*.so") + glob.glob(stem + ".*.pyd")
+    return built
+
+
+def main():
+    if len(sys.argv) > 2 or (len(sys.argv) == 2 and sys.argv[1] != "--clean"):
+        print(f"Usage: python3 {sys.argv[0]} [--clean]")
+        sys.exit(1)
+
+    engine_dir = pathlib.Path(__file__).parent.resolve()
+
+    if len(sys.argv) == 2:
+        for path in find_built_extensions(engine_dir):
+            os.remove(path)
+            print(f"Removed {path}")
+        for source in EXTENSION_SOURCES:
+            generated = os.path.join(engine_dir, source[: -len(".py")] + ".c")
+            if os.path.exists(generated):
+                os.remove(generated)
+        shutil.rmtree(os.path.join(engine_dir, "build"), ignore_errors=True)
+        return
+
+    try:
+        from Cython.Build.Cythonize import main as cythonize_main
+    except ImportError:
+        print("Cython is not installed, the pure Python modules will be used.")
+        sys.exit(1)
+
+    sources = [os.path.join(engine_dir, source) for source in EXTENSION_SOURCES]
+    # annotations are documentation only, they must not change what the methods accept
+    cythonize_main(["-i", "-3", "-q", "-X", "annotation_typing=False"] + sources)
+
+    for path in find_built_extensions(engine_dir):
+        print(f"Built {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from game.board import Board
+from game.enums import Direction, ResultArbiter, encode_move
+from game.game_map import GameMap
+from game.trapdoor_manager import TrapdoorBelief, TrapdoorManager
+from match_archive import FINISHED, ArchiveReader, get_seed
+
+"""
+Exports the positions of archived matches as a dataset for training value and
+policy networks. Each match is replayed from its seed, which also reproduces the
+sensor readings each player got, so every position is encoded as the mover saw
+it: a (len(PLANES), dim, dim) float32 tensor indexed [plane, y, x], labelled with
+the move played (enums.encode_move) and the outcome for the mover (1 for a win,
+0 for a tie, -1 for a loss).
+
+The dataset is a folder of shards, each a set of .npy files that can be loaded
+with np.load(..., mmap_mode="r") and handed to torch.from_numpy, plus a
+dataset.json listing them. Shards are exported in parallel, one match range per
+task, with each worker writing its own files.
+"""
+
+PLANES = (
+    "own_eggs",
+    "enemy_eggs",
+    "own_turds",
+    "enemy_turds",
+    "own_chicken",
+    "enemy_chicken",
+    # cells where the mover may lay an egg
+    "parity",
+    # cells the mover cannot step onto because of the enemy's turds
+    "turd_zone",
+    # probability of a trapdoor, 1 for found trapdoors
+    "trapdoor_belief",
+)
+
+# the arrays saved for each shard, with their dtypes
+SHARD_ARRAYS = {
+    "planes": np.float32,
+    "moves": np.int8,
+    "outcomes": np.int8,
+    "matches": np.int32,
+    "turns": np.int16,
+}
+
+# the direction of each one-cell step (dx, dy)
+STEP_DIRECTIONS = {
+    (0, -1): Direction.UP,
+    (1, 0): Direction.RIGHT,
+    (0, 1): Direction.DOWN,
+    (-1, 0): Direction.LEFT,
+}
+
+# bitboards of the cells each chicken may lay eggs on, by map size
+_parity_bbs = {}
+
+
+def get_parity_bb(game_map, even_chicken):
+    parity_bbs = _parity_bbs.get(game_map.MAP_SIZE)
+    if parity_bbs is None:
+        parity_bbs = [0, 0]
+        for index, parity in enumerate(game_map.CELL_PARITY):
+            parity_bbs[int(parity)] |= 1 << index
+        _parity_bbs[game_map.MAP_SIZE] = parity_bbs
+    return parity_bbs[even_chicken]
+
+
+def position_bitboards(board):
+    """
+    Returns the bitboards of every plane but trapdoor_belief, in PLANES order,
+    for the board's player to move.
+    """
+    player = board.chicken_player
+    return (
+        board.eggs_player_bb,
+        board.eggs_enemy_bb,
+        board.turds_player_bb,
+        board.turds_enemy_bb,
+        board.loc_bit(player.get_location()),
+        board.loc_bit(board.chicken_enemy.get_location()),
+        get_parity_bb(board.game_map, player.even_chicken),
+        board.turds_enemy_bb | board.get_turd_zone_bb(),
+    )
+
+
+def encode_planes(bitboards, beliefs, dim):
+    """
+    Builds the plane tensors of many positions at once.
+
+    Parameters:
+        bitboards (List[tuple]): The position_bitboards of each position.
+        beliefs (np.ndarray): The trapdoor belief of each position, indexed [position, x, y].
+        dim (int): The side length of the map.
+
+    Returns:
+        (np.ndarray): A float32 array of shape (positions, len(PLANES), dim, dim).
+    """
+    count = len(bitboards)
+    bits = np.unpackbits(
+        np.asarray(bitboards, dtype="<u8").view(np.uint8), bitorder="little"
+    ).reshape(count, len(PLANES) - 1, 64)[:, :, : dim * dim]
+    planes = np.empty((count, len(PLANES), dim, dim), dtype=np.float32)
+    planes[:, :-1] = bits.reshape(count, len(PLANES) - 1, dim, dim)
+    # beliefs are indexed [x, y] like the rest of TrapdoorBelief
+    planes[:, -1] = np.swapaxes(beliefs, 1, 2)
+    return planes
+
+
+def encode_position(board, belief):
+    """
+    Encodes a position as in the dataset, e.g. for an agent evaluating a trained network.
+
+    Parameters:
+        board (Board): The board, from the perspective of the player to move.
+        belief (TrapdoorBelief): The player to move's belief about the trapdoors.
+
+    Returns:
+        (np.ndarray): A float32 array of shape (len(PLANES), dim, dim), indexed [plane, y, x].
+    """
+    return encode_planes(
+        [position_bitboards(board)],
+        belief.posteriors.sum(axis=0)[None],
+        board.game_map.MAP_SIZE,
+    )[0]
+
+
+def replay_match(record, game_map):
+    """
+    Replays an archived match from its seed, checking each turn against the archive.
+
+    Parameters:
+        record (np.void): The match's record, as read by match_archive.load_records.
+        game_map (GameMap): The map to play on.
+
+    Yields:
+        (Tuple[Board, TrapdoorBelief, int]): Before each move, the board from the
+        mover's perspective, the mover's belief about the trapdoors and the move played,
+        encoded as in enums.encode_move. Both are updated in place once the next item is requested.
+
+    Raises:
+        ValueError: If the replay does not match the archive.
+    """
+    trapdoor_manager = TrapdoorManager(game_map, get_seed(record))
+    spawns = trapdoor_manager.choose_spawns()
+    trapdoors = trapdoor_manager.choose_trapdoors()
+    if spawns != [tuple(record["spawn_a"].tolist()), tuple(record["spawn_b"].tolist())] or trapdoors != [
+        tuple(trapdoor) for trapdoor in record["trapdoors"].tolist()
+    ]:
+        raise ValueError("The match's seed does not reproduce its spawns and trapdoors")
+
+    board = Board(game_map, float(record["start_time"]))
+    board.MAX_TURNS = board.turns_left_player = board.turns_left_enemy = int(
+        record["start_moves"]
+    )
+    board.chicken_player.start(spawns[0], 0)
+    board.chicken_enemy.start(spawns[1], 1)
+    beliefs = [TrapdoorBelief(game_map), TrapdoorBelief(game_map)]
+
+    rows = record["rows"]
+    positions = rows["pos"].tolist()
+    move_types = rows["left_behind_enums"].tolist()
+    triggered_turns = rows["trapdoor_triggered"].tolist()
+    for turn in range(int(record["turns"])):
+        is_a = turn % 2 == 0
+        belief = beliefs[0 if is_a else 1]
+        loc = board.chicken_player.get_location()
+        belief.update(loc, trapdoor_manager.sample_trapdoors(loc))
+
+        new_loc = tuple(positions[turn])
+        dir = STEP_DIRECTIONS.get((new_loc[0] - loc[0], new_loc[1] - loc[1]))
+        if dir is None:
+            raise ValueError(f"Turn {turn} is not a step from {loc} to {new_loc}")
+        move_type = move_types[turn]
+        yield board, belief, encode_move(dir, move_type)
+
+        time_left = float(rows["a_time_left" if is_a else "b_time_left"][turn])
+        if not board.apply_move(dir, move_type, timer=board.player_time - time_left):
+            raise ValueError(f"Turn {turn} is not a valid move")
+        eggs_laid = board.chicken_player.get_eggs_laid()
+        if eggs_laid != rows["a_eggs_laid" if is_a else "b_eggs_laid"][turn]:
+            raise ValueError(f"Turn {turn} lays {eggs_laid} eggs in the replay")
+
+        triggered = trapdoor_manager.is_trapdoor(new_loc)
+        if triggered != bool(triggered_turns[turn]):
+            raise ValueError(f"Turn {turn} triggers a trapdoor only in the replay or only in the archive")
+        if triggered:
+            board.apply_trapdoor(new_loc)
+        for player_belief in beliefs:
+            if triggered:
+                player_belief.set_found(new_loc)
+            else:
+                player_belief.mark_safe(new_loc)
+
+        if not board.is_game_over():
+            board.reverse_perspective()
+
+
+def export_shard(archive_path, indices, shard_prefix):
+    """
+    Exports the positions of some matches of an archive to one shard. Runs in a worker process.
+
+    Parameters:
+        archive_path (str): The archive.
+        indices (List[int]): The records of the matches to export.
+        shard_prefix (str): The path of the shard's files, without the array name and .npy.
+
+    Returns:
+        (dict): The shard's entry in dataset.json, with the matches that could not be replayed under "skipped".
+    """
+    game_map = GameMap()
+    records = ArchiveReader.open(archive_path, include_unfinished=True).records
+    dim = game_map.MAP_SIZE
+
+    bitboards = []
+    beliefs = []
+    moves = []
+    outcomes = []
+    matches = []
+    turns = []
+    skipped = []
+    for index in indices:
+        record = records[index]
+        result = int(record["result"])
+        if result == ResultArbiter.ERROR:
+            skipped.append(index)
+            continue
+        count = len(moves)
+        try:
+            for turn, (board, belief, move) in enumerate(replay_match(record, game_map)):
+                bitboards.append(position_bitboards(board))
+                beliefs.append(belief.posteriors.sum(axis=0))
+                moves.append(move)
+                if result == ResultArbiter.TIE:
+                    outcomes.append(0)
+                else:
+                    a_won = result == ResultArbiter.PLAYER_A
+                    outcomes.append(1 if a_won == (turn % 2 == 0) else -1)
+                matches.append(index)
+                turns.append(turn)
+        except ValueError:
+            # drop what was exported of the match before it diverged
+            del bitboards[count:], beliefs[count:], moves[count:], outcomes[count:]
+            del matches[count:], turns[count:]
+            skipped.append(index)
+
+    arrays = {
+        "planes": encode_planes(
+            bitboards, np.array(beliefs).reshape(len(beliefs), dim, dim), dim
+        ),
+        "moves": moves,
+        "outcomes": outcomes,
+        "matches": matches,
+        "turns": turns,
+    }
+    for name, dtype in SHARD_ARRAYS.items():
+        np.save(f"{shard_prefix}_{name}.npy", np.asarray(arrays[name], dtype=dtype))
+    return {
+        "archive": archive_path,
+        "prefix": os.path.basename(shard_prefix),
+        "positions": len(moves),
+        "skipped": skipped,
+    }
+
+
+def load_shards(out_dir):
+    """
+    Maps the shards of an exported dataset.
+
+    Parameters:
+        out_dir (str): The dataset's folder.
+
+    Returns:
+        (List[Dict[str, np.ndarray]]): Each shard's arrays, by name, mapped read-only.
+    """
+    with open(os.path.join(out_dir, "dataset.json")) as fp:
+        manifest = json.load(fp)
+    return [
+        {
+            name: np.load(
+                os.path.join(out_dir, f"{shard['prefix']}_{name}.npy"), mmap_mode="r"
+            )
+            for name in SHARD_ARRAYS
+        }
+        for shard in manifest["shards"]
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export the positions of archived matches as a training dataset."
+    )
+    parser.add_argument("out_dir", help="the dataset's folder")
+    parser.add_argument("archives", nargs="+", help="match archives, e.g. matches.bin")
+    parser.add_argument(
+        "--shard-size",
+        type=int,
+        default=250,
+        help="matches per shard, about 80 positions each",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="worker processes, defaults to one per core",
+    )
+    args = parser.parse_args()
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    tasks = []
+    for archive_path in args.archives:
+        archive_path = os.path.abspath(archive_path)
+        reader = ArchiveReader.open(archive_path, include_unfinished=True)
+        indices = np.flatnonzero(reader.records["status"] == FINISHED).tolist()
+        for start in range(0, len(indices), args.shard_size):
+            shard_prefix = os.path.join(args.out_dir, f"shard_{len(tasks):05d}")
+            tasks.append((archive_path, indices[start : start + args.shard_size], shard_prefix))
+    print(f"Exporting {sum(len(task[1]) for task in tasks)} matches to {len(tasks)} shards on {args.workers} workers.")
+
+    start = time.perf_counter()
+    shards = [None] * len(tasks)
+    with ProcessPoolExecutor(args.workers) as pool:
+        futures = {pool.submit(export_shard, *task): i for i, task in enumerate(tasks)}
+        for done, future in enumerate(as_completed(futures), 1):
+            shards[futures[future]] = future.result()
+            print(f"[{done}/{len(tasks)}] {shards[futures[future]]['prefix']}")
+
+    manifest = {
+        "planes": list(PLANES),
+        "map_size": GameMap().MAP_SIZE,
+        "positions": sum(shard["positions"] for shard in shards),
+        "shards": shards,
+    }
+    with open(os.path.join(args.out_dir, "dataset.json"), "w") as fp:
+        json.dump(manifest, fp, indent=1)
+
+    skipped = sum(len(shard["skipped"]) for shard in shards)
+    print(f"{manifest['positions']} positions exported in {time.perf_counter() - start:.1f}s.")
+    if skipped:
+        print(f"{skipped} matches could not be replayed, see dataset.json.")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,9 @@ reverse the perspective of the board - that is, functions will still call as if
 enemy. If you want to call methods for your opponent on the next turn, either use the `enemy` parameter, call
 `Board.reverse_perspective()`, or pass the `reverse` flag into `apply_move` and `forecast_move`.
 
+For search, `push_move` applies a move in place and returns an undo record, and `pop_move` takes that
+record and restores the board, so no copy of the board is made per node.
+
 Finally, remember that coordinates are returned in (x, y) form.
 
 We use A and B rather than Black and White.  Player A goes first and can (eventually) lay an egg at 0,0.
@@ -54,15 +57,34 @@ source code alongside it.
 
 import glob
 import os
+import warnings
+
+folder_path = os.path.dirname(__file__)  # or specify the path directly
+
+# Cython builds of board and chicken (see build_extensions.py) are imported
+# instead of the .py sources, so warn if a source changed after it was built
+for compiled_name in ["board", "chicken"]:
+    source_path = os.path.join(folder_path, compiled_name + ".py")
+    for extension_path in glob.glob(os.path.join(folder_path, compiled_name + ".*.so")):
+        if os.path.getmtime(extension_path) < os.path.getmtime(source_path):
+            warnings.warn(
+                f"{extension_path} is older than {compiled_name}.py, rebuild it with build_extensions.py"
+            )
 
 from . import board, chicken, enums, game_map
 
-folder_path = os.path.dirname(__file__)  # or specify the path directly
 py_files = glob.glob(os.path.join(folder_path, "*.py"))
 
+# Optional modules with heavy dependencies are left out of `from game import *`
+# and have to be imported explicitly, e.g. `from game import fastcore`
+optional_modules = ["fastcore", "batch_board"]
+
 # Extract the file names without the .py extension
 module_names = [
-    os.path.basename(f)[:-3] for f in py_files if os.path.basename(f) != "__init__.py"
+    os.path.basename(f)[:-3]
+    for f in py_files
+    if os.path.basename(f) != "__init__.py"
+    and os.path.basename(f)[:-3] not in optional_modules
 ]
 
 # Set __all__ to the list of module names
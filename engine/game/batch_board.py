@@ -0,0 +1,502 @@
+import numpy as np
+
+from game.board import Board
+from game.chicken import Chicken
+from game.enums import Result, ResultArbiter, WinReason
+from game.game_map import GameMap
+
+"""
+Many games stepped together, for self-play. This module is optional: import it
+explicitly with `from game import batch_board`.
+
+A BatchBoard holds N games as NumPy arrays and follows the rules of Board for
+all of them at once: get_valid_moves returns an (N, 12) mask of the moves
+encoded as dir * 3 + move_type, apply_move applies one move per game and
+check_win returns the winner of every game. Like Board, each game is seen from
+the perspective of the player to move. Fields kept for both players are (N, 2)
+arrays, with column PLAYER for the player to move and ENEMY for the other, so
+reversing the perspective swaps the columns. Eggs and turds are uint64
+bitboards where cell (x, y) is bit y * MAP_SIZE + x, as on Board.
+
+BatchBoard does not keep a Zobrist hash or a history. Use from_boards and
+to_board to convert to and from Board. Run this module to benchmark it.
+"""
+
+PLAYER = 0
+ENEMY = 1
+
+# stored in winner and win_reason while a game is being played
+NONE = -1
+
+# the fields reverse_perspective swaps, each an (N, 2) array
+PAIRED_FIELDS = (
+    "loc",
+    "spawn",
+    "even_chicken",
+    "eggs_laid",
+    "turds_left",
+    "turns_left",
+    "time_left",
+    "eggs_bb",
+    "turds_bb",
+)
+
+# per-cell move tables, by map size
+_tables = {}
+
+
+class MoveTables:
+    """
+    The per-cell tables BatchBoard looks moves up in, indexed by cell.
+    """
+
+    def __init__(self, game_map: GameMap):
+        dim = game_map.MAP_SIZE
+        if dim * dim > 64:
+            raise ValueError(f"A {dim}x{dim} map does not fit in uint64 bitboards")
+        cells = np.arange(dim * dim)
+        self.x = cells % dim
+        self.y = cells // dim
+        self.cell_bits = np.left_shift(np.uint64(1), cells.astype(np.uint64))
+        self.parity = np.array(game_map.CELL_PARITY, dtype=np.int8)
+        self.corner = ((self.x == 0) | (self.x == dim - 1)) & (
+            (self.y == 0) | (self.y == dim - 1)
+        )
+
+        # indexed [cell, dir], -1 and 0 for neighbours off the board
+        self.neighbours = np.full((dim * dim, 4), NONE, dtype=np.int64)
+        self.neighbour_bits = np.zeros((dim * dim, 4), dtype=np.uint64)
+        self.neighbour_adjacent = np.zeros((dim * dim, 4), dtype=np.uint64)
+        for cell in range(dim * dim):
+            for code, new_bit, new_adjacent in game_map.NEIGHBOURS[cell]:
+                dir = code // 3
+                self.neighbours[cell, dir] = new_bit.bit_length() - 1
+                self.neighbour_bits[cell, dir] = new_bit
+                self.neighbour_adjacent[cell, dir] = new_adjacent
+
+
+def get_tables(game_map: GameMap) -> MoveTables:
+    tables = _tables.get(game_map.MAP_SIZE)
+    if tables is None:
+        tables = MoveTables(game_map)
+        _tables[game_map.MAP_SIZE] = tables
+    return tables
+
+
+class BatchBoard:
+    """
+    BatchBoard is N games stored as NumPy arrays and stepped together.
+    See the module documentation for the layout.
+
+    Methods that take games accept anything that indexes the first axis, such as a
+    boolean mask or an array of indices, and default to every game.
+    """
+
+    def __init__(self, game_map: GameMap, size: int, time_to_play: float = 20):
+        """
+        Creates size games as Board would, with neither chicken started.
+
+        Parameters:
+            game_map (game_map.GameMap): The map shared by every game.
+            size (int): The number of games.
+            time_to_play (float, optional): The time limit for each player in seconds. Defaults to 20.
+        """
+        self.game_map = game_map
+        self.tables = get_tables(game_map)
+        self.size = size
+        self.MAX_TURNS = 40
+        self.time_to_play = time_to_play
+
+        self.loc = np.full((size, 2), NONE, dtype=np.int64)
+        self.spawn = np.full((size, 2), NONE, dtype=np.int64)
+        self.even_chicken = np.zeros((size, 2), dtype=np.int8)
+        self.eggs_laid = np.zeros((size, 2), dtype=np.int64)
+        self.turds_left = np.full((size, 2), game_map.MAX_TURDS, dtype=np.int64)
+        self.turns_left = np.full((size, 2), self.MAX_TURNS, dtype=np.int64)
+        self.time_left = np.full((size, 2), float(time_to_play))
+        self.eggs_bb = np.zeros((size, 2), dtype=np.uint64)
+        self.turds_bb = np.zeros((size, 2), dtype=np.uint64)
+
+        self.found_trapdoors_bb = np.zeros(size, dtype=np.uint64)
+        self.turn_count = np.zeros(size, dtype=np.int64)
+        self.winner = np.full(size, NONE, dtype=np.int8)
+        self.win_reason = np.full(size, NONE, dtype=np.int8)
+        self.chicken_blocked = np.zeros(size, dtype=bool)
+        self.is_as_turn = np.ones(size, dtype=bool)
+
+    @classmethod
+    def from_seeds(cls, game_map: GameMap, seeds, time_to_play: float = 20):
+        """
+        Sets up one game per seed, with the spawns and trapdoors TrapdoorManager
+        chooses for that seed in gameplay.setup_game.
+
+        Parameters:
+            game_map (game_map.GameMap): The map shared by every game.
+            seeds (Iterable[int]): The seed of each game.
+            time_to_play (float, optional): The time limit for each player in seconds. Defaults to 20.
+
+        Returns:
+            (Tuple[BatchBoard, np.ndarray]): The games, and the cells of each game's
+            even and odd trapdoors as an (N, 2) array for step.
+        """
+        from game.trapdoor_manager import TrapdoorManager
+
+        seeds = list(seeds)
+        batch = cls(game_map, len(seeds), time_to_play)
+        dim = game_map.MAP_SIZE
+        spawns = np.empty((len(seeds), 2), dtype=np.int64)
+        trapdoors = np.empty((len(seeds), 2), dtype=np.int64)
+        for i, seed in enumerate(seeds):
+            trapdoor_manager = TrapdoorManager(game_map, seed)
+            spawns[i] = [y * dim + x for x, y in trapdoor_manager.choose_spawns()]
+            trapdoors[i] = [y * dim + x for x, y in trapdoor_manager.choose_trapdoors()]
+        batch.start(spawns)
+        return batch, trapdoors
+
+    @classmethod
+    def from_boards(cls, boards):
+        """
+        Copies boards into a BatchBoard. The boards must share a map, time_to_play and MAX_TURNS.
+
+        Parameters:
+            boards (List[Board]): The boards. Both chickens must have been started.
+
+        Returns:
+            (BatchBoard): The games.
+        """
+        game_map = boards[0].game_map
+        dim = game_map.MAP_SIZE
+        batch = cls(game_map, len(boards), boards[0].time_to_play)
+        batch.MAX_TURNS = boards[0].MAX_TURNS
+        for i, board in enumerate(boards):
+            for who, chicken in ((PLAYER, board.chicken_player), (ENEMY, board.chicken_enemy)):
+                (x, y), (spawn_x, spawn_y), even_chicken, eggs_laid, turds_left = chicken.state
+                batch.loc[i, who] = y * dim + x
+                batch.spawn[i, who] = spawn_y * dim + spawn_x
+                batch.even_chicken[i, who] = even_chicken
+                batch.eggs_laid[i, who] = eggs_laid
+                batch.turds_left[i, who] = turds_left
+            batch.turns_left[i] = (board.turns_left_player, board.turns_left_enemy)
+            batch.time_left[i] = (board.player_time, board.enemy_time)
+            batch.eggs_bb[i] = (board.eggs_player_bb, board.eggs_enemy_bb)
+            batch.turds_bb[i] = (board.turds_player_bb, board.turds_enemy_bb)
+            batch.found_trapdoors_bb[i] = board.found_trapdoors_bb
+            batch.turn_count[i] = board.turn_count
+            batch.winner[i] = NONE if board.winner is None else int(board.winner)
+            batch.win_reason[i] = NONE if board.win_reason is None else int(board.win_reason)
+            batch.chicken_blocked[i] = board.chicken_blocked
+            batch.is_as_turn[i] = board.is_as_turn
+        return batch
+
+    def to_board(self, i: int) -> Board:
+        """
+        Copies one game into a Board. The board does not build history.
+
+        Parameters:
+            i (int): The game.
+
+        Returns:
+            (Board): The board.
+        """
+        game_map = self.game_map
+        dim = game_map.MAP_SIZE
+        board = Board(game_map, self.time_to_play)
+        board.MAX_TURNS = self.MAX_TURNS
+
+        chickens = []
+        for who in (PLAYER, ENEMY):
+            loc = int(self.loc[i, who])
+            spawn = int(self.spawn[i, who])
+            chicken = Chicken.__new__(Chicken)
+            chicken.state = (
+                (loc % dim, loc // dim),
+                (spawn % dim, spawn // dim),
+                int(self.even_chicken[i, who]),
+                int(self.eggs_laid[i, who]),
+                int(self.turds_left[i, who]),
+            )
+            chickens.append(chicken)
+        board.chicken_player, board.chicken_enemy = chickens
+
+        board.turns_left_player, board.turns_left_enemy = self.turns_left[i].tolist()
+        board.player_time, board.enemy_time = self.time_left[i].tolist()
+        board.eggs_player_bb, board.eggs_enemy_bb = self.eggs_bb[i].tolist()
+        board.turds_player_bb, board.turds_enemy_bb = self.turds_bb[i].tolist()
+        board.found_trapdoors_bb = int(self.found_trapdoors_bb[i])
+        board.turn_count = int(self.turn_count[i])
+        board.winner = None if self.winner[i] == NONE else Result(int(self.winner[i]))
+        board.win_reason = (
+            None if self.win_reason[i] == NONE else WinReason(int(self.win_reason[i]))
+        )
+        board.chicken_blocked = bool(self.chicken_blocked[i])
+        board.is_as_turn = bool(self.is_as_turn[i])
+        return board
+
+    def start(self, spawns):
+        """
+        Starts both chickens of every game, as Chicken.start does. The player to
+        move is the even chicken.
+
+        Parameters:
+            spawns (np.ndarray): The (N, 2) cells of the even and odd spawns.
+        """
+        self.loc[:] = spawns
+        self.spawn[:] = spawns
+        self.even_chicken[:] = (0, 1)
+
+    def is_game_over(self) -> np.ndarray:
+        """
+        Returns a boolean per game, True for the games that have a winner.
+        """
+        return self.winner != NONE
+
+    def get_valid_moves(self, enemy: bool = False, games=slice(None)) -> np.ndarray:
+        """
+        Returns which moves are valid, as Board.get_valid_moves_encoded does.
+
+        Parameters:
+            enemy (bool, optional): If True, returns valid moves for enemy; if False, returns for player.
+            games (optional): The games to check. Defaults to every game.
+
+        Returns:
+            (np.ndarray): A boolean array of shape (games, 12) indexed [game, dir * 3 + move_type].
+        """
+        tables = self.tables
+        mover = ENEMY if enemy else PLAYER
+        opposing = PLAYER if enemy else ENEMY
+        loc = self.loc[games, mover]
+        opposing_loc = self.loc[games, opposing]
+
+        blocked = self.eggs_bb[games, opposing] | tables.cell_bits[opposing_loc]
+        new_bits = tables.neighbour_bits[loc]
+        can_step = (
+            (new_bits != 0)
+            & (new_bits & blocked[:, None] == 0)
+            & (tables.neighbour_adjacent[loc] & self.turds_bb[games, opposing][:, None] == 0)
+        )
+
+        own_bb = self.eggs_bb[games, mover] | self.turds_bb[games, mover]
+        can_drop = own_bb & tables.cell_bits[loc] == 0
+        can_egg = can_drop & (tables.parity[loc] == self.even_chicken[games, mover])
+        distance = np.abs(tables.x[loc] - tables.x[opposing_loc]) + np.abs(
+            tables.y[loc] - tables.y[opposing_loc]
+        )
+        can_turd = can_drop & (self.turds_left[games, mover] > 0) & (distance >= 2)
+
+        valid = np.empty((len(loc), 4, 3), dtype=bool)
+        valid[:, :, 0] = can_step
+        valid[:, :, 1] = can_step & can_egg[:, None]
+        valid[:, :, 2] = can_step & can_turd[:, None]
+        return valid.reshape(len(loc), 12)
+
+    def apply_move(self, moves, timer=0, check_ok: bool = True) -> np.ndarray:
+        """
+        Applies one move to each game that is not over, as Board.apply_move does.
+
+        Parameters:
+            moves (np.ndarray): The move of each game, encoded as dir * 3 + move_type.
+                Games with a negative move are skipped.
+            timer (float | np.ndarray, optional): Time taken for the move in seconds,
+                for all games or for each game. Defaults to 0.
+            check_ok (bool, optional): If True, invalid moves are not applied; if False,
+                every move must be valid. Defaults to True.
+
+        Returns:
+            (np.ndarray): A boolean per game, True for the games the move was applied to.
+        """
+        moves = np.asarray(moves, dtype=np.int64)
+        applied = (self.winner == NONE) & (moves >= 0)
+        if check_ok:
+            valid = self.get_valid_moves()
+            applied &= valid[np.arange(self.size), np.maximum(moves, 0)]
+        games = np.flatnonzero(applied)
+        if len(games) == 0:
+            return applied
+
+        tables = self.tables
+        dir = moves[games] // 3
+        move_type = moves[games] % 3
+        loc = self.loc[games, PLAYER]
+
+        egg = move_type == 1
+        egg_games = games[egg]
+        self.eggs_laid[egg_games, PLAYER] += np.where(
+            tables.corner[loc[egg]], self.game_map.CORNER_REWARD, 1
+        )
+        self.eggs_bb[egg_games, PLAYER] |= tables.cell_bits[loc[egg]]
+
+        turd = move_type == 2
+        turd_games = games[turd]
+        self.turds_left[turd_games, PLAYER] -= 1
+        self.turds_bb[turd_games, PLAYER] |= tables.cell_bits[loc[turd]]
+
+        self.loc[games, PLAYER] = tables.neighbours[loc, dir]
+        self.end_turn(games, np.broadcast_to(timer, (self.size,))[games])
+        return applied
+
+    def end_turn(self, games, timer):
+        """
+        Ends the turn of some games, as Board.end_turn does.
+
+        Parameters:
+            games (np.ndarray): The indices of the games.
+            timer (np.ndarray): Time taken for each game's move in seconds.
+        """
+        self.turn_count[games] += 1
+        self.turns_left[games, PLAYER] -= 1
+        self.time_left[games, PLAYER] -= timer
+
+        blocked = ~self.get_valid_moves(True, games).any(axis=1) & (
+            self.turns_left[games, ENEMY] > 0
+        )
+        blocked_games = games[blocked]
+        self.eggs_laid[blocked_games, PLAYER] += 2
+        self.chicken_blocked[blocked_games] = True
+
+        self.check_win(games)
+        self.is_as_turn[games] = ~self.is_as_turn[games]
+
+    def check_win(self, games=slice(None), timeout_bounds: float = 0.5) -> np.ndarray:
+        """
+        Checks if games have been won and sets their winners, as Board.check_win does.
+
+        Parameters:
+            games (optional): The games to check. Defaults to every game.
+            timeout_bounds (float, optional): The time threshold in seconds for determining timeout ties. Defaults to 0.5.
+
+        Returns:
+            (np.ndarray): The Result value of each checked game, or NONE if it is not over.
+        """
+        player_time = self.time_left[games, PLAYER]
+        enemy_time = self.time_left[games, ENEMY]
+        player_eggs = self.eggs_laid[games, PLAYER]
+        enemy_eggs = self.eggs_laid[games, ENEMY]
+        by_eggs = np.where(
+            player_eggs < enemy_eggs,
+            Result.ENEMY,
+            np.where(player_eggs > enemy_eggs, Result.PLAYER, Result.TIE),
+        )
+
+        # in the order Board.check_win tests them
+        conditions = [
+            player_time <= 0,
+            enemy_time <= 0,
+            (self.turns_left[games, PLAYER] == 0) & (self.turns_left[games, ENEMY] == 0),
+            self.chicken_blocked[games],
+        ]
+        results = [
+            np.where(enemy_time <= timeout_bounds, Result.TIE, Result.ENEMY),
+            np.where(player_time <= timeout_bounds, Result.TIE, Result.PLAYER),
+            by_eggs,
+            by_eggs,
+        ]
+        reasons = [
+            WinReason.TIMEOUT,
+            WinReason.TIMEOUT,
+            WinReason.EGGS_LAID,
+            WinReason.BLOCKING_END,
+        ]
+        decided = np.logical_or.reduce(conditions)
+        winner = self.winner[games].copy()
+        win_reason = self.win_reason[games].copy()
+        winner[decided] = np.select(conditions, results)[decided]
+        win_reason[decided] = np.select(conditions, reasons)[decided]
+        self.winner[games] = winner
+        self.win_reason[games] = win_reason
+        return winner
+
+    def apply_trapdoor(self, games):
+        """
+        Applies the effects of the player to move stepping on a trapdoor, as
+        Board.apply_trapdoor does: the player is sent back to its spawn, the enemy is
+        awarded the map's TRAPDOOR_PENALTY in eggs and the trapdoor is marked as found.
+
+        Parameters:
+            games: The games whose player stepped on a trapdoor, at its current location.
+        """
+        self.found_trapdoors_bb[games] |= self.tables.cell_bits[self.loc[games, PLAYER]]
+        self.loc[games, PLAYER] = self.spawn[games, PLAYER]
+        self.eggs_laid[games, ENEMY] -= self.game_map.TRAPDOOR_PENALTY
+
+    def reverse_perspective(self, games=slice(None)):
+        """
+        Reverses the perspective of games from player to enemy or vice versa, as
+        Board.reverse_perspective does.
+
+        Parameters:
+            games (optional): The games to reverse. Defaults to every game.
+        """
+        for name in PAIRED_FIELDS:
+            field = getattr(self, name)
+            field[games] = field[games][:, ::-1]
+
+    def step(self, moves, trapdoors, timer=0) -> np.ndarray:
+        """
+        Plays one turn of every game that is not over, following the turn loop of
+        gameplay.play_game: the move is applied, an invalid move loses the game, a
+        player out of time loses the game, a chicken on a trapdoor is sent back to
+        its spawn, and the games that go on are reversed to the next player.
+
+        Parameters:
+            moves (np.ndarray): The move of each game, encoded as dir * 3 + move_type.
+            trapdoors (np.ndarray): The (N, 2) cells of each game's trapdoors, as returned by from_seeds.
+            timer (float | np.ndarray, optional): Time taken for the move in seconds,
+                for all games or for each game. Defaults to 0.
+
+        Returns:
+            (Tuple[np.ndarray, np.ndarray]): A boolean per game for whether its move was
+            applied, and one for whether it triggered a trapdoor.
+        """
+        playing = self.winner == NONE
+        applied = self.apply_move(moves, timer)
+
+        invalid = playing & ~applied
+        self.winner[invalid] = Result.ENEMY
+        self.win_reason[invalid] = WinReason.INVALID_TURN
+        self.is_as_turn[invalid] = ~self.is_as_turn[invalid]
+
+        timed_out = applied & (self.time_left[:, PLAYER] <= 0)
+        self.winner[timed_out] = Result.ENEMY
+        self.win_reason[timed_out] = WinReason.TIMEOUT
+
+        loc = self.loc[:, PLAYER]
+        triggered = playing & ((loc == trapdoors[:, 0]) | (loc == trapdoors[:, 1]))
+        self.apply_trapdoor(triggered)
+
+        self.reverse_perspective(self.winner == NONE)
+        return applied, triggered
+
+    def get_results(self) -> np.ndarray:
+        """
+        Converts the winner of each game into a ResultArbiter value, the same way
+        gameplay.resolve_winner does.
+
+        Returns:
+            (np.ndarray): The ResultArbiter value of each game, or NONE if it is not over.
+        """
+        winner = self.winner
+        # might seem reversed, but the winner is relative to the player to move
+        a_won = np.where(self.is_as_turn, winner == Result.ENEMY, winner == Result.PLAYER)
+        results = np.where(a_won, ResultArbiter.PLAYER_A, ResultArbiter.PLAYER_B)
+        results = np.where(winner == Result.TIE, ResultArbiter.TIE, results)
+        return np.where(winner == NONE, NONE, results).astype(np.int8)
+
+
+if __name__ == "__main__":
+    import time
+
+    game_map = GameMap()
+    for size in (1, 64, 1024):
+        batch, trapdoors = BatchBoard.from_seeds(game_map, range(size), 360)
+        rng = np.random.default_rng(0)
+        steps = 0
+        start = time.perf_counter()
+        while not batch.is_game_over().all():
+            valid = batch.get_valid_moves()
+            # a uniformly random valid move per game, or -1 if it has none
+            scores = np.where(valid, rng.random(valid.shape), -1)
+            moves = np.where(valid.any(axis=1), scores.argmax(axis=1), -1)
+            steps += int((~batch.is_game_over()).sum())
+            batch.step(moves, trapdoors)
+        elapsed = time.perf_counter() - start
+        print(f"{size:5d} games: {steps / elapsed:10.0f} moves/s")
@@ -0,0 +1,232 @@
+from collections.abc import MutableSet
+from typing import Iterable, List, Tuple
+
+from game.enums import Direction, loc_after_direction
+
+"""
+Helpers for the integer bitboards used by Board. Cell (x, y) is stored in
+bit y * MAP_SIZE + x, so an 8x8 map fits in a single 64-bit integer.
+"""
+
+
+def loc_to_index(loc: Tuple[int, int], dim: int) -> int:
+    """
+    Returns the bit index of a location.
+
+    Parameters:
+        loc (Tuple[int, int]): The (x, y) location.
+        dim (int): The side length of the map.
+
+    Returns:
+        (int): The bit index of the location.
+    """
+    return int(loc[1]) * dim + int(loc[0])
+
+
+def index_to_loc(index: int, dim: int) -> Tuple[int, int]:
+    """
+    Returns the (x, y) location of a bit index.
+
+    Parameters:
+        index (int): The bit index.
+        dim (int): The side length of the map.
+
+    Returns:
+        (Tuple[int, int]): The (x, y) location.
+    """
+    return (index % dim, index // dim)
+
+
+def loc_to_bit(loc: Tuple[int, int], dim: int) -> int:
+    """
+    Returns a bitboard with only the given location set.
+
+    Parameters:
+        loc (Tuple[int, int]): The (x, y) location.
+        dim (int): The side length of the map.
+
+    Returns:
+        (int): The single-bit bitboard.
+    """
+    return 1 << loc_to_index(loc, dim)
+
+
+def locs_to_bits(locs: Iterable[Tuple[int, int]], dim: int) -> int:
+    """
+    Packs a collection of locations into a bitboard.
+
+    Parameters:
+        locs (Iterable[Tuple[int, int]]): The (x, y) locations to pack.
+        dim (int): The side length of the map.
+
+    Returns:
+        (int): The bitboard containing every location.
+    """
+    bits = 0
+    for loc in locs:
+        bits |= loc_to_bit(loc, dim)
+    return bits
+
+
+def bits_to_locs(bits: int, dim: int) -> List[Tuple[int, int]]:
+    """
+    Unpacks a bitboard into a list of locations, in increasing bit order.
+
+    Parameters:
+        bits (int): The bitboard to unpack.
+        dim (int): The side length of the map.
+
+    Returns:
+        (List[Tuple[int, int]]): The (x, y) locations set in the bitboard.
+    """
+    locs = []
+    while bits:
+        low = bits & -bits
+        index = low.bit_length() - 1
+        locs.append((index % dim, index // dim))
+        bits ^= low
+    return locs
+
+
+def edge_masks(dim: int) -> Tuple[int, int, int]:
+    """
+    Builds the masks needed to shift bitboards without wrapping around rows.
+
+    Parameters:
+        dim (int): The side length of the map.
+
+    Returns:
+        (Tuple[int, int, int]): The full-board mask, the mask of every cell
+        not in the left column and the mask of every cell not in the right column.
+    """
+    full = (1 << (dim * dim)) - 1
+    left_col = 0
+    for y in range(dim):
+        left_col |= 1 << (y * dim)
+    right_col = left_col << (dim - 1)
+    return full, full & ~left_col, full & ~right_col
+
+
+def build_move_tables(dim: int):
+    """
+    Precomputes the per-cell tables used for move generation.
+
+    Parameters:
+        dim (int): The side length of the map.
+
+    Returns:
+        (Tuple[tuple, tuple, tuple]): Indexed by bit index:
+        the on-board neighbours of each cell as (dir * 3, neighbour bit, neighbour's adjacency mask)
+        tuples in Direction order, the adjacency mask of each cell and the parity of each cell.
+    """
+    adjacent = []
+    parity = []
+    for index in range(dim * dim):
+        x, y = index_to_loc(index, dim)
+        mask = 0
+        for dir in Direction:
+            nx, ny = loc_after_direction((x, y), dir)
+            if 0 <= nx < dim and 0 <= ny < dim:
+                mask |= loc_to_bit((nx, ny), dim)
+        adjacent.append(mask)
+        parity.append((x + y) % 2)
+
+    neighbours = []
+    for index in range(dim * dim):
+        x, y = index_to_loc(index, dim)
+        moves = []
+        for dir in Direction:
+            nx, ny = loc_after_direction((x, y), dir)
+            if 0 <= nx < dim and 0 <= ny < dim:
+                n_index = loc_to_index((nx, ny), dim)
+                moves.append((int(dir) * 3, 1 << n_index, adjacent[n_index]))
+        neighbours.append(tuple(moves))
+
+    return tuple(neighbours), tuple(adjacent), tuple(parity)
+
+
+def adjacent_bits(bits: int, game_map) -> int:
+    """
+    Returns every cell orthogonally adjacent to a cell in the bitboard.
+    The cells of the bitboard itself are only included if they are adjacent
+    to another set cell.
+
+    Parameters:
+        bits (int): The bitboard to expand.
+        game_map (game_map.GameMap): The map the bitboard belongs to.
+
+    Returns:
+        (int): The bitboard of adjacent cells.
+    """
+    dim = game_map.MAP_SIZE
+    return (
+        ((bits << 1) & game_map.NOT_LEFT_COL_BB)
+        | ((bits >> 1) & game_map.NOT_RIGHT_COL_BB)
+        | ((bits << dim) & game_map.FULL_BB)
+        | (bits >> dim)
+    )
+
+
+class BitboardSet(MutableSet):
+    """
+    A live, set-like view over one of a Board's bitboards. Reads and writes
+    go straight through to the underlying integer, so code written against
+    the old set-of-tuples API keeps working. Copying the view returns a
+    plain set. If given, on_change is called after every write.
+    """
+
+    __slots__ = ("_owner", "_field", "_dim", "_on_change")
+
+    def __init__(self, owner, field: str, dim: int, on_change=None):
+        self._owner = owner
+        self._field = field
+        self._dim = dim
+        self._on_change = on_change
+
+    @classmethod
+    def _from_iterable(cls, it):
+        return set(it)
+
+    def _index(self, loc):
+        try:
+            x, y = loc
+        except (TypeError, ValueError):
+            return None
+        if x < 0 or y < 0 or x >= self._dim or y >= self._dim:
+            return None
+        return loc_to_index((x, y), self._dim)
+
+    def __contains__(self, loc) -> bool:
+        index = self._index(loc)
+        if index is None:
+            return False
+        return (getattr(self._owner, self._field) >> index) & 1 == 1
+
+    def __iter__(self):
+        return iter(bits_to_locs(getattr(self._owner, self._field), self._dim))
+
+    def __len__(self) -> int:
+        return getattr(self._owner, self._field).bit_count()
+
+    def add(self, loc: Tuple[int, int]):
+        index = self._index(loc)
+        if index is None:
+            raise ValueError(f"{loc} is not on the board")
+        setattr(self._owner, self._field, getattr(self._owner, self._field) | (1 << index))
+        if self._on_change is not None:
+            self._on_change()
+
+    def discard(self, loc: Tuple[int, int]):
+        index = self._index(loc)
+        if index is not None:
+            setattr(
+                self._owner, self._field, getattr(self._owner, self._field) & ~(1 << index)
+            )
+            if self._on_change is not None:
+                self._on_change()
+
+    def copy(self) -> set:
+        return set(self)
+
+    def __repr__(self) -> str:
+        return repr(set(self))
@@ -0,0 +1,38 @@
+# Declarations used when board.py is compiled with Cython (see build_extensions.py).
+# board.py itself stays plain Python and is used as is when the extension is not built.
+# Note that the compiled Board does not accept attributes that are not declared here.
+
+from game.chicken cimport Chicken
+
+
+cdef class Board:
+    cdef public object game_map
+
+    # bitboards can be wider than 64 bits on larger maps, so they stay Python ints
+    cdef public object eggs_player_bb
+    cdef public object eggs_enemy_bb
+    cdef public object turds_player_bb
+    cdef public object turds_enemy_bb
+    cdef public object found_trapdoors_bb
+
+    cdef public Chicken chicken_player
+    cdef public Chicken chicken_enemy
+
+    cdef public int turn_count
+    cdef public int MAX_TURNS
+    cdef public int turns_left_player
+    cdef public int turns_left_enemy
+
+    cdef public object winner
+    cdef public object win_reason
+
+    cdef public object time_to_play
+    cdef public double player_time
+    cdef public double enemy_time
+
+    cdef public bint chicken_blocked
+    cdef public bint is_as_turn
+    cdef public bint build_history
+
+    cdef public object history
+    cdef public object zobrist_hash
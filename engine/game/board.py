@@ -1,7 +1,10 @@
+from operator import attrgetter
 from typing import List, Tuple
 
+from game.bitboard import BitboardSet, adjacent_bits, locs_to_bits
 from game.chicken import Chicken
 from game.enums import (
+    DECODED_MOVES,
     Direction,
     MoveType,
     Result,
@@ -10,6 +13,34 @@ from game.enums import (
 )
 from game.game_map import GameMap
 from game.history import History
+from game.zobrist import bits_key, zobrist_keys
+
+# True when this module was compiled with Cython (see build_extensions.py)
+COMPILED = not __file__.endswith(".py")
+
+
+# State copied by Board.get_copy, gathered in a single call. The chickens are
+# copied separately and the history is only shared when requested.
+COPIED_STATE = (
+    "eggs_player_bb",
+    "eggs_enemy_bb",
+    "turds_player_bb",
+    "turds_enemy_bb",
+    "found_trapdoors_bb",
+    "is_as_turn",
+    "turn_count",
+    "MAX_TURNS",
+    "turns_left_player",
+    "turns_left_enemy",
+    "winner",
+    "time_to_play",
+    "player_time",
+    "enemy_time",
+    "win_reason",
+    "chicken_blocked",
+    "zobrist_hash",
+)
+get_copied_state = attrgetter(*COPIED_STATE)
 
 
 def manhattan_distance(p1: Tuple[int, int], p2: Tuple[int, int]) -> int:
@@ -33,8 +64,22 @@ class Board:
     your program doesn't crash. If an apply function throws an error,
     it is not guarenteed that the board state will be valid or that the state
     will be the same as when the function started.
+
+    Eggs, turds and found trapdoors are stored as integer bitboards
+    (eggs_player_bb, turds_enemy_bb, found_trapdoors_bb, ...) where cell
+    (x, y) is bit y * MAP_SIZE + x. The eggs_player, eggs_enemy, turds_player,
+    turds_enemy and found_trapdoors attributes are set-like views over these
+    bitboards and can be used exactly like sets of (x, y) tuples.
     """
 
+    __slots__ = (
+        "game_map",
+        "chicken_player",
+        "chicken_enemy",
+        "build_history",
+        "history",
+    ) + COPIED_STATE
+
     def __init__(
         self,
         game_map: GameMap,
@@ -55,17 +100,17 @@ class Board:
         self.game_map = game_map
 
         if not copy:
-            self.eggs_player = set()
-            self.eggs_enemy = set()
-            self.turds_player = set()
-            self.turds_enemy = set()
+            self.eggs_player_bb = 0
+            self.eggs_enemy_bb = 0
+            self.turds_player_bb = 0
+            self.turds_enemy_bb = 0
 
             # These will get their initial positions and even-ness
             # from the gameplay
             self.chicken_player = Chicken(self.game_map.MAX_TURDS)
             self.chicken_enemy = Chicken(self.game_map.MAX_TURDS)
 
-            self.found_trapdoors = set()
+            self.found_trapdoors_bb = 0
 
             # game metadata
             self.turn_count = 0
@@ -85,10 +130,146 @@ class Board:
             self.chicken_blocked = False
             self.is_as_turn = True
 
+            # computed on the first call to get_hash, then kept up to date
+            self.zobrist_hash = None
+
             # history building
             self.build_history = build_history
             if build_history:
-                self.history = History()
+                self.history = History(2 * self.MAX_TURNS)
+
+    @property
+    def eggs_player(self) -> BitboardSet:
+        return BitboardSet(self, "eggs_player_bb", self.game_map.MAP_SIZE, self.clear_hash)
+
+    @eggs_player.setter
+    def eggs_player(self, locs):
+        self.eggs_player_bb = locs_to_bits(locs, self.game_map.MAP_SIZE)
+        self.zobrist_hash = None
+
+    @property
+    def eggs_enemy(self) -> BitboardSet:
+        return BitboardSet(self, "eggs_enemy_bb", self.game_map.MAP_SIZE, self.clear_hash)
+
+    @eggs_enemy.setter
+    def eggs_enemy(self, locs):
+        self.eggs_enemy_bb = locs_to_bits(locs, self.game_map.MAP_SIZE)
+        self.zobrist_hash = None
+
+    @property
+    def turds_player(self) -> BitboardSet:
+        return BitboardSet(self, "turds_player_bb", self.game_map.MAP_SIZE, self.clear_hash)
+
+    @turds_player.setter
+    def turds_player(self, locs):
+        self.turds_player_bb = locs_to_bits(locs, self.game_map.MAP_SIZE)
+        self.zobrist_hash = None
+
+    @property
+    def turds_enemy(self) -> BitboardSet:
+        return BitboardSet(self, "turds_enemy_bb", self.game_map.MAP_SIZE, self.clear_hash)
+
+    @turds_enemy.setter
+    def turds_enemy(self, locs):
+        self.turds_enemy_bb = locs_to_bits(locs, self.game_map.MAP_SIZE)
+        self.zobrist_hash = None
+
+    @property
+    def found_trapdoors(self) -> BitboardSet:
+        return BitboardSet(self, "found_trapdoors_bb", self.game_map.MAP_SIZE, self.clear_hash)
+
+    @found_trapdoors.setter
+    def found_trapdoors(self, locs):
+        self.found_trapdoors_bb = locs_to_bits(locs, self.game_map.MAP_SIZE)
+        self.zobrist_hash = None
+
+    def get_hash(self) -> int:
+        """
+        Returns the 64-bit Zobrist hash of the position. It covers both chickens'
+        locations, eggs, turds, eggs laid, turds left and turns left, the found
+        trapdoors, whose turn it is and the perspective of the board. It is
+        computed on the first call and then updated incrementally by
+        apply_move, push_move, pop_move, reverse_perspective and apply_trapdoor.
+
+        If you modify the board's state directly instead of through these
+        functions, call clear_hash so that it is recomputed.
+
+        Returns:
+            (int): The hash of the position.
+        """
+        if self.zobrist_hash is None:
+            self.zobrist_hash = self.compute_hash()
+        return self.zobrist_hash
+
+    def compute_hash(self) -> int:
+        """
+        Computes the Zobrist hash of the position from scratch.
+
+        Returns:
+            (int): The hash of the position.
+        """
+        keys = zobrist_keys(self.game_map.MAP_SIZE)
+        player_side = self.chicken_player.even_chicken
+        enemy_side = self.chicken_enemy.even_chicken
+
+        h = self._side_key(keys, self.chicken_player, self.turns_left_player)
+        h ^= self._side_key(keys, self.chicken_enemy, self.turns_left_enemy)
+        h ^= bits_key(self.eggs_player_bb, keys.EGG[player_side])
+        h ^= bits_key(self.turds_player_bb, keys.TURD[player_side])
+        h ^= bits_key(self.eggs_enemy_bb, keys.EGG[enemy_side])
+        h ^= bits_key(self.turds_enemy_bb, keys.TURD[enemy_side])
+        h ^= bits_key(self.found_trapdoors_bb, keys.TRAPDOOR)
+        if not self.is_as_turn:
+            h ^= keys.B_TO_MOVE
+        if player_side == 1:
+            h ^= keys.PLAYER_IS_B
+        return h
+
+    def clear_hash(self):
+        """
+        Discards the stored hash so that get_hash recomputes it.
+        """
+        self.zobrist_hash = None
+
+    def _side_key(self, keys, chicken: Chicken, turns_left: int) -> int:
+        (x, y), _, side, eggs_laid, turds_left = chicken.state
+        return (
+            keys.CHICKEN[side][y * self.game_map.MAP_SIZE + x]
+            ^ keys.EGGS_LAID[side][eggs_laid % 256]
+            ^ keys.TURDS_LEFT[side][turds_left % 256]
+            ^ keys.TURNS_LEFT[side][turns_left % 256]
+        )
+
+    def loc_bit(self, loc: Tuple[int, int]) -> int:
+        """
+        Returns the bitboard bit of a location, or 0 if it is off the board.
+
+        Parameters:
+            loc: The (x,y) location of the cell.
+
+        Returns:
+            (int): The single-bit bitboard for the location.
+        """
+        x, y = loc
+        dim = self.game_map.MAP_SIZE
+        if x < 0 or y < 0 or x >= dim or y >= dim:
+            return 0
+        return 1 << (int(y) * dim + int(x))
+
+    def get_turd_zone_bb(self, enemy: bool = True) -> int:
+        """
+        Returns the bitboard of cells that a chicken cannot step onto because
+        they are next to a turd of the other side.
+
+        Parameters:
+            enemy (bool, optional): If True, returns the zone created by the enemy's turds
+                (blocking the player); if False, the zone created by the player's turds. Defaults to True.
+
+        Returns:
+            (int): Bitboard of the cells adjacent to the turds.
+        """
+        turds = self.turds_enemy_bb if enemy else self.turds_player_bb
+        return adjacent_bits(turds, self.game_map)
 
     def is_valid_cell(self, loc: Tuple[int, int]) -> bool:
         """
@@ -117,13 +298,16 @@ class Board:
         Returns:
             (bool): True if the cell is within the enemy's turd zone, False otherwise.
         """
+        bit = self.loc_bit(loc)
+        if bit:
+            turds = self.turds_enemy_bb
+            return bool(bit & (turds | adjacent_bits(turds, self.game_map)))
+
+        # off-board cells can still border a turd on the edge of the board
+        turds_enemy = self.turds_enemy
         for dir in Direction:
-            new_loc = loc_after_direction(loc, dir)
-            if new_loc in self.turds_enemy:
+            if loc_after_direction(loc, dir) in turds_enemy:
                 return True
-        if loc in self.turds_enemy:
-            return True
-
         return False
 
     def is_cell_blocked(self, loc: Tuple[int, int]) -> bool:
@@ -143,7 +327,7 @@ class Board:
         if enemy_loc == loc:
             return True
 
-        if loc in self.eggs_enemy:
+        if self.loc_bit(loc) & self.eggs_enemy_bb:
             return True
 
         if self.is_cell_in_enemy_turd_zone(loc):
@@ -186,6 +370,9 @@ class Board:
             test_loc = self.chicken_enemy.get_location()
             opposing_loc = self.chicken_player.get_location()
             even_chicken = self.chicken_enemy.even_chicken
+            own_bb = self.eggs_enemy_bb | self.turds_enemy_bb
+            opposing_eggs = self.eggs_player_bb
+            opposing_turds = self.turds_player_bb
 
         else:
             if move_type == MoveType.TURD and self.chicken_player.get_turds_left() <= 0:
@@ -193,6 +380,9 @@ class Board:
             test_loc = self.chicken_player.get_location()
             opposing_loc = self.chicken_enemy.get_location()
             even_chicken = self.chicken_player.even_chicken
+            own_bb = self.eggs_player_bb | self.turds_player_bb
+            opposing_eggs = self.eggs_enemy_bb
+            opposing_turds = self.turds_enemy_bb
 
         # Wrong parity?
         if move_type == MoveType.EGG:
@@ -207,48 +397,26 @@ class Board:
             return False
 
         # Is it off the board?
-        if (
-            new_loc[0] < 0
-            or new_loc[1] < 0
-            or new_loc[0] >= self.game_map.MAP_SIZE
-            or new_loc[1] >= self.game_map.MAP_SIZE
-        ):
+        dim = self.game_map.MAP_SIZE
+        if new_loc[0] < 0 or new_loc[1] < 0 or new_loc[0] >= dim or new_loc[1] >= dim:
             return False
+        new_bit = 1 << (new_loc[1] * dim + new_loc[0])
 
         # Opposing eggs?
-        if enemy:
-            if new_loc in self.eggs_player:
-                return False
-        else:
-            if new_loc in self.eggs_enemy:
-                return False
+        if new_bit & opposing_eggs:
+            return False
 
         # Opposing turds?
-        if enemy:
-            problematic_turds = self.turds_player
-        else:
-            problematic_turds = self.turds_enemy
-
-        for direction in Direction:
-            adjacent_loc = loc_after_direction(new_loc, direction)
-            if adjacent_loc in problematic_turds:
-                return False
+        if opposing_turds and new_bit & adjacent_bits(opposing_turds, self.game_map):
+            return False
 
         # Plain move is fine
         if move_type == MoveType.PLAIN:
             return True
 
         # Is anything belonging to the same player already in the square?
-        if enemy:
-            if test_loc in self.eggs_enemy:
-                return False
-            if test_loc in self.turds_enemy:
-                return False
-        else:
-            if test_loc in self.eggs_player:
-                return False
-            if test_loc in self.turds_player:
-                return False
+        if (1 << (test_loc[1] * dim + test_loc[0])) & own_bb:
+            return False
 
         # If it is an egg laying, we are good to go
         if move_type == MoveType.EGG:
@@ -269,11 +437,58 @@ class Board:
         Returns:
             (List[Tuple[Direction, MoveType]]): List of tuples containing valid direction and move type combinations.
         """
+        return [DECODED_MOVES[code] for code in self.get_valid_moves_encoded(enemy)]
+
+    def get_valid_moves_encoded(self, enemy: bool = False) -> List[int]:
+        """
+        Returns a list of all valid moves for the player or enemy, encoded as
+        dir * 3 + move_type (see enums.encode_move and enums.decode_move).
+        Moves are in the same order as get_valid_moves.
+
+        Parameters:
+            enemy (bool, optional): If True, returns valid moves for enemy; if False, returns for player.
+
+        Returns:
+            (List[int]): List of encoded moves.
+        """
+        if enemy:
+            mover = self.chicken_enemy
+            opposing = self.chicken_player
+            own_bb = self.eggs_enemy_bb | self.turds_enemy_bb
+            opposing_eggs = self.eggs_player_bb
+            opposing_turds = self.turds_player_bb
+        else:
+            mover = self.chicken_player
+            opposing = self.chicken_enemy
+            own_bb = self.eggs_player_bb | self.turds_player_bb
+            opposing_eggs = self.eggs_enemy_bb
+            opposing_turds = self.turds_enemy_bb
+
+        game_map = self.game_map
+        dim = game_map.MAP_SIZE
+        (x, y), _, even_chicken, _, turds_left = mover.state
+        ox, oy = opposing.state[0]
+        index = y * dim + x
+        blocked = opposing_eggs | (1 << (oy * dim + ox))
+
+        # Which move types are possible is the same for every direction
+        can_drop = not ((own_bb >> index) & 1)
+        can_egg = can_drop and game_map.CELL_PARITY[index] == even_chicken
+        can_turd = (
+            can_drop
+            and turds_left > 0
+            and abs(x - ox) + abs(y - oy) >= 2
+        )
+
         valid_moves = []
-        for dir in Direction:
-            for move_type in MoveType:
-                if self.is_valid_move(dir, move_type, enemy=enemy):
-                    valid_moves.append((dir, move_type))
+        for code, new_bit, new_adjacent in game_map.NEIGHBOURS[index]:
+            if new_bit & blocked or new_adjacent & opposing_turds:
+                continue
+            valid_moves.append(code)
+            if can_egg:
+                valid_moves.append(code + 1)
+            if can_turd:
+                valid_moves.append(code + 2)
 
         return valid_moves
 
@@ -302,11 +517,9 @@ class Board:
             (bool): True if an egg can be laid at that location, False otherwise.
         """
 
-        return (
-            self.chicken_player.can_lay_egg(loc)
-            and loc not in self.eggs_player
-            and loc not in self.turds_player
-            and loc not in self.turds_enemy
+        return self.chicken_player.can_lay_egg(loc) and not (
+            self.loc_bit(loc)
+            & (self.eggs_player_bb | self.turds_player_bb | self.turds_enemy_bb)
         )
 
     def can_lay_turd(self):
@@ -336,10 +549,15 @@ class Board:
         return (
             self.chicken_player.has_turds_left()
             and manhattan_distance(loc, enemy_loc) > 1
-            and loc not in self.turds_player
-            and loc not in self.turds_enemy
-            and loc not in self.eggs_player
-            and loc not in self.eggs_enemy
+            and not (
+                self.loc_bit(loc)
+                & (
+                    self.turds_player_bb
+                    | self.turds_enemy_bb
+                    | self.eggs_player_bb
+                    | self.eggs_enemy_bb
+                )
+            )
         )
 
     def apply_move(
@@ -371,6 +589,12 @@ class Board:
         my_loc = self.chicken_player.get_location()
         offset = 0 if self.is_as_turn else 2
 
+        h = self.zobrist_hash
+        if h is not None:
+            keys = zobrist_keys(self.game_map.MAP_SIZE)
+            side = self.chicken_player.even_chicken
+            h ^= self._side_key(keys, self.chicken_player, self.turns_left_player)
+
         if move_type == MoveType.EGG:
             if (my_loc[0] == 0 or my_loc[0] == self.game_map.MAP_SIZE - 1) and (
                 my_loc[1] == 0 or my_loc[1] == self.game_map.MAP_SIZE - 1
@@ -378,14 +602,24 @@ class Board:
                 self.chicken_player.increment_eggs_laid(self.game_map.CORNER_REWARD)
             else:
                 self.chicken_player.increment_eggs_laid()
-            self.eggs_player.add(my_loc)
+            bit = self.loc_bit(my_loc)
+            if h is not None and not self.eggs_player_bb & bit:
+                h ^= keys.EGG[side][bit.bit_length() - 1]
+            self.eggs_player_bb |= bit
 
         elif move_type == MoveType.TURD:
             self.chicken_player.decrement_turds()
-            self.turds_player.add(my_loc)
+            bit = self.loc_bit(my_loc)
+            if h is not None and not self.turds_player_bb & bit:
+                h ^= keys.TURD[side][bit.bit_length() - 1]
+            self.turds_player_bb |= bit
 
         new_loc = self.chicken_player.apply_dir(dir)
 
+        if h is not None:
+            h ^= self._side_key(keys, self.chicken_player, self.turns_left_player)
+            self.zobrist_hash = h
+
         self.end_turn(move_type, timer)
 
         return True
@@ -400,6 +634,11 @@ class Board:
             move_type (MoveType): The type of move that was made.
             timer (float, optional): Time taken for the turn in seconds. Defaults to 0.
         """
+        h = self.zobrist_hash
+        if h is not None:
+            keys = zobrist_keys(self.game_map.MAP_SIZE)
+            h ^= self._side_key(keys, self.chicken_player, self.turns_left_player)
+
         self.turn_count += 1
         self.turns_left_player -= 1
         
@@ -410,6 +649,10 @@ class Board:
                 self.chicken_player.increment_eggs_laid(2)
                 self.chicken_blocked = True
 
+        if h is not None:
+            h ^= self._side_key(keys, self.chicken_player, self.turns_left_player)
+            self.zobrist_hash = h ^ keys.B_TO_MOVE
+
         self.check_win()
 
         if self.build_history:
@@ -496,6 +739,115 @@ class Board:
         ok = board_copy.apply_move(dir, move_type, check_ok)
         return board_copy if ok else None
 
+    def push_move(
+        self,
+        dir: Direction | int,
+        move_type: MoveType | int,
+        check_ok: bool = True,
+        reverse: bool = False,
+    ):
+        """
+        Applies a move in place and returns an undo record that pop_move can use
+        to restore the board. Meant for tree search: unlike forecast_move, no
+        new Board is created. The move's time is not charged and no history is recorded.
+
+        Parameters:
+            dir (Direction | int): The direction of the move.
+            move_type (MoveType | int): The type of move (walk, egg, turd).
+            check_ok (bool, optional): If True, validates the move before applying; if False, skips validation. Defaults to True.
+            reverse (bool, optional): If True, also reverses the perspective of the board after the move. Defaults to False.
+
+        Returns:
+            (tuple): The undo record to pass to pop_move, or None if the move is invalid.
+        """
+        undo = (
+            self.chicken_player.state,
+            self.eggs_player_bb,
+            self.turds_player_bb,
+            self.turn_count,
+            self.turns_left_player,
+            self.winner,
+            self.win_reason,
+            self.chicken_blocked,
+            self.zobrist_hash,
+            reverse,
+        )
+
+        build_history = self.build_history
+        self.build_history = False
+        try:
+            ok = self.apply_move(dir, move_type, check_ok=check_ok)
+        finally:
+            self.build_history = build_history
+
+        if not ok:
+            return None
+        if reverse:
+            self.reverse_perspective()
+        return undo
+
+    def pop_move(self, undo: tuple):
+        """
+        Restores the board to its state before the push_move call that returned undo.
+        Moves must be popped in the reverse order they were pushed.
+
+        Parameters:
+            undo (tuple): The undo record returned by push_move.
+        """
+        (
+            chicken_state,
+            eggs_bb,
+            turds_bb,
+            turn_count,
+            turns_left,
+            winner,
+            win_reason,
+            chicken_blocked,
+            zobrist_hash,
+            reverse,
+        ) = undo
+
+        if reverse:
+            self.reverse_perspective()
+
+        self.chicken_player.state = chicken_state
+        self.eggs_player_bb = eggs_bb
+        self.turds_player_bb = turds_bb
+        self.turn_count = turn_count
+        self.turns_left_player = turns_left
+        self.winner = winner
+        self.win_reason = win_reason
+        self.chicken_blocked = chicken_blocked
+        self.zobrist_hash = zobrist_hash
+        self.is_as_turn = not self.is_as_turn
+
+    def apply_trapdoor(self, loc: Tuple[int, int]):
+        """
+        Applies the effects of the player stepping on the trapdoor at loc: the player
+        is sent back to its spawn, the enemy is awarded the trapdoor penalty in eggs
+        and the trapdoor is marked as found. Used by the game runner.
+
+        Parameters:
+            loc (Tuple[int, int]): The (x, y) location of the triggered trapdoor.
+        """
+        h = self.zobrist_hash
+        if h is not None:
+            keys = zobrist_keys(self.game_map.MAP_SIZE)
+            h ^= self._side_key(keys, self.chicken_player, self.turns_left_player)
+            h ^= self._side_key(keys, self.chicken_enemy, self.turns_left_enemy)
+
+        self.chicken_player.reset_location()
+        self.chicken_enemy.increment_eggs_laid(-1 * self.game_map.TRAPDOOR_PENALTY)
+        bit = self.loc_bit(loc)
+
+        if h is not None:
+            if not self.found_trapdoors_bb & bit:
+                h ^= keys.TRAPDOOR[bit.bit_length() - 1]
+            h ^= self._side_key(keys, self.chicken_player, self.turns_left_player)
+            h ^= self._side_key(keys, self.chicken_enemy, self.turns_left_enemy)
+            self.zobrist_hash = h
+        self.found_trapdoors_bb |= bit
+
     def set_found_trapdoors(self, found_trapdoors):
         """
         Sets a trapdoor at the specified location and updates sampling masks if randomization is enabled.
@@ -520,34 +872,33 @@ class Board:
         Returns:
             (Board): A new Board object with the same state as the current one.
         """
-        board_copy = Board(self.game_map, build_history=build_history, copy=True)
-
-        board_copy.eggs_player = self.eggs_player.copy()
-        board_copy.eggs_enemy = self.eggs_enemy.copy()
-        board_copy.turds_player = self.turds_player.copy()
-        board_copy.turds_enemy = self.turds_enemy.copy()
-        board_copy.found_trapdoors = self.found_trapdoors.copy()
-        board_copy.is_as_turn = self.is_as_turn
+        board_copy = Board.__new__(Board)
+        board_copy.game_map = self.game_map
+
+        # same order as COPIED_STATE
+        (
+            board_copy.eggs_player_bb,
+            board_copy.eggs_enemy_bb,
+            board_copy.turds_player_bb,
+            board_copy.turds_enemy_bb,
+            board_copy.found_trapdoors_bb,
+            board_copy.is_as_turn,
+            board_copy.turn_count,
+            board_copy.MAX_TURNS,
+            board_copy.turns_left_player,
+            board_copy.turns_left_enemy,
+            board_copy.winner,
+            board_copy.time_to_play,
+            board_copy.player_time,
+            board_copy.enemy_time,
+            board_copy.win_reason,
+            board_copy.chicken_blocked,
+            board_copy.zobrist_hash,
+        ) = get_copied_state(self)
 
         board_copy.chicken_player = self.chicken_player.get_copy()
         board_copy.chicken_enemy = self.chicken_enemy.get_copy()
 
-        # game metadata
-        board_copy.turn_count = self.turn_count
-
-        board_copy.MAX_TURNS = self.MAX_TURNS
-        board_copy.turns_left_player = self.turns_left_player
-        board_copy.turns_left_enemy = self.turns_left_enemy
-
-        # more game metadata
-        board_copy.winner = self.winner
-
-        board_copy.time_to_play = self.time_to_play
-        board_copy.player_time = self.player_time
-        board_copy.enemy_time = self.enemy_time
-        board_copy.win_reason = self.win_reason
-        board_copy.chicken_blocked = self.chicken_blocked
-
         # history building
         board_copy.build_history = build_history
         if build_history:
@@ -563,7 +914,7 @@ class Board:
             (bool): True if there are valid moves remaining, False otherwise.
         """
 
-        return len(self.get_valid_moves(enemy=enemy)) > 0
+        return len(self.get_valid_moves_encoded(enemy)) > 0
 
     def set_build_history(self, build_history: bool):
         """
@@ -597,21 +948,21 @@ class Board:
 
         return self.winner
 
-    def get_win_reason(self) -> str:
+    def get_win_reason(self) -> WinReason:
         """
-        Returns the string explaining the reason why the game was won.
+        Returns the reason why the game was won.
 
         Returns:
-            (str): The reason for the game's outcome.
+            (WinReason): The reason for the game's outcome.
         """
         return self.win_reason
 
-    def get_history(self) -> dict:
+    def get_history(self) -> History:
         """
-        Get a dictionary representation for the renderer.
+        Get the recorded history of the game, used for the renderer.
 
         Returns:
-            (dict): A dictionary representing the game history.
+            (History): The game history.
         """
         return self.history
 
@@ -621,13 +972,13 @@ class Board:
         This swaps all player and enemy references internally.
         """
 
-        self.eggs_player, self.eggs_enemy = (
-            self.eggs_enemy,
-            self.eggs_player,
+        self.eggs_player_bb, self.eggs_enemy_bb = (
+            self.eggs_enemy_bb,
+            self.eggs_player_bb,
         )
-        self.turds_player, self.turds_enemy = (
-            self.turds_enemy,
-            self.turds_player,
+        self.turds_player_bb, self.turds_enemy_bb = (
+            self.turds_enemy_bb,
+            self.turds_player_bb,
         )
 
         self.chicken_player, self.chicken_enemy = (
@@ -637,3 +988,6 @@ class Board:
 
         self.player_time, self.enemy_time = self.enemy_time, self.player_time
         self.turns_left_player, self.turns_left_enemy = self.turns_left_enemy, self.turns_left_player
+
+        if self.zobrist_hash is not None:
+            self.zobrist_hash ^= zobrist_keys(self.game_map.MAP_SIZE).PLAYER_IS_B
@@ -0,0 +1,193 @@
+import struct
+import zlib
+from multiprocessing import shared_memory
+
+from game.board import Board
+from game.chicken import Chicken
+from game.enums import Result, WinReason
+from game.game_map import GameMap
+
+"""
+A fixed-layout packed copy of a Board in shared memory, used by the game runner
+to hand the board to a player process without pickling it. The runner writes the
+board with write and sends only the returned sequence number on the queue; the
+player process rebuilds a Board from the buffer with read.
+
+Only the state an agent sees is stored: the board never builds history in the
+player process, and the GameMap is rebuilt there once rather than sent.
+"""
+
+# sequence number, then the bitboards and metadata of the board in COPIED_STATE order,
+# then (loc x, loc y, spawn x, spawn y, even_chicken, eggs_laid, turds_left) for each chicken
+LAYOUT = struct.Struct(
+    "<Q"  # sequence
+    "5Q"  # eggs_player, eggs_enemy, turds_player, turds_enemy, found_trapdoors
+    "?"  # is_as_turn
+    "4i"  # turn_count, MAX_TURNS, turns_left_player, turns_left_enemy
+    "b"  # winner, -1 for None
+    "3d"  # time_to_play, player_time, enemy_time
+    "b"  # win_reason, -1 for None
+    "?"  # chicken_blocked
+    "?Q"  # whether zobrist_hash is set, zobrist_hash
+    "7i"  # chicken_player
+    "7i"  # chicken_enemy
+)
+
+NONE = -1
+
+
+def board_values(board: Board, include_hash: bool = True) -> tuple:
+    """
+    Returns the values stored for a board, in LAYOUT order after the sequence number.
+    """
+    zobrist_hash = board.zobrist_hash if include_hash else None
+    return (
+        board.eggs_player_bb,
+        board.eggs_enemy_bb,
+        board.turds_player_bb,
+        board.turds_enemy_bb,
+        board.found_trapdoors_bb,
+        board.is_as_turn,
+        board.turn_count,
+        board.MAX_TURNS,
+        board.turns_left_player,
+        board.turns_left_enemy,
+        NONE if board.winner is None else int(board.winner),
+        board.time_to_play,
+        board.player_time,
+        board.enemy_time,
+        NONE if board.win_reason is None else int(board.win_reason),
+        board.chicken_blocked,
+        zobrist_hash is not None,
+        0 if zobrist_hash is None else zobrist_hash,
+        *pack_chicken(board.chicken_player),
+        *pack_chicken(board.chicken_enemy),
+    )
+
+
+def board_checksum(board: Board) -> int:
+    """
+    Returns a checksum of the state stored for a board, used to check that a
+    player process's copy of the board matches the runner's. The position hash
+    is left out, since it is only computed on demand.
+
+    Parameters:
+        board (Board): The board to checksum.
+
+    Returns:
+        (int): The CRC-32 of the board's packed state.
+    """
+    return zlib.crc32(LAYOUT.pack(0, *board_values(board, include_hash=False)))
+
+
+def pack_chicken(chicken: Chicken) -> tuple:
+    loc, spawn, even_chicken, eggs_laid, turds_left = chicken.state
+    return (loc[0], loc[1], spawn[0], spawn[1], even_chicken, eggs_laid, turds_left)
+
+
+def unpack_chicken(values: tuple) -> Chicken:
+    chicken = Chicken.__new__(Chicken)
+    chicken.state = (
+        (values[0], values[1]),
+        (values[2], values[3]),
+        values[4],
+        values[5],
+        values[6],
+    )
+    return chicken
+
+
+class BoardBuffer:
+    """
+    BoardBuffer owns a shared memory block holding one packed Board. Create it in
+    the runner before starting the player process and pass it to the process, so
+    that the player process uses the same block. The runner must call close with
+    unlink=True once the player process has stopped.
+    """
+
+    def __init__(self):
+        self.shm = shared_memory.SharedMemory(create=True, size=LAYOUT.size)
+        self.sequence = 0
+        self.game_map = None
+
+    def write(self, board: Board) -> int:
+        """
+        Packs a board into the buffer.
+
+        Parameters:
+            board (Board): The board to publish. Both chickens must have been started.
+
+        Returns:
+            (int): The sequence number of this write, to send to the player process.
+        """
+        self.sequence += 1
+        LAYOUT.pack_into(self.shm.buf, 0, self.sequence, *board_values(board))
+        return self.sequence
+
+    def read(self, sequence: int) -> Board:
+        """
+        Builds a Board from the buffer. The board does not build history.
+
+        Parameters:
+            sequence (int): The sequence number returned by the matching write.
+
+        Returns:
+            (Board): A new board with the published state.
+
+        Raises:
+            RuntimeError: If the buffer does not hold the write with that sequence number.
+        """
+        values = LAYOUT.unpack_from(self.shm.buf, 0)
+        if values[0] != sequence:
+            raise RuntimeError(
+                f"Board buffer holds write {values[0]}, expected {sequence}"
+            )
+        if self.game_map is None:
+            self.game_map = GameMap()
+
+        board = Board.__new__(Board)
+        board.game_map = self.game_map
+        (
+            _,
+            board.eggs_player_bb,
+            board.eggs_enemy_bb,
+            board.turds_player_bb,
+            board.turds_enemy_bb,
+            board.found_trapdoors_bb,
+            board.is_as_turn,
+            board.turn_count,
+            board.MAX_TURNS,
+            board.turns_left_player,
+            board.turns_left_enemy,
+            winner,
+            board.time_to_play,
+            board.player_time,
+            board.enemy_time,
+            win_reason,
+            board.chicken_blocked,
+            has_hash,
+            zobrist_hash,
+        ) = values[:19]
+        board.winner = None if winner == NONE else Result(winner)
+        board.win_reason = None if win_reason == NONE else WinReason(win_reason)
+        board.zobrist_hash = zobrist_hash if has_hash else None
+        board.chicken_player = unpack_chicken(values[19:26])
+        board.chicken_enemy = unpack_chicken(values[26:33])
+        board.build_history = False
+        return board
+
+    def close(self, unlink: bool = False):
+        """
+        Releases the buffer.
+
+        Parameters:
+            unlink (bool, optional): Whether to also free the shared memory block.
+                Only the runner should unlink. Defaults to False.
+        """
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+    def __getstate__(self):
+        # the player process attaches to the block by name and builds its own GameMap
+        return {"shm": self.shm, "sequence": self.sequence, "game_map": None}
@@ -0,0 +1,6 @@
+# Declarations used when chicken.py is compiled with Cython (see build_extensions.py).
+# chicken.py itself stays plain Python and is used as is when the extension is not built.
+
+cdef class Chicken:
+    # (loc, spawn, even_chicken, eggs_laid, turds_left)
+    cdef public tuple state
@@ -1,14 +1,21 @@
 from typing import Tuple
 
 from game.enums import Direction
-from game.game_map import prob_feel, prob_hear
+from game.game_map import FEEL_TABLE, HEAR_TABLE, SENSE_RANGE
 
 
 class Chicken:
     """
     This class represents a chicken.
+
+    The whole state of the chicken is the tuple
+    state = (loc, spawn, even_chicken, eggs_laid, turds_left), so copying a
+    chicken copies a single reference. The loc, spawn, even_chicken, eggs_laid
+    and turds_left attributes read and write the matching entry of state.
     """
 
+    __slots__ = ("state",)
+
     def __init__(self, max_turds: int = 0, copy: bool = False):
         """
         Initializes the Chicken object with copy flag.
@@ -19,8 +26,52 @@ class Chicken:
         """
 
         if not copy:
-            self.turds_left = max_turds
-            self.eggs_laid = 0
+            self.state = (None, None, None, 0, max_turds)
+
+    @property
+    def loc(self) -> Tuple[int, int]:
+        return self.state[0]
+
+    @loc.setter
+    def loc(self, loc: Tuple[int, int]):
+        _, spawn, even_chicken, eggs_laid, turds_left = self.state
+        self.state = (loc, spawn, even_chicken, eggs_laid, turds_left)
+
+    @property
+    def spawn(self) -> Tuple[int, int]:
+        return self.state[1]
+
+    @spawn.setter
+    def spawn(self, spawn: Tuple[int, int]):
+        loc, _, even_chicken, eggs_laid, turds_left = self.state
+        self.state = (loc, spawn, even_chicken, eggs_laid, turds_left)
+
+    @property
+    def even_chicken(self) -> int:
+        return self.state[2]
+
+    @even_chicken.setter
+    def even_chicken(self, even_chicken: int):
+        loc, spawn, _, eggs_laid, turds_left = self.state
+        self.state = (loc, spawn, even_chicken, eggs_laid, turds_left)
+
+    @property
+    def eggs_laid(self) -> int:
+        return self.state[3]
+
+    @eggs_laid.setter
+    def eggs_laid(self, eggs_laid: int):
+        loc, spawn, even_chicken, _, turds_left = self.state
+        self.state = (loc, spawn, even_chicken, eggs_laid, turds_left)
+
+    @property
+    def turds_left(self) -> int:
+        return self.state[4]
+
+    @turds_left.setter
+    def turds_left(self, turds_left: int):
+        loc, spawn, even_chicken, eggs_laid, _ = self.state
+        self.state = (loc, spawn, even_chicken, eggs_laid, turds_left)
 
     def start(self, start_loc: Tuple[int, int], even_chicken: int):
         """
@@ -30,12 +81,11 @@ class Chicken:
             start_loc (Tuple[int, int]): The (x, y) coordinates of the starting location.
             even_chicken (int): The parity indicator (0 or 1) that determines which cells the chicken can lay eggs on.
         """
-        self.spawn = start_loc
-        self.loc = start_loc
-        self.even_chicken = even_chicken
+        _, _, _, eggs_laid, turds_left = self.state
+        self.state = (start_loc, start_loc, even_chicken, eggs_laid, turds_left)
 
     def is_player_a(self) -> bool:
-        return self.even_chicken == 0
+        return self.state[2] == 0
 
     def get_spawn(self) -> Tuple[int, int]:
         """
@@ -44,7 +94,7 @@ class Chicken:
         Returns:
             Tuple[int, int]: containing the (x, y) coordinates of the spawn location.
         """
-        return self.spawn
+        return self.state[1]
 
     def get_location(self) -> Tuple[int, int]:
         """
@@ -53,7 +103,7 @@ class Chicken:
         Returns:
             (Tuple[int, int]): tuple containing the (x, y) coordinates of the current location.
         """
-        return self.loc
+        return self.state[0]
 
     def increment_eggs_laid(self, eggs=1):
         """
@@ -62,13 +112,15 @@ class Chicken:
         Parameters:
             eggs (int, optional): Number of eggs to add to the count. Defaults to 1.
         """
-        self.eggs_laid += eggs
+        loc, spawn, even_chicken, eggs_laid, turds_left = self.state
+        self.state = (loc, spawn, even_chicken, eggs_laid + eggs, turds_left)
 
     def reset_location(self):
         """
         Resets the chicken's location back to its spawn point.
         """
-        self.loc = self.spawn
+        _, spawn, even_chicken, eggs_laid, turds_left = self.state
+        self.state = (spawn, spawn, even_chicken, eggs_laid, turds_left)
 
     def can_lay_egg(self, loc: Tuple[int, int]):
         """
@@ -81,13 +133,14 @@ class Chicken:
         Returns:
             (bool): True if the chicken can lay an egg at that location, False otherwise.
         """
-        return (loc[0] + loc[1]) % 2 == self.even_chicken
+        return (loc[0] + loc[1]) % 2 == self.state[2]
 
     def decrement_turds(self):
         """
         Decrements the count of turds remaining.
         """
-        self.turds_left -= 1
+        loc, spawn, even_chicken, eggs_laid, turds_left = self.state
+        self.state = (loc, spawn, even_chicken, eggs_laid, turds_left - 1)
 
     def get_turds_left(self) -> int:
         """
@@ -96,7 +149,7 @@ class Chicken:
         Returns:
             (int): Number of turds left.
         """
-        return self.turds_left
+        return self.state[4]
 
     def get_turds_placed(self) -> int:
         """
@@ -105,7 +158,7 @@ class Chicken:
         Returns:
             (int): Number of turds placed.
         """
-        return 5 - self.turds_left
+        return 5 - self.state[4]
 
     def get_eggs_laid(self):
         """
@@ -114,7 +167,7 @@ class Chicken:
         Returns:
             (int): Number of eggs laid.
         """
-        return self.eggs_laid
+        return self.state[3]
 
     def get_next_loc(self, dir=Direction | int, loc=None) -> Tuple[int, int]:
         """
@@ -127,20 +180,19 @@ class Chicken:
         Returns:
             (np.ndarray): Array containing the (x, y) coordinates of the next location, or None if direction is invalid.
         """
-        loc = self.loc if (loc is None) else loc
-
-        match dir:
-            case Direction.UP:
-                loc = (loc[0], loc[1] - 1)
-            case Direction.RIGHT:
-                loc = (loc[0] + 1, loc[1])
-            case Direction.DOWN:
-                loc = (loc[0], loc[1] + 1)
-            case Direction.LEFT:
-                loc = (loc[0] - 1, loc[1])
-
-            case _:
-                return None
+        loc = self.state[0] if (loc is None) else loc
+
+        # if/elif rather than match so that the module can be compiled with Cython
+        if dir == Direction.UP:
+            loc = (loc[0], loc[1] - 1)
+        elif dir == Direction.RIGHT:
+            loc = (loc[0] + 1, loc[1])
+        elif dir == Direction.DOWN:
+            loc = (loc[0], loc[1] + 1)
+        elif dir == Direction.LEFT:
+            loc = (loc[0] - 1, loc[1])
+        else:
+            return None
 
         return loc
 
@@ -154,8 +206,10 @@ class Chicken:
         Returns:
             (Tuple[int, int]): Array containing the new (x, y) coordinates, or None if direction is invalid.
         """
-        self.loc = self.get_next_loc(dir)
-        return self.loc
+        new_loc = self.get_next_loc(dir)
+        _, spawn, even_chicken, eggs_laid, turds_left = self.state
+        self.state = (new_loc, spawn, even_chicken, eggs_laid, turds_left)
+        return new_loc
 
     def lay_egg(self):
         """
@@ -164,8 +218,8 @@ class Chicken:
         Returns:
             (Tuple[int, int]): Array containing the (x, y) coordinates where the egg was laid.
         """
-        self.eggs_laid += 1
-        return self.loc
+        self.increment_eggs_laid()
+        return self.state[0]
 
     def drop_turd(self):
         """
@@ -174,8 +228,8 @@ class Chicken:
         Returns:
             (Tuple[int, int]): Array containing the (x, y) coordinates where the turd was dropped.
         """
-        self.turds_left -= 1
-        return self.loc
+        self.decrement_turds()
+        return self.state[0]
 
     def has_turds_left(self):
         """
@@ -184,7 +238,7 @@ class Chicken:
         Returns:
             (bool): True if there are turds remaining, False otherwise.
         """
-        return self.turds_left > 0
+        return self.state[4] > 0
 
     def prob_senses_if_trapdoor_were_at(
         self, did_hear: bool, did_feel: bool, x: int, y: int
@@ -192,16 +246,15 @@ class Chicken:
         """
         Returns a tuple representing the probability of the player (hearing, feeling) the trapdoor if it were at x,y.
         """
-        delta_x = abs(x - self.loc[0])
-        delta_y = abs(y - self.loc[1])
-        if did_hear:
-            hear_likelihood = prob_hear(delta_x, delta_y)
-        else:
-            hear_likelihood = 1.0 - prob_hear(delta_x, delta_y)
-        if did_feel:
-            feel_likelihood = prob_feel(delta_x, delta_y)
-        else:
-            feel_likelihood = 1.0 - prob_feel(delta_x, delta_y)
+        loc = self.state[0]
+        delta_x = min(abs(x - loc[0]), SENSE_RANGE)
+        delta_y = min(abs(y - loc[1]), SENSE_RANGE)
+        hear_likelihood = float(HEAR_TABLE[delta_x, delta_y])
+        feel_likelihood = float(FEEL_TABLE[delta_x, delta_y])
+        if not did_hear:
+            hear_likelihood = 1.0 - hear_likelihood
+        if not did_feel:
+            feel_likelihood = 1.0 - feel_likelihood
         return (hear_likelihood, feel_likelihood)
 
     def get_copy(self) -> "Chicken":
@@ -212,12 +265,6 @@ class Chicken:
             (Chicken): A deep copy of the current chicken object.
         """
 
-        new_chicken = Chicken(copy=True)
-
-        new_chicken.even_chicken = self.even_chicken
-        new_chicken.eggs_laid = self.eggs_laid
-        new_chicken.turds_left = self.turds_left
-        new_chicken.loc = self.loc
-        new_chicken.spawn = self.spawn
-
+        new_chicken = Chicken.__new__(Chicken)
+        new_chicken.state = self.state
         return new_chicken
@@ -44,6 +44,19 @@ class MoveType(IntEnum):
     TURD = 2
 
 
+# Moves can be encoded as the small int dir * 3 + move_type, which is what
+# Board.get_valid_moves_encoded returns. DECODED_MOVES maps a code back.
+DECODED_MOVES = tuple((dir, move_type) for dir in Direction for move_type in MoveType)
+
+
+def encode_move(dir: Direction | int, move_type: MoveType | int) -> int:
+    return int(dir) * 3 + int(move_type)
+
+
+def decode_move(code: int) -> Tuple[Direction, MoveType]:
+    return DECODED_MOVES[code]
+
+
 class Cell(IntEnum):
     SPACE = 0
     PLAYER_A_EGG = 1
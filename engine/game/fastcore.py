@@ -0,0 +1,451 @@
+import numpy as np
+
+from game.board import Board
+from game.chicken import Chicken
+from game.enums import Result, WinReason
+from game.game_map import GameMap
+
+try:
+    from numba import njit
+
+    NUMBA_AVAILABLE = True
+except ImportError:
+    # Without numba the kernels below still work, just as plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+    NUMBA_AVAILABLE = False
+
+"""
+Compiled versions of the core rules of Board for fast rollouts. This module is
+optional: import it explicitly with `from game import fastcore`. If numba is
+not installed the kernels run as plain Python.
+
+A position is a flat int64 NumPy array. The first HEADER_SIZE entries hold the
+game metadata, with player/enemy pairs stored as FIELD + PLAYER and
+FIELD + ENEMY (so reversing the perspective swaps them). The remaining
+MAP_SIZE * MAP_SIZE entries hold one cell each, indexed by y * MAP_SIZE + x,
+as a combination of the EGG_A, EGG_B, TURD_A, TURD_B and FOUND_TRAPDOOR flags.
+Cells are stored by absolute side, where side 0 is player A (the even chicken)
+and side 1 is player B. Times are stored in nanoseconds.
+
+Use board_to_state and state_to_board to convert between the two.
+"""
+
+PLAYER = 0
+ENEMY = 1
+
+DIM = 0
+CORNER_REWARD = 1
+TRAPDOOR_PENALTY = 2
+MAX_TURNS = 3
+TIME_TO_PLAY = 4
+TURN_COUNT = 5
+WINNER = 6
+WIN_REASON = 7
+CHICKEN_BLOCKED = 8
+IS_AS_TURN = 9
+LOC = 10
+SPAWN = 12
+PARITY = 14
+EGGS_LAID = 16
+TURDS_LEFT = 18
+TURNS_LEFT = 20
+TIME = 22
+HEADER_SIZE = 24
+
+EGG_A = 1
+EGG_B = 2
+TURD_A = 4
+TURD_B = 8
+FOUND_TRAPDOOR = 16
+
+NONE = -1
+NS_PER_SECOND = 1_000_000_000
+TIMEOUT_BOUNDS = 500_000_000
+
+
+@njit
+def neighbour(state, cell, dir):
+    """
+    Returns the cell next to cell in direction dir, or -1 if it is off the board.
+    """
+    dim = state[DIM]
+    x = cell % dim
+    y = cell // dim
+    if dir == 0:
+        y -= 1
+    elif dir == 1:
+        x += 1
+    elif dir == 2:
+        y += 1
+    elif dir == 3:
+        x -= 1
+    else:
+        return -1
+    if x < 0 or y < 0 or x >= dim or y >= dim:
+        return -1
+    return y * dim + x
+
+
+@njit
+def in_turd_zone(state, cell, turd_flag):
+    """
+    Returns whether a cell is orthogonally adjacent to a turd with the given flag.
+    """
+    for dir in range(4):
+        adjacent = neighbour(state, cell, dir)
+        if adjacent >= 0 and state[HEADER_SIZE + adjacent] & turd_flag:
+            return True
+    return False
+
+
+@njit
+def is_valid_move(state, dir, move_type, enemy):
+    """
+    Mirrors Board.is_valid_move.
+    """
+    mover = ENEMY if enemy else PLAYER
+    opposing = PLAYER if enemy else ENEMY
+
+    if move_type == 2 and state[TURDS_LEFT + mover] <= 0:
+        return False
+
+    dim = state[DIM]
+    loc = state[LOC + mover]
+    if move_type == 1:
+        if (loc % dim + loc // dim) % 2 != state[PARITY + mover]:
+            return False
+
+    new_loc = neighbour(state, loc, dir)
+    if new_loc < 0 or new_loc == state[LOC + opposing]:
+        return False
+
+    opposing_side = state[PARITY + opposing]
+    if state[HEADER_SIZE + new_loc] & (EGG_A << opposing_side):
+        return False
+    if in_turd_zone(state, new_loc, TURD_A << opposing_side):
+        return False
+
+    if move_type == 0:
+        return True
+
+    side = state[PARITY + mover]
+    if state[HEADER_SIZE + loc] & ((EGG_A | TURD_A) << side):
+        return False
+
+    if move_type == 1:
+        return True
+
+    opposing_loc = state[LOC + opposing]
+    distance = abs(loc % dim - opposing_loc % dim) + abs(loc // dim - opposing_loc // dim)
+    return distance >= 2
+
+
+@njit
+def get_valid_moves(state, enemy, out):
+    """
+    Writes the valid moves, encoded as dir * 3 + move_type and in the same
+    order as Board.get_valid_moves, into out (length >= 12).
+
+    Returns:
+        (int): The number of valid moves.
+    """
+    count = 0
+    for dir in range(4):
+        for move_type in range(3):
+            if is_valid_move(state, dir, move_type, enemy):
+                out[count] = dir * 3 + move_type
+                count += 1
+    return count
+
+
+@njit
+def has_moves_left(state, enemy):
+    for dir in range(4):
+        for move_type in range(3):
+            if is_valid_move(state, dir, move_type, enemy):
+                return True
+    return False
+
+
+@njit
+def set_winner(state, result, reason):
+    state[WINNER] = result
+    state[WIN_REASON] = reason
+
+
+@njit
+def check_win(state, timeout_bounds):
+    """
+    Mirrors Board.check_win, with timeout_bounds in nanoseconds.
+    """
+    eggs_player = state[EGGS_LAID + PLAYER]
+    eggs_enemy = state[EGGS_LAID + ENEMY]
+    if state[TIME + PLAYER] <= 0:
+        if state[TIME + ENEMY] <= timeout_bounds:
+            set_winner(state, 2, 2)
+        else:
+            set_winner(state, 1, 2)
+    elif state[TIME + ENEMY] <= 0:
+        if state[TIME + PLAYER] <= timeout_bounds:
+            set_winner(state, 2, 2)
+        else:
+            set_winner(state, 0, 2)
+    elif state[TURNS_LEFT + PLAYER] == 0 and state[TURNS_LEFT + ENEMY] == 0:
+        if eggs_player < eggs_enemy:
+            set_winner(state, 1, 0)
+        elif eggs_player > eggs_enemy:
+            set_winner(state, 0, 0)
+        else:
+            set_winner(state, 2, 0)
+    elif state[CHICKEN_BLOCKED]:
+        if eggs_player < eggs_enemy:
+            set_winner(state, 1, 1)
+        elif eggs_player > eggs_enemy:
+            set_winner(state, 0, 1)
+        else:
+            set_winner(state, 2, 1)
+
+
+@njit
+def end_turn(state, timer):
+    """
+    Mirrors Board.end_turn, with timer in nanoseconds. No history is recorded.
+    """
+    state[TURN_COUNT] += 1
+    state[TURNS_LEFT + PLAYER] -= 1
+    state[TIME + PLAYER] -= timer
+
+    if not has_moves_left(state, True):
+        if state[TURNS_LEFT + ENEMY] > 0:
+            state[EGGS_LAID + PLAYER] += 2
+            state[CHICKEN_BLOCKED] = 1
+
+    check_win(state, TIMEOUT_BOUNDS)
+    state[IS_AS_TURN] = 1 - state[IS_AS_TURN]
+
+
+@njit
+def apply_move(state, dir, move_type, timer, check_ok):
+    """
+    Mirrors Board.apply_move, with timer in nanoseconds.
+
+    Returns:
+        (bool): True if the move was applied, False if it was invalid.
+    """
+    if check_ok:
+        if not is_valid_move(state, dir, move_type, False):
+            return False
+
+    loc = state[LOC + PLAYER]
+    new_loc = neighbour(state, loc, dir)
+    if new_loc < 0:
+        return False
+
+    dim = state[DIM]
+    side = state[PARITY + PLAYER]
+    if move_type == 1:
+        x = loc % dim
+        y = loc // dim
+        if (x == 0 or x == dim - 1) and (y == 0 or y == dim - 1):
+            state[EGGS_LAID + PLAYER] += state[CORNER_REWARD]
+        else:
+            state[EGGS_LAID + PLAYER] += 1
+        state[HEADER_SIZE + loc] |= EGG_A << side
+    elif move_type == 2:
+        state[TURDS_LEFT + PLAYER] -= 1
+        state[HEADER_SIZE + loc] |= TURD_A << side
+
+    state[LOC + PLAYER] = new_loc
+    end_turn(state, timer)
+    return True
+
+
+@njit
+def reverse_perspective(state):
+    """
+    Mirrors Board.reverse_perspective.
+    """
+    for field in range(LOC, HEADER_SIZE, 2):
+        player_value = state[field + PLAYER]
+        state[field + PLAYER] = state[field + ENEMY]
+        state[field + ENEMY] = player_value
+
+
+@njit
+def apply_trapdoor(state, cell):
+    """
+    Mirrors Board.apply_trapdoor for the trapdoor at cell.
+    """
+    state[LOC + PLAYER] = state[SPAWN + PLAYER]
+    state[EGGS_LAID + ENEMY] -= state[TRAPDOOR_PENALTY]
+    state[HEADER_SIZE + cell] |= FOUND_TRAPDOOR
+
+
+@njit
+def arbiter_result(state):
+    """
+    Converts the winner of a finished game into a ResultArbiter value,
+    the same way gameplay.play_game does.
+    """
+    winner = state[WINNER]
+    if winner == 2 or winner == NONE:
+        return 2
+    if state[IS_AS_TURN]:
+        return 1 if winner == 0 else 0
+    return 0 if winner == 0 else 1
+
+
+@njit
+def playout(state, trapdoors, seed):
+    """
+    Plays uniformly random moves from the position until the game ends,
+    following the turn loop of gameplay.play_game, including trapdoors.
+    The moves charge no time. The state is modified in place.
+
+    Parameters:
+        state (np.ndarray): The position to play out.
+        trapdoors (np.ndarray): The cells of the trapdoors.
+        seed (int): Seed for the random moves.
+
+    Returns:
+        (int): The ResultArbiter value of the game.
+    """
+    np.random.seed(seed)
+    moves = np.empty(12, dtype=np.int64)
+    while state[WINNER] == NONE:
+        count = get_valid_moves(state, False, moves)
+        if count == 0:
+            break
+        code = moves[np.random.randint(count)]
+        apply_move(state, code // 3, code % 3, 0, False)
+
+        loc = state[LOC + PLAYER]
+        for i in range(trapdoors.shape[0]):
+            if trapdoors[i] == loc:
+                apply_trapdoor(state, loc)
+                break
+
+        if state[WINNER] == NONE:
+            reverse_perspective(state)
+    return arbiter_result(state)
+
+
+def board_to_state(board: Board) -> np.ndarray:
+    """
+    Packs a Board into a flat state array.
+
+    Parameters:
+        board (Board): The board to convert. Both chickens must have been started.
+
+    Returns:
+        (np.ndarray): The int64 state array.
+    """
+    game_map = board.game_map
+    dim = game_map.MAP_SIZE
+    state = np.zeros(HEADER_SIZE + dim * dim, dtype=np.int64)
+
+    state[DIM] = dim
+    state[CORNER_REWARD] = game_map.CORNER_REWARD
+    state[TRAPDOOR_PENALTY] = game_map.TRAPDOOR_PENALTY
+    state[MAX_TURNS] = board.MAX_TURNS
+    state[TIME_TO_PLAY] = round(board.time_to_play * NS_PER_SECOND)
+    state[TURN_COUNT] = board.turn_count
+    state[WINNER] = NONE if board.winner is None else int(board.winner)
+    state[WIN_REASON] = NONE if board.win_reason is None else int(board.win_reason)
+    state[CHICKEN_BLOCKED] = int(board.chicken_blocked)
+    state[IS_AS_TURN] = int(board.is_as_turn)
+
+    for who, chicken, turns_left, time_left in (
+        (PLAYER, board.chicken_player, board.turns_left_player, board.player_time),
+        (ENEMY, board.chicken_enemy, board.turns_left_enemy, board.enemy_time),
+    ):
+        x, y = chicken.get_location()
+        state[LOC + who] = y * dim + x
+        x, y = chicken.get_spawn()
+        state[SPAWN + who] = y * dim + x
+        state[PARITY + who] = chicken.even_chicken
+        state[EGGS_LAID + who] = chicken.get_eggs_laid()
+        state[TURDS_LEFT + who] = chicken.get_turds_left()
+        state[TURNS_LEFT + who] = turns_left
+        state[TIME + who] = round(time_left * NS_PER_SECOND)
+
+    player_side = board.chicken_player.even_chicken
+    enemy_side = board.chicken_enemy.even_chicken
+    cells = state[HEADER_SIZE:]
+    for bits, flag in (
+        (board.eggs_player_bb, EGG_A << player_side),
+        (board.eggs_enemy_bb, EGG_A << enemy_side),
+        (board.turds_player_bb, TURD_A << player_side),
+        (board.turds_enemy_bb, TURD_A << enemy_side),
+        (board.found_trapdoors_bb, FOUND_TRAPDOOR),
+    ):
+        for index in range(dim * dim):
+            if (bits >> index) & 1:
+                cells[index] |= flag
+
+    return state
+
+
+def state_to_board(state: np.ndarray, game_map: GameMap = None) -> Board:
+    """
+    Builds a Board from a flat state array. The board does not build history.
+
+    Parameters:
+        state (np.ndarray): The state array.
+        game_map (GameMap, optional): The map for the board. If None, a new GameMap is made. Defaults to None.
+
+    Returns:
+        (Board): The board.
+    """
+    if game_map is None:
+        game_map = GameMap()
+    dim = int(state[DIM])
+
+    board = Board(game_map, int(state[TIME_TO_PLAY]) / NS_PER_SECOND)
+    board.MAX_TURNS = int(state[MAX_TURNS])
+    board.turn_count = int(state[TURN_COUNT])
+    board.winner = None if state[WINNER] == NONE else Result(int(state[WINNER]))
+    board.win_reason = (
+        None if state[WIN_REASON] == NONE else WinReason(int(state[WIN_REASON]))
+    )
+    board.chicken_blocked = bool(state[CHICKEN_BLOCKED])
+    board.is_as_turn = bool(state[IS_AS_TURN])
+
+    chickens = []
+    for who in (PLAYER, ENEMY):
+        chicken = Chicken(game_map.MAX_TURDS)
+        spawn = int(state[SPAWN + who])
+        loc = int(state[LOC + who])
+        chicken.start((spawn % dim, spawn // dim), int(state[PARITY + who]))
+        chicken.loc = (loc % dim, loc // dim)
+        chicken.eggs_laid = int(state[EGGS_LAID + who])
+        chicken.turds_left = int(state[TURDS_LEFT + who])
+        chickens.append(chicken)
+    board.chicken_player, board.chicken_enemy = chickens
+
+    board.turns_left_player = int(state[TURNS_LEFT + PLAYER])
+    board.turns_left_enemy = int(state[TURNS_LEFT + ENEMY])
+    board.player_time = int(state[TIME + PLAYER]) / NS_PER_SECOND
+    board.enemy_time = int(state[TIME + ENEMY]) / NS_PER_SECOND
+
+    player_side = int(state[PARITY + PLAYER])
+    enemy_side = int(state[PARITY + ENEMY])
+    for index in range(dim * dim):
+        cell = int(state[HEADER_SIZE + index])
+        bit = 1 << index
+        if cell & (EGG_A << player_side):
+            board.eggs_player_bb |= bit
+        if cell & (EGG_A << enemy_side):
+            board.eggs_enemy_bb |= bit
+        if cell & (TURD_A << player_side):
+            board.turds_player_bb |= bit
+        if cell & (TURD_A << enemy_side):
+            board.turds_enemy_bb |= bit
+        if cell & FOUND_TRAPDOOR:
+            board.found_trapdoors_bb |= bit
+
+    return board
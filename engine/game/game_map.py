@@ -1,5 +1,7 @@
 import numpy as np
 
+from game.bitboard import build_move_tables, edge_masks
+
 """
 For calculating the probability of hearing a sound based on the distance from the source.
 delta_x and delta_y are non-negative
@@ -30,6 +32,55 @@ def prob_feel(delta_x: int, delta_y: int):
     return 0.0
 
 
+# prob_hear and prob_feel are zero once either delta reaches SENSE_RANGE
+SENSE_RANGE = 3
+
+# Resident memory allowed for a player process and its children
+PLAYER_MEMORY_LIMIT_MB = 1536
+
+
+def build_delta_table(prob, size: int) -> np.ndarray:
+    """
+    Tabulates a sensing probability for every (delta_x, delta_y).
+
+    Parameters:
+        prob (Callable[[int, int], float]): prob_hear or prob_feel.
+        size (int): The number of deltas to tabulate along each axis.
+
+    Returns:
+        (np.ndarray): A read-only (size, size) array indexed [delta_x, delta_y].
+    """
+    table = np.array(
+        [[prob(delta_x, delta_y) for delta_y in range(size)] for delta_x in range(size)]
+    )
+    table.setflags(write=False)
+    return table
+
+
+def build_location_maps(delta_table: np.ndarray, dim: int) -> np.ndarray:
+    """
+    Expands a delta table into a likelihood map for every chicken location.
+
+    Parameters:
+        delta_table (np.ndarray): A table from build_delta_table covering at least dim deltas.
+        dim (int): The side length of the map.
+
+    Returns:
+        (np.ndarray): A read-only (dim, dim, dim, dim) array indexed [chicken_x, chicken_y, x, y],
+        giving the probability for a trapdoor at (x, y) sensed from (chicken_x, chicken_y).
+    """
+    coords = np.arange(dim)
+    delta = np.abs(coords[:, None] - coords[None, :])
+    maps = delta_table[delta[:, None, :, None], delta[None, :, None, :]]
+    maps.setflags(write=False)
+    return maps
+
+
+# (delta_x, delta_y) tables for callers without a GameMap; clamp deltas to SENSE_RANGE
+HEAR_TABLE = build_delta_table(prob_hear, SENSE_RANGE + 1)
+FEEL_TABLE = build_delta_table(prob_feel, SENSE_RANGE + 1)
+
+
 class GameMap:
     """
     GameMap is an internal utility class used by board to initialize
@@ -48,6 +99,25 @@ class GameMap:
         self.CORNER_REWARD = 3
         self.TRAPDOOR_PENALTY = -4
 
+        # masks for shifting bitboards without wrapping between rows
+        self.FULL_BB, self.NOT_LEFT_COL_BB, self.NOT_RIGHT_COL_BB = edge_masks(
+            self.MAP_SIZE
+        )
+
+        # per-cell move generation tables, indexed by bit index
+        self.NEIGHBOURS, self.ADJACENT_BB, self.CELL_PARITY = build_move_tables(
+            self.MAP_SIZE
+        )
+
+        # sensing probabilities, indexed [delta_x, delta_y]
+        self.HEAR_PROB = build_delta_table(prob_hear, self.MAP_SIZE)
+        self.FEEL_PROB = build_delta_table(prob_feel, self.MAP_SIZE)
+
+        # sensing probabilities of a trapdoor at (x, y) from every chicken location,
+        # indexed [chicken_x, chicken_y, x, y]
+        self.HEAR_MAPS = build_location_maps(self.HEAR_PROB, self.MAP_SIZE)
+        self.FEEL_MAPS = build_location_maps(self.FEEL_PROB, self.MAP_SIZE)
+
     def reflect(self, coords, symmetry):
         """
         Reflects coordinates across the map given a type of symmetry.
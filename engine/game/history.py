@@ -1,49 +1,162 @@
-
 import numpy as np
+
+# name, dtype and per-turn shape of every column recorded each round
+ROUND_COLUMNS = (
+    ("pos", np.int8, (2,)),
+    ("left_behind_enums", np.int8, ()),
+    ("a_eggs_laid", np.int16, ()),
+    ("b_eggs_laid", np.int16, ()),
+    ("a_turds_left", np.int8, ()),
+    ("b_turds_left", np.int8, ()),
+    ("a_time_left", np.float64, ()),
+    ("b_time_left", np.float64, ()),
+    ("a_moves_left", np.int16, ()),
+    ("b_moves_left", np.int16, ()),
+)
+
+# recorded by the game runner after each turn, with their own cursors since
+# they are also recorded for a turn whose move was rejected
+TURN_COLUMNS = (
+    ("trapdoor_triggered", np.int8, ()),
+    ("memory", np.int64, ()),
+)
+
+# stored in the memory column for turns whose memory was not measured
+NO_MEMORY = -1
+
+LEFT_BEHIND_NAMES = np.array(["plain", "egg", "turd"])
+
+COLUMN_TYPES = {name: (dtype, shape) for name, dtype, shape in ROUND_COLUMNS + TURN_COLUMNS}
+
+
+def _empty_column(name, capacity):
+    dtype, shape = COLUMN_TYPES[name]
+    fill = NO_MEMORY if name == "memory" else 0
+    return np.full((capacity,) + shape, fill, dtype=dtype)
+
+
+def _column(name, cursor):
+    # the recorded part of a column, as a view of its buffer
+    return property(lambda self: self.columns[name][: getattr(self, cursor)])
+
+
 class History:
     """
-    Internal utility for recording history used only by the game runner. 
+    Internal utility for recording history used only by the game runner.
     Do not call these functions, they will not be helpful to you.
+
+    Each column is a typed NumPy array preallocated for the whole game and filled
+    up to a cursor, so the columns can be exported without copying them.
     """
-    def __init__(self):
-        self.pos=[]
-        self.left_behind_enums=[]
-        self.a_eggs_laid=[]
-        self.b_eggs_laid=[]
-        self.a_turds_left=[]
-        self.b_turds_left=[]
-        self.a_time_left=[]
-        self.b_time_left=[]
-        self.a_moves_left=[]
-        self.b_moves_left=[]
-        self.trapdoor_triggered=[]
+    def __init__(self, max_turns=80):
+        """
+        Parameters:
+            max_turns (int, optional): The number of turns, of both players, to preallocate. Defaults to 80.
+        """
+        self.seed=None
+        self.a_peak_memory=None
+        self.b_peak_memory=None
+
+        # a rejected move can record one more turn than the game has
+        self.capacity = max_turns + 1
+        self.columns = {name: _empty_column(name, self.capacity) for name in COLUMN_TYPES}
+        # in ROUND_COLUMNS order, for record_round_update
+        self.round_columns = [self.columns[name] for name, _, _ in ROUND_COLUMNS]
+        self.turns=0
+        self.trapdoor_turns=0
+        self.memory_turns=0
+
+    pos = _column("pos", "turns")
+    left_behind_enums = _column("left_behind_enums", "turns")
+    a_eggs_laid = _column("a_eggs_laid", "turns")
+    b_eggs_laid = _column("b_eggs_laid", "turns")
+    a_turds_left = _column("a_turds_left", "turns")
+    b_turds_left = _column("b_turds_left", "turns")
+    a_time_left = _column("a_time_left", "turns")
+    b_time_left = _column("b_time_left", "turns")
+    a_moves_left = _column("a_moves_left", "turns")
+    b_moves_left = _column("b_moves_left", "turns")
+    trapdoor_triggered = _column("trapdoor_triggered", "trapdoor_turns")
+    memory = _column("memory", "memory_turns")
+
+    def grow(self):
+        # doubles every column if a game runs longer than preallocated
+        self.capacity *= 2
+        for name, column in self.columns.items():
+            grown = _empty_column(name, self.capacity)
+            grown[: len(column)] = column
+            self.columns[name] = grown
+        self.round_columns = [self.columns[name] for name, _, _ in ROUND_COLUMNS]
 
     def record_trapdoor(self, trigger_trap):
-        self.trapdoor_triggered.append(int(trigger_trap))
+        if self.trapdoor_turns == self.capacity:
+            self.grow()
+        self.columns["trapdoor_triggered"][self.trapdoor_turns] = trigger_trap
+        self.trapdoor_turns += 1
+
+    def record_memory(self, memory):
+        if self.memory_turns == self.capacity:
+            self.grow()
+        self.columns["memory"][self.memory_turns] = NO_MEMORY if memory is None else memory
+        self.memory_turns += 1
 
 
     def record_round_update(
-            self, loc, move_type, eggs_laid_a, eggs_laid_b, 
+            self, loc, move_type, eggs_laid_a, eggs_laid_b,
             turds_left_a, turds_left_b, time_left_a, time_left_b,
             moves_left_a, moves_left_b, is_as_turn):
-        self.pos.append(loc)
-        if(is_as_turn):
-            self.left_behind_enums.append(int(move_type))
-            self.a_eggs_laid.append(eggs_laid_a)
-            self.b_eggs_laid.append(eggs_laid_b)
-            self.a_turds_left.append(turds_left_a)
-            self.b_turds_left.append(turds_left_b)
-            self.a_time_left.append(time_left_a)
-            self.b_time_left.append(time_left_b)
-            self.a_moves_left.append(moves_left_a)
-            self.b_moves_left.append(moves_left_b)
-        else:
-            self.left_behind_enums.append(int(move_type))
-            self.a_eggs_laid.append(eggs_laid_b)
-            self.b_eggs_laid.append(eggs_laid_a)
-            self.a_turds_left.append(turds_left_b)
-            self.b_turds_left.append(turds_left_a)
-            self.a_time_left.append(time_left_b)
-            self.b_time_left.append(time_left_a)
-            self.a_moves_left.append(moves_left_b)
-            self.b_moves_left.append(moves_left_a)
\ No newline at end of file
+        turn = self.turns
+        if turn == self.capacity:
+            self.grow()
+        if not is_as_turn:
+            eggs_laid_a, eggs_laid_b = eggs_laid_b, eggs_laid_a
+            turds_left_a, turds_left_b = turds_left_b, turds_left_a
+            time_left_a, time_left_b = time_left_b, time_left_a
+            moves_left_a, moves_left_b = moves_left_b, moves_left_a
+        (
+            pos, left_behind_enums, a_eggs_laid, b_eggs_laid, a_turds_left,
+            b_turds_left, a_time_left, b_time_left, a_moves_left, b_moves_left,
+        ) = self.round_columns
+        pos[turn, 0] = loc[0]
+        pos[turn, 1] = loc[1]
+        left_behind_enums[turn] = move_type
+        a_eggs_laid[turn] = eggs_laid_a
+        b_eggs_laid[turn] = eggs_laid_b
+        a_turds_left[turn] = turds_left_a
+        b_turds_left[turn] = turds_left_b
+        a_time_left[turn] = time_left_a
+        b_time_left[turn] = time_left_b
+        a_moves_left[turn] = moves_left_a
+        b_moves_left[turn] = moves_left_b
+        self.turns = turn + 1
+
+    def get_memory_list(self):
+        """
+        Returns the memory column as a list, with None for turns that were not measured.
+        """
+        return [None if memory == NO_MEMORY else memory for memory in self.memory.tolist()]
+
+    def get_left_behind(self):
+        """
+        Returns the name of what was left behind each turn: "plain", "egg" or "turd".
+        """
+        return LEFT_BEHIND_NAMES[self.left_behind_enums]
+
+    def to_columns(self):
+        """
+        Returns every column as a one-dimensional array, trimmed to the turns
+        recorded with a move, e.g. for pandas.DataFrame. The arrays are views
+        of the history, not copies. pos is split into pos_x and pos_y.
+
+        Returns:
+            (Dict[str, np.ndarray]): The columns, by name.
+        """
+        turns = self.turns
+        columns = {
+            "pos_x": self.columns["pos"][:turns, 0],
+            "pos_y": self.columns["pos"][:turns, 1],
+        }
+        for name, (_, shape) in COLUMN_TYPES.items():
+            if shape == ():
+                columns[name] = self.columns[name][:turns]
+        return columns
@@ -4,7 +4,7 @@ import numpy as np
 
 from game.chicken import Chicken
 from game.enums import Cell, Direction, MoveType, Result, WinReason
-from game.game_map import GameMap, prob_feel, prob_hear
+from game.game_map import GameMap
 from game.history import History
 
 
@@ -14,42 +14,207 @@ def delta_locs(loc_a: Tuple[int, int], loc_b: Tuple[int, int]) -> Tuple[int, int
     return (abs(ax - bx), abs(ay - by))
 
 
-def choose_trapdoor(weights, parity) -> Tuple[int, int]:
+def choose_trapdoor(weights, parity, rng: np.random.Generator) -> Tuple[int, int]:
     dim = weights.shape[0]
     flattened = weights.flatten()
     i = 1
     j = parity
     while (i + j) % 2 != parity:
-        indx = np.random.choice(len(flattened), p=flattened)
+        indx = int(rng.choice(len(flattened), p=flattened))
         i = indx // dim
         j = indx % dim
     return (i, j)
 
 
-class TrapdoorManager:
+def trapdoor_prior(dim: int) -> np.ndarray:
+    """
+    Returns the distribution trapdoors are drawn from, before parity is taken into account.
+
+    Parameters:
+        dim (int): The side length of the map.
+
+    Returns:
+        (np.ndarray): A (dim, dim) array of probabilities indexed [x, y].
+    """
+    unnormalized = np.zeros((dim, dim))
+    unnormalized[2 : dim - 2, 2 : dim - 2] = 1.0
+    unnormalized[3 : dim - 3, 3 : dim - 3] = 2.0
+    return unnormalized / np.sum(unnormalized)
+
+
+class TrapdoorBelief:
+    """
+    TrapdoorBelief tracks the posterior over where each trapdoor is, for use by agents.
+    Posteriors are (dim, dim) arrays indexed [x, y], one for the even trapdoor
+    (parity 0) and one for the odd trapdoor (parity 1), matching the order of
+    the sensor data passed to play.
+
+    Call update once per turn with your location and sensor data, and mark_safe
+    for any cell a chicken stands on without being sent back to its spawn.
+    """
+
     def __init__(self, game_map: GameMap):
+        """
+        Initialises both posteriors from the prior used by TrapdoorManager.choose_trapdoors.
+
+        Parameters:
+            game_map (game_map.GameMap): The map of the game.
+        """
+        dim = game_map.MAP_SIZE
+        self.dim = dim
+
+        # likelihood of each (heard, felt) outcome for every trapdoor location,
+        # indexed [heard, felt, chicken_x, chicken_y, x, y]
+        hear = game_map.HEAR_MAPS
+        feel = game_map.FEEL_MAPS
+        self.likelihoods = np.stack(
+            [
+                np.stack([(1 - hear) * (1 - feel), (1 - hear) * feel]),
+                np.stack([hear * (1 - feel), hear * feel]),
+            ]
+        )
+
+        prior = trapdoor_prior(dim)
+        x, y = np.indices((dim, dim))
+        self.prior = np.stack([prior * ((x + y) % 2 == parity) for parity in range(2)])
+        self.prior /= self.prior.sum(axis=(1, 2), keepdims=True)
+        self.posteriors = self.prior.copy()
+
+    def update(self, loc: Tuple[int, int], sensor_data: List[Tuple[bool, bool]]):
+        """
+        Updates both posteriors with one turn's sensor readings.
+
+        Parameters:
+            loc (Tuple[int, int]): The location the readings were taken at,
+                i.e. the chicken's location when play was called.
+            sensor_data (List[Tuple[bool, bool]]): The (heard, felt) readings for the
+                even and then the odd trapdoor.
+        """
+        x, y = loc
+        for parity in range(2):
+            heard, felt = sensor_data[parity]
+            self.posteriors[parity] *= self.likelihoods[int(heard), int(felt), x, y]
+        self.normalize()
+
+    def mark_safe(self, loc: Tuple[int, int]):
+        """
+        Records that there is no trapdoor at a location.
+
+        Parameters:
+            loc (Tuple[int, int]): The (x, y) location known to be safe.
+        """
+        x, y = loc
+        self.posteriors[(x + y) % 2, x, y] = 0.0
+        self.normalize()
+
+    def set_found(self, loc: Tuple[int, int]):
+        """
+        Records that a trapdoor has been found, collapsing its posterior onto that location.
+
+        Parameters:
+            loc (Tuple[int, int]): The (x, y) location of the trapdoor.
+        """
+        x, y = loc
+        parity = (x + y) % 2
+        self.posteriors[parity] = 0.0
+        self.posteriors[parity, x, y] = 1.0
+
+    def normalize(self):
+        """
+        Renormalizes both posteriors. A posterior that has been ruled out everywhere,
+        which can only happen if it was given inconsistent information, is reset to the prior.
+        """
+        totals = self.posteriors.sum(axis=(1, 2), keepdims=True)
+        if totals.min() <= 0:
+            for parity in range(2):
+                if totals[parity] <= 0:
+                    self.posteriors[parity] = self.prior[parity]
+                    totals[parity] = 1.0
+        self.posteriors /= totals
+
+    def get_posterior(self, parity: int) -> np.ndarray:
+        """
+        Returns a copy of the posterior for one trapdoor.
+
+        Parameters:
+            parity (int): 0 for the even trapdoor, 1 for the odd trapdoor.
+
+        Returns:
+            (np.ndarray): A (dim, dim) array of probabilities indexed [x, y].
+        """
+        return self.posteriors[parity].copy()
+
+    def prob_trapdoor(self, loc: Tuple[int, int]) -> float:
+        """
+        Returns the probability that there is a trapdoor at a location.
+
+        Parameters:
+            loc (Tuple[int, int]): The (x, y) location.
+
+        Returns:
+            (float): The probability of a trapdoor at loc.
+        """
+        x, y = loc
+        return float(self.posteriors[(x + y) % 2, x, y])
+
+    def most_likely(self, parity: int) -> Tuple[int, int]:
+        """
+        Returns the most likely location of one trapdoor.
+
+        Parameters:
+            parity (int): 0 for the even trapdoor, 1 for the odd trapdoor.
+
+        Returns:
+            (Tuple[int, int]): The (x, y) location with the highest probability.
+        """
+        indx = int(np.argmax(self.posteriors[parity]))
+        return (indx // self.dim, indx % self.dim)
+
+
+class TrapdoorManager:
+    """
+    TrapdoorManager chooses the spawns and trapdoors of a match and samples the
+    players' sensors. All of its randomness comes from the match's seed, split into
+    one stream for setting up the map and one for sensor noise, so a match can be
+    replayed exactly from its seed.
+    """
+
+    def __init__(self, game_map: GameMap, seed: int = None):
+        """
+        Parameters:
+            game_map (game_map.GameMap): The map of the game.
+            seed (int, optional): The match's seed. If None, a fresh seed is drawn
+                and can be read back from the seed attribute. Defaults to None.
+        """
         self.game_map = game_map
         self.spawns = []
         self.trapdoors = []
 
+        seed_sequence = np.random.SeedSequence(seed)
+        self.seed = seed_sequence.entropy
+        map_sequence, sensor_sequence = seed_sequence.spawn(2)
+        self.map_rng = np.random.default_rng(map_sequence)
+        self.sensor_rng = np.random.default_rng(sensor_sequence)
+
     # choose_spawns should be called before choose trapdoor_weights
     def choose_spawns(self):
         if len(self.spawns) > 0:
             print("ERROR: choose_spawns called twice")
         dim = self.game_map.MAP_SIZE
-        edge = np.random.randint(0, 4)
+        rng = self.map_rng
+        edge = int(rng.integers(0, 4))
         if edge == 0:
-            i = np.random.randint(1, dim - 1)
+            i = int(rng.integers(1, dim - 1))
             j = 0
         elif edge == 1:
-            i = np.random.randint(1, dim - 1)
+            i = int(rng.integers(1, dim - 1))
             j = dim - 1
         elif edge == 2:
             i = 0
-            j = np.random.randint(1, dim - 1)
+            j = int(rng.integers(1, dim - 1))
         else:
             i = dim - 1
-            j = np.random.randint(1, dim - 1)
+            j = int(rng.integers(1, dim - 1))
 
         # First is random even, second is antipodal
         if (i + j) % 2 == 0:
@@ -73,25 +238,22 @@ class TrapdoorManager:
         if len(self.trapdoors) > 0:
             print("ERROR: choose_trapdoors called twice")
 
-        dim = self.game_map.MAP_SIZE
-        unnormalized = np.zeros((dim, dim))
-        unnormalized[2 : dim - 2, 2 : dim - 2] = 1.0
-        unnormalized[3 : dim - 3, 3 : dim - 3] = 2.0
-        normalized = unnormalized / np.sum(unnormalized)
-        even_trapdoor = choose_trapdoor(normalized, 0)
-        odd_trapdoor = choose_trapdoor(normalized, 1)
+        normalized = trapdoor_prior(self.game_map.MAP_SIZE)
+        even_trapdoor = choose_trapdoor(normalized, 0, self.map_rng)
+        odd_trapdoor = choose_trapdoor(normalized, 1, self.map_rng)
         self.trapdoors = [even_trapdoor, odd_trapdoor]
         return self.trapdoors.copy()
 
     def sample_trapdoors(self, loc: Tuple[int, int]) -> List[Tuple[bool, bool]]:
         result = []
+        hear_map = self.game_map.HEAR_MAPS[loc[0], loc[1]]
+        feel_map = self.game_map.FEEL_MAPS[loc[0], loc[1]]
         for door_indx in range(2):
             door = self.trapdoors[door_indx]
-            delta = delta_locs(loc, door)
-            hear_p = prob_hear(delta[0], delta[1])
-            did_hear = np.random.rand() < hear_p
-            feel_p = prob_feel(delta[0], delta[1])
-            did_feel = np.random.rand() < feel_p
+            hear_p = float(hear_map[door])
+            did_hear = self.sensor_rng.random() < hear_p
+            feel_p = float(feel_map[door])
+            did_feel = self.sensor_rng.random() < feel_p
             result.append((did_hear, did_feel))
         return result
 
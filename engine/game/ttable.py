@@ -0,0 +1,142 @@
+from array import array
+from enum import IntEnum
+from typing import Optional, Tuple
+
+from game.game_map import PLAYER_MEMORY_LIMIT_MB
+
+"""
+A fixed-size transposition table for search agents, keyed by Board.get_hash().
+Entries live in flat typed arrays rather than a dict, so the table's memory use
+is fixed when it is created and does not grow during the game.
+"""
+
+# key (8) + score (8) + depth, bound, move and generation (1 each)
+ENTRY_BYTES = 20
+
+# The table may use at most half of the player's memory limit
+MAX_TABLE_MB = PLAYER_MEMORY_LIMIT_MB // 2
+
+
+class Bound(IntEnum):
+    EXACT = 0
+    LOWER = 1
+    UPPER = 2
+
+
+class TranspositionTable:
+    """
+    TranspositionTable stores search results by position hash. Each bucket has two
+    slots: a depth-preferred slot that is only overwritten by an equal or deeper
+    search of the current generation, and an always-replace slot that takes
+    everything else. Call new_search at the start of every turn so that entries
+    from earlier turns are treated as stale and replaced first.
+
+    Moves are stored encoded as dir * 3 + move_type (see enums.encode_move),
+    with -1 for no move.
+    """
+
+    def __init__(self, size_mb: float = 64):
+        """
+        Allocates the table.
+
+        Parameters:
+            size_mb (float, optional): Memory to use for the table in MB. Capped at MAX_TABLE_MB,
+                and rounded down to a power of two number of buckets. Defaults to 64.
+        """
+        size_mb = min(size_mb, MAX_TABLE_MB)
+        max_buckets = max(1, int(size_mb * 1024 * 1024) // (2 * ENTRY_BYTES))
+        self.num_buckets = 1 << (max_buckets.bit_length() - 1)
+        self.mask = self.num_buckets - 1
+
+        slots = 2 * self.num_buckets
+        self.keys = array("Q", [0]) * slots
+        self.scores = array("d", [0.0]) * slots
+        self.depths = array("b", [0]) * slots
+        self.bounds = array("B", [0]) * slots
+        self.moves = array("b", [-1]) * slots
+        # generation 0 marks an empty slot
+        self.generations = array("B", [0]) * slots
+        self.generation = 1
+
+    def get_size_mb(self) -> float:
+        """
+        Returns the memory used by the table's entries in MB.
+
+        Returns:
+            (float): The size of the table in MB.
+        """
+        return 2 * self.num_buckets * ENTRY_BYTES / (1024 * 1024)
+
+    def new_search(self):
+        """
+        Starts a new generation. Entries from older generations can still be
+        probed but are the first to be replaced.
+        """
+        self.generation = self.generation % 255 + 1
+
+    def clear(self):
+        """
+        Empties the table.
+        """
+        slots = 2 * self.num_buckets
+        self.generations = array("B", [0]) * slots
+        self.generation = 1
+
+    def probe(self, key: int) -> Optional[Tuple[int, int, float, int]]:
+        """
+        Looks up a position.
+
+        Parameters:
+            key (int): The position hash, from Board.get_hash().
+
+        Returns:
+            (Tuple[int, int, float, int]): The stored (depth, bound, score, move), or None if the position is not stored.
+                The bound is returned as a plain int that compares equal to the matching Bound.
+        """
+        i = (key & self.mask) << 1
+        for slot in (i, i + 1):
+            if self.keys[slot] == key and self.generations[slot]:
+                return (
+                    self.depths[slot],
+                    self.bounds[slot],
+                    self.scores[slot],
+                    self.moves[slot],
+                )
+        return None
+
+    def store(
+        self, key: int, depth: int, bound: Bound, score: float, move: int = -1
+    ):
+        """
+        Stores a search result.
+
+        Parameters:
+            key (int): The position hash, from Board.get_hash().
+            depth (int): The depth that was searched, between 0 and 127.
+            bound (Bound): Whether score is exact, a lower bound or an upper bound.
+            score (float): The score of the position.
+            move (int, optional): The encoded best move, or -1 if there is none.
+                If -1, the best move already stored for this position is kept. Defaults to -1.
+        """
+        i = (key & self.mask) << 1
+        keys = self.keys
+        generations = self.generations
+
+        if (
+            keys[i] == key
+            or generations[i] != self.generation
+            or depth >= self.depths[i]
+        ):
+            slot = i
+        else:
+            slot = i + 1
+
+        if move < 0 and keys[slot] == key and generations[slot]:
+            move = self.moves[slot]
+
+        keys[slot] = key
+        self.scores[slot] = score
+        self.depths[slot] = depth
+        self.bounds[slot] = bound
+        self.moves[slot] = move
+        generations[slot] = self.generation
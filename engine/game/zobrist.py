@@ -0,0 +1,71 @@
+import random
+from functools import lru_cache
+
+"""
+Zobrist keys used by Board to maintain its position hash. Keys are indexed
+by absolute side (0 for player A, the even chicken, and 1 for player B) so that
+reversing the perspective of a board only flips PLAYER_IS_B.
+Keys come from a fixed seed, so every process computes the same hashes.
+"""
+
+ZOBRIST_SEED = 3600
+
+# counters (eggs laid, turds left, turns left) are keyed modulo this
+COUNTER_KEYS = 256
+
+
+class ZobristKeys:
+    """
+    Internal table of random 64-bit keys for one map size. Use zobrist_keys
+    to get the shared instance rather than building one yourself.
+    """
+
+    def __init__(self, dim: int, seed: int = ZOBRIST_SEED):
+        rng = random.Random(seed * 1000 + dim)
+
+        def table(n):
+            return tuple(rng.getrandbits(64) for _ in range(n))
+
+        cells = dim * dim
+        self.CHICKEN = (table(cells), table(cells))
+        self.EGG = (table(cells), table(cells))
+        self.TURD = (table(cells), table(cells))
+        self.EGGS_LAID = (table(COUNTER_KEYS), table(COUNTER_KEYS))
+        self.TURDS_LEFT = (table(COUNTER_KEYS), table(COUNTER_KEYS))
+        self.TURNS_LEFT = (table(COUNTER_KEYS), table(COUNTER_KEYS))
+        self.TRAPDOOR = table(cells)
+        self.B_TO_MOVE = rng.getrandbits(64)
+        self.PLAYER_IS_B = rng.getrandbits(64)
+
+
+@lru_cache(maxsize=None)
+def zobrist_keys(dim: int) -> ZobristKeys:
+    """
+    Returns the shared Zobrist keys for a map size.
+
+    Parameters:
+        dim (int): The side length of the map.
+
+    Returns:
+        (ZobristKeys): The keys for that map size.
+    """
+    return ZobristKeys(dim)
+
+
+def bits_key(bits: int, table) -> int:
+    """
+    XORs together the keys of every cell set in a bitboard.
+
+    Parameters:
+        bits (int): The bitboard.
+        table (tuple): The per-cell keys.
+
+    Returns:
+        (int): The combined key.
+    """
+    key = 0
+    while bits:
+        low = bits & -bits
+        key ^= table[low.bit_length() - 1]
+        bits ^= low
+    return key
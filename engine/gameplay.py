@@ -61,6 +61,20 @@ def print_moves(player_as_turn, moves, timer):
     print(f" in {timer:.3f} seconds")
 
 
+# prints the mean time per turn the engine spent around a player's moves
+def print_turn_timings(player_label, turn_timings):
+    if len(turn_timings) == 0:
+        return
+    means = {
+        part: sum(timing[part] for timing in turn_timings) / len(turn_timings) * 1000
+        for part in ("overhead", "command", "decode", "reply")
+    }
+    print(
+        f"{player_label} engine overhead: {means['overhead']:.3f} ms per turn "
+        f"(command {means['command']:.3f}, board {means['decode']:.3f}, reply {means['reply']:.3f})"
+    )
+
+
 def validate_submission(
     directory_a, player_a_name, limit_resources=False, use_gpu=False
 ):
@@ -174,6 +188,137 @@ def listen_for_output(output_queue, stop_event):
             continue  # No output yet, continue listening
 
 
+def setup_game(play_time, record, seed=None, match_writer=None):
+    """
+    Creates the board for a new game and places the spawns and trapdoors.
+
+    Parameters:
+        play_time (float): The time each player has for the whole game, in seconds.
+        record (bool): Whether the board should build a history.
+        seed (int, optional): The match's seed, recorded in the history. If None, a fresh seed is drawn. Defaults to None.
+        match_writer (MatchWriter, optional): If given, the match is streamed into its archive record. Needs record. Defaults to None.
+
+    Returns:
+        (Tuple[Board, TrapdoorManager, list, list]): The board, the trapdoor manager,
+        the spawns and the trapdoor locations.
+    """
+    map_to_play = GameMap()
+    trapdoor_manager = TrapdoorManager(map_to_play, seed)
+    game_board = Board(map_to_play, play_time, build_history=record)
+    if record:
+        game_board.get_history().seed = trapdoor_manager.seed
+    spawns = trapdoor_manager.choose_spawns()
+    trapdoor_locations = trapdoor_manager.choose_trapdoors()
+    game_board.chicken_player.start(spawns[0], 0)
+    game_board.chicken_enemy.start(spawns[1], 1)
+    if match_writer is not None:
+        if not record:
+            raise ValueError("Archiving a match needs its history to be recorded")
+        match_writer.begin(game_board, spawns, trapdoor_locations)
+    return game_board, trapdoor_manager, spawns, trapdoor_locations
+
+
+def apply_turn(
+    game_board,
+    trapdoor_manager,
+    moves,
+    timer,
+    player_label,
+    verbose=True,
+    turn_events=None,
+    memory=None,
+    match_writer=None,
+):
+    """
+    Applies the result of one player's turn to the board: the move itself,
+    or a loss if the player crashed, ran out of memory or timed out, and then
+    any trapdoor the chicken landed on.
+
+    Parameters:
+        game_board (Board): The board, from the perspective of the player whose turn it was.
+        trapdoor_manager (TrapdoorManager): The game's trapdoor manager.
+        moves (Tuple[Direction, MoveType]): The move the player returned, or None if it failed.
+        timer (float): The time the player took, or -1 for a crash and -2 for a memory error.
+        player_label (str): "A" or "B", used when printing.
+        verbose (bool, optional): Whether to print triggered trapdoors. Defaults to True.
+        turn_events (list, optional): If given, a valid move is appended to it as
+            (dir, move_type, timer, triggered_trapdoor), for player processes to replay. Defaults to None.
+        memory (int, optional): The player's memory use after the turn in bytes, recorded in the history. Defaults to None.
+        match_writer (MatchWriter, optional): If given, the turn is written to the match's archive record. Defaults to None.
+
+    Returns:
+        (bool): False if the player returned an invalid move, True otherwise.
+    """
+    if moves is None:
+        if timer == -1:
+            game_board.set_winner(Result.ENEMY, WinReason.CODE_CRASH)
+        elif timer == -2:
+            game_board.set_winner(Result.ENEMY, WinReason.MEMORY_ERROR)
+        else:
+            game_board.set_winner(Result.ENEMY, WinReason.TIMEOUT)
+        game_board.is_as_turn = not game_board.is_as_turn
+        return True
+
+    dir, move_type = moves
+
+    valid = game_board.apply_move(dir, move_type, timer=timer)
+
+    if not valid:
+        game_board.set_winner(Result.ENEMY, WinReason.INVALID_TURN)
+        game_board.is_as_turn = not game_board.is_as_turn
+    elif game_board.player_time <= 0:
+        game_board.set_winner(Result.ENEMY, WinReason.TIMEOUT)
+
+    # Check for trapdoor at new location
+    new_location = game_board.chicken_player.get_location()
+
+    triggered = trapdoor_manager.is_trapdoor(new_location)
+    if triggered:
+        game_board.apply_trapdoor(new_location)
+        if verbose:
+            print(
+                f"Triggered trapdoor at {new_location}, {player_label} returned to {game_board.chicken_player.get_location()}"
+            )
+    if game_board.build_history:
+        game_board.get_history().record_trapdoor(triggered)
+        game_board.get_history().record_memory(memory)
+        if match_writer is not None:
+            match_writer.write_turn(game_board.get_history())
+    if valid and turn_events is not None:
+        turn_events.append((int(dir), int(move_type), timer, triggered))
+    return valid
+
+
+def resolve_winner(game_board):
+    """
+    Converts the board's winner, which is relative to the player to move,
+    into an absolute result and stores it on the board.
+
+    Parameters:
+        game_board (Board): The finished board.
+
+    Returns:
+        (ResultArbiter): The winner of the game.
+    """
+    winner = ResultArbiter.TIE
+    win_result = game_board.get_winner()
+
+    # might seem reversed but this is correct due to the way apply_move works
+    if game_board.is_as_turn:
+        if win_result == Result.PLAYER:
+            winner = ResultArbiter.PLAYER_B
+        elif win_result == Result.ENEMY:
+            winner = ResultArbiter.PLAYER_A
+    else:
+        if win_result == Result.PLAYER:
+            winner = ResultArbiter.PLAYER_A
+        elif win_result == Result.ENEMY:
+            winner = ResultArbiter.PLAYER_B
+
+    game_board.set_winner(winner, game_board.win_reason)
+    return winner
+
+
 def play_game(
     directory_a,
     directory_b,
@@ -185,6 +330,10 @@ def play_game(
     record=True,
     limit_resources=False,
     use_gpu=False,
+    seed=None,
+    player_pool=None,
+    delta_turns=False,
+    match_writer=None,
 ):
     # setup main environment, import player modules
     import os
@@ -207,25 +356,15 @@ def play_game(
         init_timeout = 20
         play_time = 360
 
-    # setup main thread queue for getting results
-    main_q_a = Queue()
-    main_q_b = Queue()
-
-    # setup two thread queues for passing commands to players
-    player_a_q = Queue()
-    player_b_q = Queue()
-
     # game init
-    map_to_play = GameMap()
-    trapdoor_manager = TrapdoorManager(map_to_play)
-    game_board = Board(map_to_play, play_time, build_history=record)
-    spawns = trapdoor_manager.choose_spawns()
-    trapdoor_locations = trapdoor_manager.choose_trapdoors()
+    game_board, trapdoor_manager, spawns, trapdoor_locations = setup_game(
+        play_time, record, seed, match_writer
+    )
+    print(f"Seed: {trapdoor_manager.seed}")
     print(f"Trapdoors: {trapdoor_locations}")
-    game_board.chicken_player.start(spawns[0], 0)
-    game_board.chicken_enemy.start(spawns[1], 1)
 
-    out_queue = Queue()
+    # warm workers share the pool's output queue and keep their own command queues
+    out_queue = Queue() if player_pool is None else player_pool.out_queue
     stop_event = None
     if not limit_resources:
         stop_event = threading.Event()
@@ -235,58 +374,77 @@ def play_game(
         listener_thread.daemon = True
         listener_thread.start()
 
-    queues = [player_a_q, player_b_q, main_q_a, main_q_b]
-
-    # startup two player processes
-    player_a_process = PlayerProcess(
-        True,
-        player_a_name,
-        directory_a,
-        player_a_q,
-        main_q_a,
-        limit_resources,
-        use_gpu,
-        out_queue,
-        user_name="player_a_user",
-        group_name="player_a",
-    )
+    if player_pool is not None:
+        queues = []
+        player_a_process, success_a, message_a = player_pool.acquire(
+            directory_a, player_a_name, True
+        )
+        player_b_process, success_b, message_b = player_pool.acquire(
+            directory_b, player_b_name, False
+        )
+        if not success_a:
+            print(f"Player a crashed during initialization: {message_a}")
+        if not success_b:
+            print(f"Player b crashed during initialization: {message_b}")
+    else:
+        # setup main thread queue for getting results
+        main_q_a = Queue()
+        main_q_b = Queue()
 
-    player_b_process = PlayerProcess(
-        False,
-        player_b_name,
-        directory_b,
-        player_b_q,
-        main_q_b,
-        limit_resources,
-        use_gpu,
-        out_queue,
-        user_name="player_b_user",
-        group_name="player_b",
-    )
+        # setup two thread queues for passing commands to players
+        player_a_q = Queue()
+        player_b_q = Queue()
 
-    success_a = False
-    success_b = False
+        queues = [player_a_q, player_b_q, main_q_a, main_q_b]
 
-    message_a = ""
-    message_b = ""
+        # startup two player processes
+        player_a_process = PlayerProcess(
+            True,
+            player_a_name,
+            directory_a,
+            player_a_q,
+            main_q_a,
+            limit_resources,
+            use_gpu,
+            out_queue,
+            user_name="player_a_user",
+            group_name="player_a",
+        )
 
-    
+        player_b_process = PlayerProcess(
+            False,
+            player_b_name,
+            directory_b,
+            player_b_q,
+            main_q_b,
+            limit_resources,
+            use_gpu,
+            out_queue,
+            user_name="player_b_user",
+            group_name="player_b",
+        )
 
-    try:
-        player_a_process.start()
-        success_a = main_q_a.get(block=True, timeout=1)
-        player_a_process.pause_process_and_children()
-    except Exception as e:
-        message_a = traceback.format_exc()
-        print(f"Player a crashed during initialization: {message_a}")
+        success_a = False
+        success_b = False
 
-    try:
-        player_b_process.start()
-        success_b = main_q_b.get(block=True, timeout=1)
-        player_b_process.pause_process_and_children()
-    except Exception as e:
-        message_b = traceback.format_exc()
-        print(f"Player b crashed during initialization: {message_b}")
+        message_a = ""
+        message_b = ""
+
+        try:
+            player_a_process.start()
+            success_a = main_q_a.get(block=True, timeout=1)
+            player_a_process.pause_process_and_children()
+        except Exception as e:
+            message_a = traceback.format_exc()
+            print(f"Player a crashed during initialization: {message_a}")
+
+        try:
+            player_b_process.start()
+            success_b = main_q_b.get(block=True, timeout=1)
+            player_b_process.pause_process_and_children()
+        except Exception as e:
+            message_b = traceback.format_exc()
+            print(f"Player b crashed during initialization: {message_b}")
 
     if success_a and success_b:
         player_a_process.restart_process_and_children()
@@ -303,27 +461,49 @@ def play_game(
 
     if not success_a and not success_b:
         game_board.set_winner(ResultArbiter.TIE, WinReason.FAILED_INIT)
+        if match_writer is not None:
+            match_writer.finish(game_board, message_a, message_b)
         terminate_game(
-            player_a_process, player_b_process, queues, out_queue, stop_event
+            player_a_process,
+            player_b_process,
+            queues,
+            out_queue,
+            stop_event,
+            player_pool,
         )
-        return game_board, message_a, message_b
+        return game_board, trapdoor_locations, spawns, message_a, message_b
     elif not success_a:
         game_board.set_winner(ResultArbiter.PLAYER_B, WinReason.FAILED_INIT)
+        if match_writer is not None:
+            match_writer.finish(game_board, message_a, message_b)
         terminate_game(
-            player_a_process, player_b_process, queues, out_queue, stop_event
+            player_a_process,
+            player_b_process,
+            queues,
+            out_queue,
+            stop_event,
+            player_pool,
         )
-        return game_board, message_a, message_b
+        return game_board, trapdoor_locations, spawns, message_a, message_b
     elif not success_b:
         game_board.set_winner(ResultArbiter.PLAYER_A, WinReason.FAILED_INIT)
+        if match_writer is not None:
+            match_writer.finish(game_board, message_a, message_b)
         terminate_game(
-            player_a_process, player_b_process, queues, out_queue, stop_event
+            player_a_process,
+            player_b_process,
+            queues,
+            out_queue,
+            stop_event,
+            player_pool,
         )
-        return game_board, message_a, message_b
+        return game_board, trapdoor_locations, spawns, message_a, message_b
 
     # start actual gameplay
     #
     timer = 0
-    winner = ResultArbiter.TIE
+    # in delta mode, players are sent the turns played since their last turn instead of the board
+    turn_events = [] if delta_turns else None
     while (
         not game_board.is_game_over()
     ):
@@ -344,57 +524,47 @@ def play_game(
         if game_board.is_as_turn:
             # run a's turn
             player_label = "A"
+            player_process = player_a_process
             player_a_process.restart_process_and_children()
             moves, timer, message_a = player_a_process.run_timed_play(
-                game_board, samples, game_board.player_time, extra_ret_time
+                game_board,
+                samples,
+                game_board.player_time,
+                extra_ret_time,
+                turn_events,
             )
             player_a_process.pause_process_and_children()
 
         else:
             # run b's turn
             player_label = "B"
+            player_process = player_b_process
             player_b_process.restart_process_and_children()
             moves, timer, message_b = player_b_process.run_timed_play(
-                game_board, samples, game_board.player_time, extra_ret_time
+                game_board,
+                samples,
+                game_board.player_time,
+                extra_ret_time,
+                turn_events,
             )
             player_b_process.pause_process_and_children()
 
         if game_board.get_winner() is None:
-            if moves is None:
-                if timer == -1:
-                    game_board.set_winner(Result.ENEMY, WinReason.CODE_CRASH)
-                elif timer == -2:
-                    game_board.set_winner(Result.ENEMY, WinReason.MEMORY_ERROR)
-                else:
-                    game_board.set_winner(Result.ENEMY, WinReason.TIMEOUT)
-                game_board.is_as_turn = not game_board.is_as_turn
-            else:
-                dir, move_type = moves
-
-                valid = game_board.apply_move(dir, move_type, timer=timer)
-                
-                if not valid:
-                    message_b = "{moves}"
-                    game_board.set_winner(Result.ENEMY, WinReason.INVALID_TURN)
-                    game_board.is_as_turn = not game_board.is_as_turn
-                elif game_board.player_time <= 0:
-                    game_board.set_winner(Result.ENEMY, WinReason.TIMEOUT)
-
-                # Check for trapdoor at new location
-                new_location = game_board.chicken_player.get_location()
-
-                if trapdoor_manager.is_trapdoor(new_location):
-                    game_board.chicken_player.reset_location()
-                    print(
-                        f"Triggered trapdoor at {new_location}, {player_label} returned to {game_board.chicken_player.get_location()}"
-                    )
-                    game_board.chicken_enemy.increment_eggs_laid(
-                        -1 * game_board.game_map.TRAPDOOR_PENALTY
-                    )
-                    game_board.found_trapdoors.add(new_location)
-                    game_board.get_history().record_trapdoor(True)
+            if not apply_turn(
+                game_board,
+                trapdoor_manager,
+                moves,
+                timer,
+                player_label,
+                turn_events=turn_events,
+                memory=player_process.memory,
+                match_writer=match_writer,
+            ):
+                # the invalid move is reported as the mover's message
+                if player_label == "A":
+                    message_a = f"{moves}"
                 else:
-                    game_board.get_history().record_trapdoor(False)
+                    message_b = f"{moves}"
             # hack to deal with apply_move shenanigans
 
 
@@ -405,32 +575,29 @@ def play_game(
         if not game_board.is_game_over():
             game_board.reverse_perspective()
 
-    win_result = game_board.get_winner()
-
-    # might seem reversed but this is correct due to the way apply_move works
-    if game_board.is_as_turn:
-        if win_result == Result.PLAYER:
-            winner = ResultArbiter.PLAYER_B
-        elif win_result == Result.ENEMY:
-            winner = ResultArbiter.PLAYER_A
-    else:
-        if win_result == Result.PLAYER:
-            winner = ResultArbiter.PLAYER_A
-        elif win_result == Result.ENEMY:
-            winner = ResultArbiter.PLAYER_B
-
-    game_board.set_winner(winner, game_board.win_reason)
+    winner = resolve_winner(game_board)
+    if record:
+        game_board.get_history().a_peak_memory = player_a_process.peak_memory
+        game_board.get_history().b_peak_memory = player_b_process.peak_memory
+    if match_writer is not None:
+        match_writer.finish(game_board, message_a, message_b)
 
     if game_board.is_game_over():
         if display_game:
             print(f"{winner.name} wins by {game_board.get_win_reason().name}")
+            print_turn_timings("A", player_a_process.turn_timings)
+            print_turn_timings("B", player_b_process.turn_timings)
 
-    terminate_game(player_a_process, player_b_process, queues, out_queue, stop_event)
+    terminate_game(
+        player_a_process, player_b_process, queues, out_queue, stop_event, player_pool
+    )
     return game_board, trapdoor_locations, spawns, message_a, message_b
 
 
-# closes down player processes
-def terminate_game(process_a, process_b, queues, out_queue, stop_event):
+# closes down player processes, or hands them back to the pool they came from
+def terminate_game(
+    process_a, process_b, queues, out_queue, stop_event, player_pool=None
+):
     delete_module("player_a" + "." + "agent")
     delete_module("player_a")
     delete_module("player_b" + "." + "agent")
@@ -444,8 +611,12 @@ def terminate_game(process_a, process_b, queues, out_queue, stop_event):
         except:
             pass
 
-    process_a.terminate_process_and_children()
-    process_b.terminate_process_and_children()
+    if player_pool is not None:
+        player_pool.release(process_a)
+        player_pool.release(process_b)
+    else:
+        process_a.terminate_process_and_children()
+        process_b.terminate_process_and_children()
 
     for q in queues:
         try:
@@ -0,0 +1,256 @@
+import contextlib
+import importlib
+import os
+import pathlib
+import sys
+import time
+import traceback
+
+from game.enums import ResultArbiter, WinReason
+from gameplay import apply_turn, resolve_winner, setup_game
+
+"""
+Runs matches with both agents imported into the current process, using the
+same setup, turn loop, trapdoor handling and timing rules as gameplay.play_game
+but without player processes, queues or pausing. Agents are not sandboxed and
+cannot be interrupted, so only use this for trusted agents, e.g. self-play and
+regression testing.
+"""
+
+
+def load_agent(directory, player_name):
+    """
+    Imports an agent's PlayerAgent class.
+
+    Parameters:
+        directory (str): The folder containing the agent folders.
+        player_name (str): The name of the agent's folder.
+
+    Returns:
+        (type): The agent's PlayerAgent class.
+    """
+    if not directory in sys.path:
+        sys.path.append(directory)
+    importlib.import_module(player_name)
+    module = importlib.import_module(player_name + ".agent")
+    return module.PlayerAgent
+
+
+def get_cur_time():
+    return time.perf_counter()
+
+
+class InProcessMatch:
+    """
+    InProcessMatch plays games between two PlayerAgent classes in the current
+    process. Each call to play runs one new game with fresh agents and returns
+    the same values as gameplay.play_game, so the result can be passed straight
+    to board_utils.get_history_json.
+    """
+
+    def __init__(
+        self,
+        agent_a,
+        agent_b,
+        record=True,
+        quiet=True,
+        play_time=360,
+        init_timeout=20,
+    ):
+        """
+        Parameters:
+            agent_a (type): The PlayerAgent class playing as A.
+            agent_b (type): The PlayerAgent class playing as B.
+            record (bool, optional): Whether to build the game history. Defaults to True.
+            quiet (bool, optional): Whether to discard everything the agents print. Defaults to True.
+            play_time (float, optional): Each player's time for the whole game, in seconds. Defaults to 360.
+            init_timeout (float, optional): The time allowed for each agent's constructor, in seconds. Defaults to 20.
+        """
+        self.agent_a = agent_a
+        self.agent_b = agent_b
+        self.record = record
+        self.quiet = quiet
+        self.play_time = play_time
+        self.init_timeout = init_timeout
+
+    def run_timed_constructor(self, agent_class, game_board):
+        """
+        Constructs an agent, applying the same rules as PlayerProcess.run_timed_constructor.
+
+        Returns:
+            (Tuple[PlayerAgent, bool, str]): The agent, whether construction succeeded and an error message.
+        """
+        temp_board = game_board.get_copy(False, True)
+        timeout = self.init_timeout
+        start = get_cur_time()
+
+        def time_left_func():
+            return timeout - (get_cur_time() - start)
+
+        try:
+            player = agent_class(temp_board, time_left_func)
+        except:
+            return None, False, traceback.format_exc()
+        timer = get_cur_time() - start
+
+        if timer < timeout:
+            return player, True, ""
+        return player, False, "Timeout"
+
+    def run_timed_play(self, player, game_board, trapdoor_samples):
+        """
+        Asks an agent for a move, applying the same rules as PlayerProcess.run_timed_play.
+
+        Returns:
+            (Tuple[Tuple[Direction, MoveType], float, str]): The move, the time taken and an error message.
+            The move is None and the time is -1 if the agent crashed.
+        """
+        temp_board = game_board.get_copy(False, True)
+        timeout = game_board.player_time
+        start = get_cur_time()
+
+        def time_left_func():
+            return timeout - (get_cur_time() - start)
+
+        try:
+            moves = player.play(temp_board, trapdoor_samples, time_left_func)
+        except:
+            return None, -1, traceback.format_exc()
+        timer = get_cur_time() - start
+
+        if moves is None:
+            return None, -1, ""
+        if timer < timeout:
+            return moves, timer, ""
+        return None, timeout, "Timeout"
+
+    def play(self, seed=None, match_writer=None):
+        """
+        Plays one game.
+
+        Parameters:
+            seed (int, optional): The match's seed. If None, a fresh seed is drawn. Defaults to None.
+            match_writer (MatchWriter, optional): If given, the match is streamed into its archive record. Defaults to None.
+
+        Returns:
+            (Tuple[Board, list, list, str, str]): The final board, the trapdoor locations,
+            the spawns and the error messages of players A and B.
+        """
+        game_board, trapdoor_manager, spawns, trapdoor_locations = setup_game(
+            self.play_time, self.record, seed, match_writer
+        )
+
+        if self.quiet:
+            with open(os.devnull, "w") as devnull:
+                with contextlib.redirect_stdout(devnull):
+                    message_a, message_b = self.run_game(
+                        game_board, trapdoor_manager, match_writer
+                    )
+        else:
+            message_a, message_b = self.run_game(
+                game_board, trapdoor_manager, match_writer
+            )
+        if match_writer is not None:
+            match_writer.finish(game_board, message_a, message_b)
+
+        return game_board, trapdoor_locations, spawns, message_a, message_b
+
+    def run_game(self, game_board, trapdoor_manager, match_writer=None):
+        """
+        Constructs both agents and plays the game out on the given board.
+
+        Returns:
+            (Tuple[str, str]): The error messages of players A and B.
+        """
+        player_a, success_a, message_a = self.run_timed_constructor(
+            self.agent_a, game_board
+        )
+        player_b, success_b, message_b = self.run_timed_constructor(
+            self.agent_b, game_board
+        )
+
+        if not success_a and not success_b:
+            game_board.set_winner(ResultArbiter.TIE, WinReason.FAILED_INIT)
+            return message_a, message_b
+        elif not success_a:
+            game_board.set_winner(ResultArbiter.PLAYER_B, WinReason.FAILED_INIT)
+            return message_a, message_b
+        elif not success_b:
+            game_board.set_winner(ResultArbiter.PLAYER_A, WinReason.FAILED_INIT)
+            return message_a, message_b
+
+        while not game_board.is_game_over():
+            # The game board has already set the proper player as checking_player
+            player_location = game_board.chicken_player.get_location()
+            samples = trapdoor_manager.sample_trapdoors(player_location)
+
+            if game_board.is_as_turn:
+                player_label = "A"
+                moves, timer, message_a = self.run_timed_play(
+                    player_a, game_board, samples
+                )
+            else:
+                player_label = "B"
+                moves, timer, message_b = self.run_timed_play(
+                    player_b, game_board, samples
+                )
+
+            if game_board.get_winner() is None:
+                if not apply_turn(
+                    game_board,
+                    trapdoor_manager,
+                    moves,
+                    timer,
+                    player_label,
+                    verbose=False,
+                    match_writer=match_writer,
+                ):
+                    # the invalid move is reported as the mover's message
+                    if player_label == "A":
+                        message_a = f"{moves}"
+                    else:
+                        message_b = f"{moves}"
+
+            if not game_board.is_game_over():
+                game_board.reverse_perspective()
+
+        resolve_winner(game_board)
+        return message_a, message_b
+
+
+def main():
+    if len(sys.argv) not in (3, 4):
+        print(f"Usage: python3 {sys.argv[0]} <player_a_name> <player_b_name> [num_games]")
+        sys.exit(1)
+
+    top_level = pathlib.Path(__file__).parent.parent.resolve()
+    play_directory = os.path.join(top_level, "3600-agents")
+
+    player_a_name = sys.argv[1]
+    player_b_name = sys.argv[2]
+    num_games = int(sys.argv[3]) if len(sys.argv) == 4 else 100
+
+    match = InProcessMatch(
+        load_agent(play_directory, player_a_name),
+        load_agent(play_directory, player_b_name),
+        record=False,
+    )
+
+    results = {winner: 0 for winner in ResultArbiter}
+    sim_time = time.perf_counter()
+    for seed in range(num_games):
+        final_board = match.play(seed)[0]
+        results[final_board.get_winner()] += 1
+    sim_time = time.perf_counter() - sim_time
+
+    print(
+        f"A wins: {results[ResultArbiter.PLAYER_A]}, B wins: {results[ResultArbiter.PLAYER_B]}, "
+        f"ties: {results[ResultArbiter.TIE]}"
+    )
+    print(
+        f"{num_games} games in {sim_time:.2f} seconds, {num_games / sim_time * 60:.0f} games per minute."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,557 @@
+import fcntl
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+
+from board_utils import build_history_dict, encode_history_dict
+from game.history import NO_MEMORY, ROUND_COLUMNS, TURN_COLUMNS, History
+
+"""
+An append-only archive of many matches in one binary file, used instead of one
+JSON file per match. Every match takes a fixed-size record: a header with the
+players, seed, spawns, trapdoors and result, followed by one fixed-width row per
+turn holding the History columns. Matches are written while they are played, so
+the turns of a match that was interrupted are kept.
+
+Several processes can append to the same archive, e.g. tournament workers: a
+record is allocated under a file lock and then only written by the process that
+allocated it. Error logs have no fixed size, so they go to a JSON lines file
+next to the archive.
+
+ArchiveReader maps an archive for bulk analysis. Run this module to convert
+archived matches to the renderer's JSON.
+"""
+
+MAGIC = b"CHKNARCH"
+VERSION = 1
+
+# every match has room for this many turns, two per round plus a rejected move
+MAX_ROWS = 81
+
+# magic, version, rows per record and record size, padded to 64 bytes
+FILE_HEADER = struct.Struct("<8sHHI44x")
+
+ROW_DTYPE = np.dtype(
+    [(name, dtype, shape) for name, dtype, shape in ROUND_COLUMNS + TURN_COLUMNS]
+)
+
+# status of a record
+ALLOCATED = 0
+IN_PROGRESS = 1
+FINISHED = 2
+
+NONE = -1
+
+# the edge of the board a spawn is on, see ArchiveReader.spawn_edges
+EDGES = ("top", "bottom", "left", "right")
+
+RECORD_DTYPE = np.dtype(
+    [
+        ("status", np.uint8),
+        ("has_errlog", np.bool_),
+        # low and high 64 bits of the match's seed
+        ("seed", np.uint64, (2,)),
+        ("player_a", "S32"),
+        ("player_b", "S32"),
+        ("spawn_a", np.int8, (2,)),
+        ("spawn_b", np.int8, (2,)),
+        ("trapdoors", np.int8, (2, 2)),
+        ("start_time", np.float64),
+        ("start_moves", np.int16),
+        ("turn_count", np.int16),
+        # ResultArbiter and WinReason values, NONE until the match is finished
+        ("result", np.int8),
+        ("reason", np.int8),
+        ("a_peak_memory", np.int64),
+        ("b_peak_memory", np.int64),
+        # how many rows of each History column were recorded
+        ("turns", np.uint8),
+        ("trapdoor_turns", np.uint8),
+        ("memory_turns", np.uint8),
+        ("rows", ROW_DTYPE, (MAX_ROWS,)),
+    ]
+)
+
+
+def get_errlog_path(path):
+    return path + ".errlogs.jsonl"
+
+
+def read_file_header(fp):
+    """
+    Reads and checks an archive's header.
+
+    Raises:
+        ValueError: If the file is not an archive in this format.
+    """
+    header = fp.read(FILE_HEADER.size)
+    if len(header) != FILE_HEADER.size:
+        raise ValueError("Not a match archive: file too short")
+    magic, version, max_rows, record_size = FILE_HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ValueError("Not a match archive")
+    if (
+        version != VERSION
+        or max_rows != MAX_ROWS
+        or record_size != RECORD_DTYPE.itemsize
+    ):
+        raise ValueError(
+            f"Match archive has version {version} with {max_rows} rows of {record_size} bytes, "
+            f"expected version {VERSION} with {MAX_ROWS} rows of {RECORD_DTYPE.itemsize} bytes"
+        )
+
+
+def load_records(path):
+    """
+    Maps every record of an archive into memory, read-only.
+
+    Parameters:
+        path (str): The archive.
+
+    Returns:
+        (np.memmap): The records, with dtype RECORD_DTYPE. Records still being
+        written have status IN_PROGRESS.
+    """
+    with open(path, "rb") as fp:
+        read_file_header(fp)
+        count = (os.fstat(fp.fileno()).st_size - FILE_HEADER.size) // RECORD_DTYPE.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(
+        path, dtype=RECORD_DTYPE, mode="r", offset=FILE_HEADER.size, shape=(count,)
+    )
+
+
+def load_errlogs(path):
+    """
+    Returns the error logs of an archive's matches, by record index.
+    """
+    errlogs = {}
+    errlog_path = get_errlog_path(path)
+    if not os.path.exists(errlog_path):
+        return errlogs
+    with open(errlog_path) as fp:
+        for line in fp:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            errlogs[entry["record"]] = (entry["errlog_a"], entry["errlog_b"])
+    return errlogs
+
+
+def get_seed(record):
+    return int(record["seed"][0]) | (int(record["seed"][1]) << 64)
+
+
+def get_history(record):
+    """
+    Rebuilds the History of an archived match.
+    """
+    history = History(MAX_ROWS - 1)
+    rows = record["rows"]
+    for name in ROW_DTYPE.names:
+        history.columns[name][:] = rows[name]
+    history.turns = int(record["turns"])
+    history.trapdoor_turns = int(record["trapdoor_turns"])
+    history.memory_turns = int(record["memory_turns"])
+    history.seed = get_seed(record)
+    for name in ("a_peak_memory", "b_peak_memory"):
+        if record[name] != NO_MEMORY:
+            setattr(history, name, int(record[name]))
+    return history
+
+
+def get_record_dict(record, errlog_a="", errlog_b=""):
+    """
+    Builds the renderer's view of an archived match, as board_utils.get_history_dict does.
+
+    Raises:
+        ValueError: If the match was not finished.
+    """
+    if record["status"] != FINISHED:
+        raise ValueError("Match was not finished")
+    return build_history_dict(
+        get_history(record),
+        record["trapdoors"].tolist(),
+        [record["spawn_a"].tolist(), record["spawn_b"].tolist()],
+        errlog_a,
+        errlog_b,
+        float(record["start_time"]),
+        int(record["start_moves"]),
+        int(record["turn_count"]),
+        int(record["result"]),
+        int(record["reason"]),
+    )
+
+
+class ArchiveReader:
+    """
+    ArchiveReader gives the matches of an archive as NumPy arrays for bulk analysis.
+    rows holds each History column with shape (matches, MAX_ROWS), e.g.
+    rows["a_eggs_laid"][m, t] is player A's eggs after turn t of match m, and
+    rows["pos"] has shape (matches, MAX_ROWS, 2). Rows after a match's last turn
+    are zero, so mask them with turn_mask. records holds the header fields, e.g.
+    records["result"] and records["spawn_a"], one per match.
+
+    A reader opened on a file maps it, so its arrays are views of the file rather
+    than copies. filter returns a reader on a copy of the selected matches, unless
+    they are selected with a slice.
+    """
+
+    def __init__(self, records):
+        """
+        Parameters:
+            records (np.ndarray): The records to analyse, with dtype RECORD_DTYPE.
+        """
+        # a plain view, since indexing a memmap is slow
+        self.records = records.view(np.ndarray)
+        self.rows = self.records["rows"]
+
+    @classmethod
+    def open(cls, path, include_unfinished=False):
+        """
+        Maps an archive.
+
+        Parameters:
+            path (str): The archive.
+            include_unfinished (bool, optional): Whether to include matches that are
+                still being played or were interrupted. Defaults to False.
+
+        Returns:
+            (ArchiveReader): A reader on the archive's matches.
+        """
+        reader = cls(load_records(path))
+        if include_unfinished:
+            return reader
+        finished = reader.records["status"] == FINISHED
+        count = int(finished.sum())
+        # matches still being played are usually the last ones, which a slice drops
+        if finished[:count].all():
+            return reader.filter(slice(0, count))
+        return reader.filter(finished)
+
+    def __len__(self):
+        return len(self.records)
+
+    def filter(self, mask):
+        """
+        Selects matches.
+
+        Parameters:
+            mask (np.ndarray | slice): A boolean per match, the indices of the matches to keep, or a slice.
+
+        Returns:
+            (ArchiveReader): A reader on the selected matches.
+        """
+        return ArchiveReader(self.records[mask])
+
+    def played_by(self, agent, player=None):
+        """
+        Returns which matches an agent played in.
+
+        Parameters:
+            agent (str): The agent's name.
+            player (str, optional): "a" or "b" to only count matches where the agent
+                played that side. Defaults to None, for either side.
+
+        Returns:
+            (np.ndarray): A boolean per match.
+        """
+        name = agent.encode()[:32]
+        as_a = self.records["player_a"] == name
+        as_b = self.records["player_b"] == name
+        if player == "a":
+            return as_a
+        if player == "b":
+            return as_b
+        return as_a | as_b
+
+    def turn_mask(self, name="pos"):
+        """
+        Returns which rows of a column were recorded.
+
+        Parameters:
+            name (str, optional): The column. Defaults to "pos".
+
+        Returns:
+            (np.ndarray): A boolean of shape (matches, MAX_ROWS).
+        """
+        if name == "trapdoor_triggered":
+            turns = self.records["trapdoor_turns"]
+        elif name == "memory":
+            turns = self.records["memory_turns"]
+        else:
+            turns = self.records["turns"]
+        return np.arange(MAX_ROWS) < turns[:, None]
+
+    def mean_by_turn(self, name):
+        """
+        Averages a column over the matches that reached each turn.
+
+        Parameters:
+            name (str): A one-dimensional column, e.g. "a_eggs_laid".
+
+        Returns:
+            (np.ndarray): The mean for each turn, NaN for turns no match reached.
+        """
+        mask = self.turn_mask(name)
+        totals = np.where(mask, self.rows[name], 0).sum(axis=0, dtype=np.float64)
+        counts = mask.sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(counts > 0, totals / counts, np.nan)
+
+    def egg_curves(self):
+        """
+        Returns the mean eggs laid by players A and B after each turn.
+
+        Returns:
+            (Tuple[np.ndarray, np.ndarray]): The curves of A and B.
+        """
+        return self.mean_by_turn("a_eggs_laid"), self.mean_by_turn("b_eggs_laid")
+
+    def trapdoor_frequency(self):
+        """
+        Returns how often moves triggered a trapdoor.
+
+        Returns:
+            (Tuple[float, np.ndarray]): The fraction of all recorded turns, and the fraction for each turn.
+        """
+        mask = self.turn_mask("trapdoor_triggered")
+        total = mask.sum()
+        triggered = np.where(mask, self.rows["trapdoor_triggered"], 0).sum()
+        overall = float(triggered / total) if total > 0 else float("nan")
+        return overall, self.mean_by_turn("trapdoor_triggered")
+
+    def spawn_edges(self, player="a", map_size=8):
+        """
+        Returns the edge each match's spawn is on, as an index into EDGES.
+
+        Parameters:
+            player (str, optional): "a" or "b". Defaults to "a".
+            map_size (int, optional): The board's width. Defaults to 8.
+
+        Returns:
+            (np.ndarray): The edge of each match.
+        """
+        spawn = self.records["spawn_a" if player == "a" else "spawn_b"]
+        x = spawn[:, 0]
+        y = spawn[:, 1]
+        return np.select(
+            [y == 0, y == map_size - 1, x == 0], [0, 1, 2], default=3
+        )
+
+    def win_rates(self, keys):
+        """
+        Tallies results by a key per match.
+
+        Parameters:
+            keys (np.ndarray): The key of each match, e.g. from spawn_edges.
+
+        Returns:
+            (Dict[object, Tuple[float, float, float, int]]): For each key, the fraction of
+            its matches won by A, won by B and tied, and its number of matches.
+        """
+        values, inverse = np.unique(keys, return_inverse=True)
+        # ResultArbiter values, with errors and unfinished matches (NONE, which is
+        # negative) counted in the matches only
+        results = self.records["result"].astype(np.int64)
+        results = np.where(results < 0, 3, results)
+        counts = np.bincount(
+            inverse.ravel() * 4 + results, minlength=len(values) * 4
+        ).reshape(len(values), 4)
+        rates = {}
+        for value, (a_wins, b_wins, ties, errors) in zip(values.tolist(), counts.tolist()):
+            matches = a_wins + b_wins + ties + errors
+            rates[value] = (a_wins / matches, b_wins / matches, ties / matches, matches)
+        return rates
+
+    def win_rates_by_spawn_edge(self, map_size=8):
+        """
+        Returns win_rates keyed by the edge name of player A's spawn.
+        """
+        rates = self.win_rates(self.spawn_edges("a", map_size))
+        return {EDGES[edge]: rate for edge, rate in rates.items()}
+
+
+class MatchArchive:
+    """
+    MatchArchive appends matches to an archive file, creating it if needed.
+    Each match is written through the MatchWriter returned by new_match.
+    """
+
+    def __init__(self, path):
+        """
+        Parameters:
+            path (str): The archive.
+
+        Raises:
+            ValueError: If the file exists but is not an archive in this format.
+        """
+        self.path = path
+        with open(path, "a+b") as fp:
+            fcntl.flock(fp, fcntl.LOCK_EX)
+            if os.fstat(fp.fileno()).st_size == 0:
+                fp.write(
+                    FILE_HEADER.pack(MAGIC, VERSION, MAX_ROWS, RECORD_DTYPE.itemsize)
+                )
+            else:
+                fp.seek(0)
+                read_file_header(fp)
+
+    def new_match(self, player_a, player_b):
+        """
+        Allocates a record for a new match.
+
+        Parameters:
+            player_a (str): The name of player A.
+            player_b (str): The name of player B.
+
+        Returns:
+            (MatchWriter): The writer of the match's record.
+        """
+        with open(self.path, "r+b") as fp:
+            fcntl.flock(fp, fcntl.LOCK_EX)
+            size = os.fstat(fp.fileno()).st_size
+            index = (size - FILE_HEADER.size) // RECORD_DTYPE.itemsize
+            # extending the file fills the record with zeros, so a record is never half allocated
+            os.ftruncate(
+                fp.fileno(), FILE_HEADER.size + (index + 1) * RECORD_DTYPE.itemsize
+            )
+        return MatchWriter(self, index, player_a, player_b)
+
+    def write_errlogs(self, index, errlog_a, errlog_b):
+        with open(get_errlog_path(self.path), "a") as fp:
+            fcntl.flock(fp, fcntl.LOCK_EX)
+            fp.write(
+                json.dumps({"record": index, "errlog_a": errlog_a, "errlog_b": errlog_b})
+                + "\n"
+            )
+
+
+class MatchWriter:
+    """
+    MatchWriter streams one match into its record of an archive: begin when the
+    board is set up, write_turn after each turn and finish once the winner is known.
+    """
+
+    def __init__(self, archive, index, player_a, player_b):
+        self.archive = archive
+        self.index = index
+        self.mmap = np.memmap(
+            archive.path,
+            dtype=RECORD_DTYPE,
+            mode="r+",
+            offset=FILE_HEADER.size + index * RECORD_DTYPE.itemsize,
+            shape=(1,),
+        )
+        # plain views of the mapping, since indexing a memmap is slow
+        self.record = self.mmap.view(np.ndarray)
+        rows = self.record["rows"][0]
+        self.rows = {name: rows[name] for name in ROW_DTYPE.names}
+        self.record["player_a"] = player_a.encode()[:32]
+        self.record["player_b"] = player_b.encode()[:32]
+        self.record["result"] = NONE
+        self.record["reason"] = NONE
+        self.record["a_peak_memory"] = NO_MEMORY
+        self.record["b_peak_memory"] = NO_MEMORY
+        self.rows_written = 0
+
+    def begin(self, board, spawns, trapdoors):
+        """
+        Records the setup of the match.
+
+        Parameters:
+            board (Board): The board, with its history and the history's seed set.
+            spawns (list): The spawns of players A and B.
+            trapdoors (list): The two trapdoor locations.
+        """
+        seed = board.get_history().seed
+        if seed is None or seed < 0 or seed >= 1 << 128:
+            raise ValueError(f"Seed {seed} cannot be archived")
+        self.record["seed"] = (seed & ((1 << 64) - 1), seed >> 64)
+        self.record["spawn_a"] = spawns[0]
+        self.record["spawn_b"] = spawns[1]
+        self.record["trapdoors"] = trapdoors
+        self.record["start_time"] = board.time_to_play
+        self.record["start_moves"] = board.MAX_TURNS
+        self.record["status"] = IN_PROGRESS
+
+    def write_turn(self, history):
+        """
+        Writes the rows recorded since the last call.
+
+        Parameters:
+            history (History): The match's history.
+        """
+        recorded = max(history.turns, history.trapdoor_turns, history.memory_turns)
+        if recorded > MAX_ROWS:
+            raise ValueError(f"Match has more than {MAX_ROWS} turns")
+        # the last row may have been written before all of its columns were recorded
+        start = max(self.rows_written - 1, 0)
+        for name, rows in self.rows.items():
+            rows[start:recorded] = history.columns[name][start:recorded]
+        self.record["turns"] = history.turns
+        self.record["trapdoor_turns"] = history.trapdoor_turns
+        self.record["memory_turns"] = history.memory_turns
+        self.rows_written = recorded
+
+    def finish(self, board, errlog_a="", errlog_b=""):
+        """
+        Records the outcome of the match and closes the record.
+
+        Parameters:
+            board (Board): The finished board, after gameplay.resolve_winner.
+            errlog_a (str, optional): Player A's error log. Defaults to "".
+            errlog_b (str, optional): Player B's error log. Defaults to "".
+        """
+        history = board.get_history()
+        self.write_turn(history)
+        self.record["turn_count"] = board.turn_count
+        self.record["result"] = NONE if board.winner is None else int(board.winner)
+        self.record["reason"] = NONE if board.win_reason is None else int(board.win_reason)
+        for name in ("a_peak_memory", "b_peak_memory"):
+            memory = getattr(history, name)
+            self.record[name] = NO_MEMORY if memory is None else memory
+        if errlog_a or errlog_b:
+            self.archive.write_errlogs(self.index, errlog_a, errlog_b)
+            self.record["has_errlog"] = True
+        self.record["status"] = FINISHED
+        self.mmap.flush()
+        self.mmap = None
+        self.record = None
+        self.rows = None
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(f"Usage: python3 {sys.argv[0]} <archive> <out_dir> [record ...]")
+        sys.exit(1)
+
+    path = sys.argv[1]
+    out_dir = sys.argv[2]
+    records = load_records(path)
+    errlogs = load_errlogs(path)
+    if len(sys.argv) > 3:
+        indices = [int(index) for index in sys.argv[3:]]
+    else:
+        indices = np.flatnonzero(records["status"] == FINISHED).tolist()
+
+    os.makedirs(out_dir, exist_ok=True)
+    for index in indices:
+        record = records[index]
+        errlog_a, errlog_b = errlogs.get(index, ("", ""))
+        history_dict = get_record_dict(record, errlog_a, errlog_b)
+        player_a = record["player_a"].decode()
+        player_b = record["player_b"].decode()
+        out_path = os.path.join(out_dir, f"{player_a}_{player_b}_{index}.json")
+        with open(out_path, "w") as fp:
+            fp.write(encode_history_dict(history_dict))
+    print(f"Wrote {len(indices)} matches to {out_dir}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,493 @@
+import ctypes
 import os
+import select
+import signal
+import threading
+import time
 from multiprocessing import Process, Queue
 
 from game.board import Board
+from game.board_buffer import BoardBuffer, board_checksum
+from game.game_map import PLAYER_MEMORY_LIMIT_MB
 from game.trapdoor_manager import TrapdoorManager
 
+# In delta mode, the runner sends a checksum of its board every this many turns
+DELTA_CHECK_INTERVAL = 8
+
+# How long a paused player has to stop before it is killed, in seconds
+STOP_TIMEOUT = 0.05
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+MEMORY_ERROR = "Allocated too much memory on physical RAM"
+
+# from <sys/ptrace.h> and <sys/wait.h>, which the os module does not export
+PTRACE_DETACH = 17
+PTRACE_SEIZE = 0x4206
+WALL = 0x40000000
+
+# libc, loaded on the first call to ptrace
+_libc = None
+
+# the cgroup this process leaves its players' cgroups in, by pid since forked
+# processes inherit it, see get_player_cgroup_parent
+_player_cgroup_parent = (None, None)
+
+# this process's Watchdog, by pid since its thread is not inherited by forked processes
+_watchdog = (None, None)
+
+
+def find_cgroup_root():
+    """
+    Returns the cgroup v2 directory this process belongs to, or None if cgroup v2 is not mounted.
+    """
+    mount = None
+    with open("/proc/mounts") as fp:
+        for line in fp:
+            fields = line.split()
+            if fields[2] == "cgroup2":
+                mount = fields[1]
+                break
+    if mount is None:
+        return None
+
+    with open("/proc/self/cgroup") as fp:
+        for line in fp:
+            if line.startswith("0::"):
+                return os.path.join(mount, line[3:].strip().lstrip("/"))
+    return None
+
+
+def enable_subtree_controller(path, controller):
+    """
+    Enables a controller for the children of a cgroup. Only the root cgroup can
+    enable controllers while it holds processes, so if this process is the only
+    one in the cgroup it moves into a leaf cgroup below it, called runner. If
+    other processes are in the cgroup, the cgroup is left as it is.
+
+    Parameters:
+        path (str): The cgroup.
+        controller (str): The controller, e.g. "memory".
+
+    Returns:
+        (bool): Whether the controller is enabled. False if the cgroup does not
+        have it, or shares it with other processes.
+
+    Raises:
+        OSError: If the controller cannot be enabled even from the leaf cgroup,
+            which is then removed again.
+    """
+    with open(os.path.join(path, "cgroup.controllers")) as fp:
+        if not controller in fp.read().split():
+            return False
+    with open(os.path.join(path, "cgroup.subtree_control")) as fp:
+        if controller in fp.read().split():
+            return True
+
+    try:
+        add_subtree_controller(path, controller)
+        return True
+    except OSError:
+        pass
+
+    with open(os.path.join(path, "cgroup.procs")) as fp:
+        if fp.read().split() != [str(os.getpid())]:
+            return False
+
+    leaf = os.path.join(path, "runner")
+    os.mkdir(leaf)
+    try:
+        add_to_cgroup(leaf, os.getpid())
+        add_subtree_controller(path, controller)
+    except OSError:
+        # put the runner back where it was
+        try:
+            add_to_cgroup(path, os.getpid())
+        finally:
+            os.rmdir(leaf)
+        raise
+    return True
+
+
+def add_subtree_controller(path, controller):
+    with open(os.path.join(path, "cgroup.subtree_control"), "w") as fp:
+        fp.write("+" + controller)
+
+
+def get_player_cgroup_parent():
+    """
+    Returns the cgroup players' cgroups are created in: the cgroup this process
+    was in the first time this was called, with the memory controller enabled
+    for its children where possible. Returns None if cgroup v2 is not mounted.
+    """
+    global _player_cgroup_parent
+    pid, parent = _player_cgroup_parent
+    if pid == os.getpid():
+        return parent
+
+    parent = find_cgroup_root()
+    if parent is not None:
+        try:
+            enable_subtree_controller(parent, "memory")
+        except OSError as e:
+            # players are still frozen, but their memory is not limited by the kernel
+            print(f"Error while enabling the memory controller: {e}")
+    _player_cgroup_parent = (os.getpid(), parent)
+    return parent
+
+
+class PlayerCgroup:
+    """
+    PlayerCgroup holds a player process and every process it starts in a cgroup v2
+    group. Children forked by the player join the group, so they are frozen and
+    counted without being listed.
+
+    The group suspends the player with the cgroup freezer, and the kernel signals
+    on cgroup.events once the freeze has taken effect, so nothing has to poll
+    process states. If the memory controller is enabled for the group, the kernel
+    also enforces the player's memory limit and tracks its usage and peak.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # kept open, since a reset of memory.peak only applies to the file it was written to
+        self.peak_file = None
+
+    @staticmethod
+    def create(name):
+        """
+        Creates a cgroup for one player process, in get_player_cgroup_parent.
+
+        Parameters:
+            name (str): The name of the cgroup's folder.
+
+        Returns:
+            (PlayerCgroup): The freezer, or None if cgroup v2 or its freezer is unavailable.
+        """
+        try:
+            root = get_player_cgroup_parent()
+            if root is None:
+                return None
+            path = os.path.join(root, name)
+            os.mkdir(path)
+        except OSError:
+            return None
+
+        if not os.path.exists(os.path.join(path, "cgroup.freeze")):
+            os.rmdir(path)
+            return None
+        return PlayerCgroup(path)
+
+    def has_memory_controller(self):
+        return os.path.exists(os.path.join(self.path, "memory.current"))
+
+    def limit_memory(self, limit_bytes):
+        """
+        Has the kernel enforce a memory limit on the group, killing the whole
+        group when it is exceeded. Swap is disabled so the limit covers all the
+        memory the player uses.
+
+        Parameters:
+            limit_bytes (int): The limit, in bytes.
+        """
+        with open(os.path.join(self.path, "memory.max"), "w") as fp:
+            fp.write(str(limit_bytes))
+        for name, value in (("memory.swap.max", "0"), ("memory.oom.group", "1")):
+            if os.path.exists(os.path.join(self.path, name)):
+                with open(os.path.join(self.path, name), "w") as fp:
+                    fp.write(value)
+
+    def get_memory(self):
+        """
+        Returns the memory charged to the group in bytes, read from memory.current.
+        """
+        with open(os.path.join(self.path, "memory.current")) as fp:
+            return int(fp.read())
+
+    def get_peak_memory(self):
+        """
+        Returns the highest memory charged to the group since the last reset_peak_memory,
+        or since the group was created, in bytes. Returns None on kernels without memory.peak.
+        """
+        if self.peak_file is None:
+            path = os.path.join(self.path, "memory.peak")
+            if not os.path.exists(path):
+                return None
+            try:
+                self.peak_file = open(path, "r+b", buffering=0)
+            except PermissionError:
+                # read-only before Linux 6.12
+                self.peak_file = open(path, "rb", buffering=0)
+        self.peak_file.seek(0)
+        return int(self.peak_file.read())
+
+    def reset_peak_memory(self):
+        # memory.peak can only be reset from Linux 6.12, after which it counts from the reset
+        try:
+            if self.get_peak_memory() is not None:
+                self.peak_file.write(b"reset")
+        except OSError:
+            pass
+
+    def oom_killed(self):
+        """
+        Returns whether the kernel has killed processes in the group for exceeding its memory limit.
+        """
+        with open(os.path.join(self.path, "memory.events")) as fp:
+            for line in fp:
+                key, value = line.split()
+                if key == "oom_kill":
+                    return int(value) > 0
+        return False
+
+    def get_pids(self):
+        """
+        Returns the pid of every process in the group.
+        """
+        with open(os.path.join(self.path, "cgroup.procs")) as fp:
+            return [int(pid) for pid in fp.read().split()]
+
+    def wait_for_event(self, event, timeout):
+        """
+        Waits until cgroup.events contains a line, sleeping in poll between changes.
+
+        Parameters:
+            event (str): The line to wait for, e.g. "frozen 1".
+            timeout (float): How long to wait, in seconds.
+
+        Returns:
+            (bool): Whether the line appeared before the timeout.
+        """
+        deadline = time.perf_counter() + timeout
+        event = event.encode()
+        with open(os.path.join(self.path, "cgroup.events"), "rb", buffering=0) as fp:
+            poller = select.poll()
+            poller.register(fp, select.POLLPRI | select.POLLERR)
+            while True:
+                fp.seek(0)
+                if event in fp.read().splitlines():
+                    return True
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    return False
+                poller.poll(remaining * 1000)
+
+    def set_frozen(self, frozen, timeout=STOP_TIMEOUT):
+        """
+        Freezes or thaws every process in the cgroup.
+
+        Returns:
+            (bool): Whether the change took effect before the timeout.
+        """
+        with open(os.path.join(self.path, "cgroup.freeze"), "w") as fp:
+            fp.write("1" if frozen else "0")
+        return self.wait_for_event("frozen 1" if frozen else "frozen 0", timeout)
+
+    def kill(self):
+        with open(os.path.join(self.path, "cgroup.kill"), "w") as fp:
+            fp.write("1")
+
+    def close(self, timeout=1):
+        """
+        Kills any process left in the cgroup and removes it.
+        """
+        if self.peak_file is not None:
+            self.peak_file.close()
+            self.peak_file = None
+        try:
+            try:
+                self.kill()
+            except FileNotFoundError:
+                # cgroup.kill needs Linux 5.14, and the processes were terminated already
+                pass
+            self.wait_for_event("populated 0", timeout)
+            os.rmdir(self.path)
+        except OSError as e:
+            print(f"Error while removing cgroup: {e}")
+
+
+def add_to_cgroup(path, pid):
+    with open(os.path.join(path, "cgroup.procs"), "w") as fp:
+        fp.write(str(pid))
+
+
+def get_turn_timing(sent, timestamps, returned):
+    """
+    Splits the time the runner waited for a turn into its parts. The timestamps are
+    from time.perf_counter, which reads a system-wide clock, so the runner's and
+    the player process's timestamps can be compared.
+
+    Parameters:
+        sent (float): When the runner sent the play command.
+        timestamps (Tuple[float, float, float, float]): When the player process received
+            the command, finished building its board, and started and stopped the agent.
+        returned (float): When the runner received the reply.
+
+    Returns:
+        (Dict[str, float]): The seconds spent sending and unpickling the command ("command"),
+        building the board ("decode"), in the agent ("agent"), returning the reply ("reply"),
+        in total, and on everything but the agent ("overhead").
+    """
+    received, decoded, start, stop = timestamps
+    return {
+        "command": received - sent,
+        "decode": decoded - received,
+        "agent": stop - start,
+        "reply": returned - stop,
+        "total": returned - sent,
+        "overhead": (returned - sent) - (stop - start),
+    }
+
+
+class Watchdog:
+    """
+    Watchdog kills processes that have not stopped by a deadline. It keeps one
+    thread for as long as the runner lives, since starting a thread for every
+    wait would allocate a pid every time, and get_last_pid would take that for
+    a process started by the player.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.pids = set()
+        self.deadline = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def arm(self, pids, timeout):
+        """
+        Kills the given processes once the timeout has passed, unless they are
+        removed with done first, replacing any earlier deadline.
+        """
+        with self.condition:
+            self.pids = set(pids)
+            self.deadline = time.perf_counter() + timeout
+            self.condition.notify()
+
+    def done(self, pid):
+        with self.condition:
+            self.pids.discard(pid)
+
+    def disarm(self):
+        with self.condition:
+            self.pids = set()
+            self.deadline = None
+            self.condition.notify()
+
+    def run(self):
+        with self.condition:
+            while True:
+                if self.deadline is None:
+                    self.condition.wait()
+                    continue
+                remaining = self.deadline - time.perf_counter()
+                if remaining > 0:
+                    self.condition.wait(remaining)
+                    continue
+                for pid in self.pids:
+                    try:
+                        os.kill(pid, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+                self.pids = set()
+                self.deadline = None
+
+
+def get_watchdog():
+    global _watchdog
+    pid, watchdog = _watchdog
+    if pid != os.getpid():
+        watchdog = Watchdog()
+        _watchdog = (os.getpid(), watchdog)
+    return watchdog
+
+
+def wait_for_stop(pid, timeout=STOP_TIMEOUT):
+    """
+    Waits for a child of this process to stop after SIGSTOP, blocking in waitid
+    rather than polling its status. The Watchdog kills the child if it has not
+    stopped within the timeout.
+
+    Returns:
+        (bool): Whether the child stopped.
+    """
+    watchdog = get_watchdog()
+    watchdog.arm([pid], timeout)
+    try:
+        # WNOWAIT leaves the exit status for multiprocessing to collect
+        result = os.waitid(os.P_PID, pid, os.WSTOPPED | os.WEXITED | os.WNOWAIT)
+    finally:
+        watchdog.disarm()
+    return result.si_code == os.CLD_STOPPED
+
+
+def ptrace(request, pid, data=0):
+    """
+    Calls ptrace from libc, which the os module does not wrap.
+
+    Raises:
+        OSError: If the call fails, as the subclass matching its errno.
+    """
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(None, use_errno=True)
+        _libc.ptrace.argtypes = [ctypes.c_long, ctypes.c_long, ctypes.c_void_p, ctypes.c_void_p]
+        _libc.ptrace.restype = ctypes.c_long
+    if _libc.ptrace(request, pid, None, data) == -1:
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+
+
+def stop_processes(pids, timeout=STOP_TIMEOUT):
+    """
+    Stops processes that are not children of this process, e.g. the children of
+    a player. waitid only reports the stops of children and tracees, so each
+    process is traced from SIGSTOP until waitid reports it stopped, and then
+    detached with SIGSTOP again, which leaves it stopped. The Watchdog kills the
+    processes that have not stopped within the timeout.
+
+    Parameters:
+        pids (List[int]): The processes. Those that have exited are skipped.
+        timeout (float, optional): How long the processes have to stop, in seconds. Defaults to STOP_TIMEOUT.
+
+    Raises:
+        OSError: If a process cannot be stopped or traced.
+    """
+    traced = []
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGSTOP)
+            # PTRACE_SEIZE, unlike PTRACE_ATTACH, sends no signal of its own
+            ptrace(PTRACE_SEIZE, pid)
+        except ProcessLookupError:
+            continue
+        traced.append(pid)
+
+    watchdog = get_watchdog()
+    watchdog.arm(traced, timeout)
+    try:
+        for pid in traced:
+            # a tracee's stop is reported once, and only with __WALL if it is a clone
+            result = os.waitid(os.P_PID, pid, os.WSTOPPED | os.WEXITED | WALL)
+            watchdog.done(pid)
+            if result.si_code == os.CLD_TRAPPED:
+                try:
+                    ptrace(PTRACE_DETACH, pid, signal.SIGSTOP)
+                except ProcessLookupError:
+                    pass
+    finally:
+        watchdog.disarm()
+
+
+def get_last_pid():
+    """
+    Returns the last pid the kernel allocated, from /proc/loadavg. It changes
+    whenever a process or thread is created, so a set of processes found while
+    it was unchanged is still complete.
+    """
+    with open("/proc/loadavg") as fp:
+        return int(fp.read().split()[-1])
+
 
 def get_file_permissions(file_path):
     import stat
@@ -146,6 +630,8 @@ def run_player_process(
     out_queue,
     user_name=None,
     group_name=None,
+    board_buffer=None,
+    cgroup_path=None,
 ):
     # try:
     import importlib
@@ -156,6 +642,14 @@ def run_player_process(
 
     import psutil
 
+    if cgroup_path is not None:
+        # joined before the agent is imported, so every process it starts is in the cgroup
+        try:
+            add_to_cgroup(cgroup_path, os.getpid())
+        except OSError as e:
+            print(f"Error while joining the player's cgroup: {e}")
+            return
+
     sys.path.append(submission_dir)
 
     print(use_gpu)
@@ -166,23 +660,9 @@ def run_player_process(
         pynvml.nvmlInit()
         handle = pynvml.nvmlDeviceGetHandleByIndex(0)  # GPU 0
 
-    limit_mb = 1536
+    limit_mb = PLAYER_MEMORY_LIMIT_MB
     limit_bytes = limit_mb * 1024 * 1024  # set limit to 1 gb
 
-    def checkMemory():
-        pid = os.getpid()
-        process = psutil.Process(pid)
-
-        total_memory = process.memory_info().rss
-
-        for child in process.children(recursive=True):
-            total_memory += child.memory_info().rss
-
-        if limit_resources and total_memory > limit_bytes:
-            raise MemoryError("Allocated too much memory on physical RAM")
-
-        return total_memory
-
     # Set your VRAM limit in bytes
     vram_limit_bytes = 4 * 1024**3  # 4 GB
 
@@ -256,17 +736,34 @@ def run_player_process(
         return
 
     player = None
+    # the board kept up to date from turn events in delta mode
+    replica = None
     start = 0
     stop = 0
     return_queue.put(True)
 
     while True:
-        func = player_queue.get()
+        func, args = player_queue.get()
+        received = get_cur_time()
 
         # called to play a turn
         if func == "play":
             try:
-                temp_board, trapdoor_samples, time_left = player_queue.get()
+                sequence, trapdoor_samples, time_left, events, checksum = args
+                if events is None:
+                    temp_board = board_buffer.read(sequence)
+                else:
+                    # replay the turns played since our last turn, as the runner did
+                    for dir, move_type, timer, triggered in events:
+                        replica.apply_move(dir, move_type, timer=timer)
+                        if triggered:
+                            replica.apply_trapdoor(replica.chicken_player.get_location())
+                        replica.reverse_perspective()
+                    if checksum is not None and board_checksum(replica) != checksum:
+                        print("Board replica out of sync with the runner, resynchronizing")
+                        replica = board_buffer.read(sequence)
+                    temp_board = replica.get_copy()
+                decoded = get_cur_time()
                 if not limit_resources:
                     printer.set_turn(f"turn #{temp_board.turn_count}")
 
@@ -284,33 +781,29 @@ def run_player_process(
                     stop = get_cur_time()
                 except:
                     print(traceback.format_exc())
-                    return_queue.put((None, -1, traceback.format_exc()))
-                    continue
-
-                try:
-                    checkMemory()
-                except MemoryError:
-                    print(traceback.format_exc())
-                    return_queue.put(("Memory", -1, traceback.format_exc()))
+                    return_queue.put((None, -1, traceback.format_exc(), None))
                     continue
 
                 try:
                     checkVRAM()
                 except MemoryError:
                     print(traceback.format_exc())
-                    return_queue.put(("GPU VRAM", -1, traceback.format_exc()))
+                    return_queue.put(("GPU VRAM", -1, traceback.format_exc(), None))
                     continue
 
-                return_queue.put((player_move, stop - start, ""))
+                return_queue.put(
+                    (player_move, stop - start, "", (received, decoded, start, stop))
+                )
 
                 # print(return_queue.qsize())
             except:
-                return_queue.put(("Fail", -1, traceback.format_exc()))
+                return_queue.put(("Fail", -1, traceback.format_exc(), None))
 
         # called to construct the player class
         elif func == "construct":
             try:
-                temp_board = player_queue.get()
+                temp_board = args
+                replica = temp_board.get_copy()
 
                 if not limit_resources:
                     printer.set_turn("construct")
@@ -327,13 +820,6 @@ def run_player_process(
                     return_queue.put((False, -1, traceback.format_exc()))
                     continue
 
-                try:
-                    checkMemory()
-                except MemoryError:
-                    print(traceback.format_exc())
-                    return_queue.put(("Memory", -1, traceback.format_exc()))
-                    continue
-
                 return_queue.put((True, stop - start, ""))
             except:
                 print(traceback.format_exc())
@@ -354,6 +840,16 @@ class PlayerProcess:
         user_name=None,
         group_name=None,
     ):
+        # the board is published here each turn, and the queue only carries its sequence number
+        self.board_buffer = BoardBuffer()
+        # sandboxed players are paused with a cgroup freezer where available,
+        # and otherwise with signals sent to the player and the children found here
+        self.cgroup = None
+        # the children's pids, and the last pid allocated when they were found
+        self.children = []
+        self.children_last_pid = None
+        if limit_resources:
+            self.cgroup = PlayerCgroup.create(f"player_{os.getpid()}_{id(self)}")
         self.process = Process(
             target=run_player_process,
             args=(
@@ -366,6 +862,8 @@ class PlayerProcess:
                 out_queue,
                 user_name,
                 group_name,
+                self.board_buffer,
+                None if self.cgroup is None else self.cgroup.path,
             ),
         )
         self.player_queue = player_queue
@@ -373,8 +871,26 @@ class PlayerProcess:
         self.is_player_a = is_player_a
         self.player_name = player_name
         self.limit_resources = limit_resources
+        # False once a command has timed out, since its reply may still arrive later
+        self.in_sync = True
+        # number of turn events already sent, and turns played, in delta mode
+        self.events_sent = 0
+        self.plays = 0
+        self.memory_limit_bytes = PLAYER_MEMORY_LIMIT_MB * 1024 * 1024
+        if self.cgroup is not None and self.cgroup.has_memory_controller():
+            try:
+                self.cgroup.limit_memory(self.memory_limit_bytes)
+            except OSError as e:
+                print(f"Error while limiting memory: {e}")
+        # memory of the player and its children after its last command, and the
+        # highest seen this game, in bytes
+        self.memory = None
+        self.peak_memory = 0
+        # where the time of each turn played this game went, see get_turn_timing
+        self.turn_timings = []
 
     def start(self):
+        # the player joins its cgroup itself, before it runs any of the agent's code
         self.process.start()
 
     # runs player construct command
@@ -385,9 +901,14 @@ class PlayerProcess:
         # checker_thread = threading.Thread(target=check_process, args=(process, finished, return_queue, False))
         # checker_thread.start()
 
-        self.player_queue.put("construct")
         temp_board = game_board.get_copy(False, True)
-        self.player_queue.put(temp_board)
+        self.events_sent = 0
+        self.plays = 0
+        self.peak_memory = 0
+        self.turn_timings = []
+        if self.cgroup is not None and self.cgroup.has_memory_controller():
+            self.cgroup.reset_peak_memory()
+        self.player_queue.put(("construct", temp_board))
 
         try:
             ok, timer, message = self.return_queue.get(
@@ -398,53 +919,140 @@ class PlayerProcess:
             if ok == False:
                 print(f"{self.player_name}: Constructor failed.\n {message}")
                 return False, message
-            if ok == "Memory" and timer == -1:
-                print(f"{self.player_name}: Memory error.\n {message}")
-                return False, message
             if ok == "Fail" and timer == -1:
                 raise RuntimeError(
                     f"{self.player_name}: Something went wrong while running player constructor.\n {message}"
                 )
+            if not self.check_memory():
+                print(f"{self.player_name}: Memory error.\n {MEMORY_ERROR}")
+                return False, MEMORY_ERROR
 
             return timer < timeout, message
         except:
             # finished.set()
+            self.in_sync = False
+            if self.was_oom_killed():
+                return False, MEMORY_ERROR
             return False, "Timeout"
 
     # runs player play command
-    def run_timed_play(self, game_board, trapdoor_samples, timeout, extra_ret_time):
+    # if turn_events is given, only the turns played since the player's last turn are sent
+    def run_timed_play(
+        self, game_board, trapdoor_samples, timeout, extra_ret_time, turn_events=None
+    ):
         # print("running timed play")
-        temp_board = game_board.get_copy(False, True)
-
-        self.player_queue.put("play")
-        self.player_queue.put((temp_board, trapdoor_samples, timeout))
+        if turn_events is None:
+            events = None
+            checksum = None
+            sequence = self.board_buffer.write(game_board)
+        else:
+            events = turn_events[self.events_sent :]
+            self.events_sent = len(turn_events)
+            checksum = None
+            sequence = None
+            if self.plays % DELTA_CHECK_INTERVAL == 0:
+                # published so the player can resynchronize if the checksum differs
+                sequence = self.board_buffer.write(game_board)
+                checksum = board_checksum(game_board)
+            self.plays += 1
+
+        sent = time.perf_counter()
+        self.player_queue.put(
+            ("play", (sequence, trapdoor_samples, timeout, events, checksum))
+        )
 
         try:
             # print("waiting for move")
-            moves, timer, message = self.return_queue.get(
+            moves, timer, message, timestamps = self.return_queue.get(
                 block=True, timeout=timeout + extra_ret_time
             )
+            if timestamps is not None:
+                self.turn_timings.append(
+                    get_turn_timing(sent, timestamps, time.perf_counter())
+                )
 
             # print("return")
             # print(moves, timer, message)
 
             if moves == None:
                 print("Player code caused exception")
+                self.check_memory()
                 return None, -1, message
-            if moves == "Memory" and timer == -1:
-                print("Memory error")
-                return None, -2, message
             if moves == "Fail" and timer == -1:
                 raise RuntimeError(
                     f"Something went wrong while running player move. \n{message}"
                 )
+            if not self.check_memory():
+                print("Memory error")
+                return None, -2, MEMORY_ERROR
 
             if timer < timeout:
                 return moves, timer, message
             return None, timeout, "Timeout"
         except:
+            self.in_sync = False
+            self.check_memory()
+            if self.was_oom_killed():
+                return None, -2, MEMORY_ERROR
             return None, -1, "Timeout"
 
+    def get_memory_usage(self):
+        """
+        Returns the memory of the player process and its children in bytes, or None
+        if the process has exited. If the player has a cgroup with the memory
+        controller this is one read of memory.current. Otherwise it is the resident
+        memory from /proc/<pid>/statm of each process in the player's cgroup or,
+        without one, of the player and the children found the last time it was
+        paused, so children only count once the player is sandboxed.
+        """
+        if not self.process.is_alive():
+            return None
+        if self.cgroup is not None:
+            if self.cgroup.has_memory_controller():
+                return self.cgroup.get_memory()
+            pids = self.cgroup.get_pids()
+        else:
+            pids = [self.process.pid] + self.children
+
+        total_memory = 0
+        for pid in pids:
+            try:
+                with open(f"/proc/{pid}/statm") as fp:
+                    total_memory += int(fp.read().split()[1]) * PAGE_SIZE
+            except (FileNotFoundError, ProcessLookupError):
+                pass
+        return total_memory
+
+    def check_memory(self):
+        """
+        Records the player's memory use after a command. This runs in the runner
+        once the player has replied, so it is not charged to the player's time.
+
+        Returns:
+            (bool): False if the player is sandboxed and is over its memory limit.
+        """
+        self.memory = self.get_memory_usage()
+        if self.memory is None:
+            return True
+
+        peak_memory = None
+        if self.cgroup is not None and self.cgroup.has_memory_controller():
+            peak_memory = self.cgroup.get_peak_memory()
+        self.peak_memory = max(self.peak_memory, peak_memory or self.memory)
+
+        return not (self.limit_resources and self.memory > self.memory_limit_bytes)
+
+    def was_oom_killed(self):
+        """
+        Returns whether the kernel killed the player for going over its memory limit.
+        """
+        if self.cgroup is None or not self.cgroup.has_memory_controller():
+            return False
+        try:
+            return self.cgroup.oom_killed()
+        except OSError:
+            return False
+
     def terminate_process_and_children(self):
         import psutil
 
@@ -498,99 +1106,209 @@ class PlayerProcess:
                     except Exception as e:
                         print(f"Error while killing process: {e}")
 
-    def pause_process_and_children(self):
-        # Find the process by PID
-        if self.limit_resources:
-            import os
-            import signal
-            import time
+        if self.cgroup is not None:
+            self.cgroup.close()
+            self.cgroup = None
 
-            import psutil
+        if self.board_buffer is not None:
+            self.board_buffer.close(unlink=True)
+            self.board_buffer = None
 
+    def pause_process_and_children(self):
+        if not self.limit_resources:
+            return
+
+        if self.cgroup is not None:
             try:
-                pid = self.process.pid
-                parent_process = psutil.Process(pid)
+                if not self.cgroup.set_frozen(True):
+                    self.cgroup.kill()
+            except OSError as e:
+                print(f"error pausing processes: {e}")
+            return
 
-                children = parent_process.children(recursive=True)
+        import psutil
 
-                # send sigstop to parent process
-                if parent_process.is_running():
-                    try:
-                        os.kill(pid, signal.SIGSTOP)
-                    except psutil.NoSuchProcess:
-                        print(f"Process  does not exist.")
-                    except Exception as e:
-                        print(f"Error while killing process: {e}")
+        try:
+            pid = self.process.pid
+            os.kill(pid, signal.SIGSTOP)
+            wait_for_stop(pid)
+
+            # listing the children reads all of /proc, so they are only listed
+            # again once a pid has been allocated since the last listing. A child
+            # may start a process before it is stopped, so this repeats until the
+            # listing finds no child left to stop
+            stopped = set()
+            while True:
+                last_pid = get_last_pid()
+                if last_pid != self.children_last_pid:
+                    self.children = [
+                        child.pid for child in psutil.Process(pid).children(recursive=True)
+                    ]
+                    self.children_last_pid = last_pid
+                new_children = [child for child in self.children if not child in stopped]
+                if not new_children:
+                    break
+                stop_processes(new_children)
+                stopped.update(new_children)
+        except (psutil.Error, OSError) as e:
+            print(f"error pausing processes, killing player: {e}")
+            self.kill_process_and_children()
 
-                i = 0
-                while parent_process.status() == psutil.STATUS_RUNNING and i < 50:
-                    time.sleep(0.001)
-                    i += 1
-                if parent_process.status() == psutil.STATUS_RUNNING:
-                    os.kill(pid, signal.SIGKILL)
-
-                for child in children:
-                    if child.is_running():
-                        try:
-                            os.kill(child.pid, signal.SIGSTOP)
-                        except psutil.NoSuchProcess:
-                            print(f"Process  does not exist.")
-                        except Exception as e:
-                            print(f"Error while killing process: {e}")
-
-                for child in children:
-                    i = 0
-                    while child.status() == psutil.STATUS_RUNNING and i < 50:
-                        time.sleep(0.001)
-                        i += 1
-                    if child.status() == psutil.STATUS_RUNNING:
-                        os.kill(child.pid, signal.SIGKILL)
+    def restart_process_and_children(self):
+        if not self.limit_resources:
+            return
 
-            except:
-                print("error pausing processes")
+        if self.cgroup is not None:
+            try:
+                self.cgroup.set_frozen(False)
+            except OSError as e:
+                print(f"error restarting processes: {e}")
+            return
 
-    def restart_process_and_children(self):
-        if self.limit_resources:
-            import os
-            import signal
-            import time
+        # SIGCONT resumes a stopped process before kill returns, so there is nothing to wait for
+        try:
+            for child in self.children:
+                try:
+                    os.kill(child, signal.SIGCONT)
+                except ProcessLookupError:
+                    pass
+            os.kill(self.process.pid, signal.SIGCONT)
+        except OSError as e:
+            print(f"error restarting processes, killing player: {e}")
+            self.kill_process_and_children()
+
+    def kill_process_and_children(self):
+        """
+        Kills the player and the children found the last time it was paused, for
+        when it cannot be paused or restarted. Its next command then fails.
+        """
+        for pid in [self.process.pid] + self.children:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
 
-            import psutil
 
-            pid = self.process.pid
-            parent_process = psutil.Process(pid)
+def close_player_workers(workers):
+    for process, _ in workers.values():
+        process.terminate_process_and_children()
+    workers.clear()
 
-            children = parent_process.children(recursive=True)
 
-            try:
-                for child in children:
-                    if child.is_running():
-                        try:
-                            os.kill(child.pid, signal.SIGCONT)
-                        except psutil.NoSuchProcess:
-                            print(f"Process does not exist.")
-                        except Exception as e:
-                            print(f"Error while killing process: {e}")
-
-                for child in children:
-                    i = 0
-                    while child.status() != psutil.STATUS_STOPPED and i < 50:
-                        time.sleep(0.001)
-                        i += 1
-
-                # send sigstop to parent process
-                if parent_process.is_running():
-                    try:
-                        os.kill(pid, signal.SIGCONT)
-                    except psutil.NoSuchProcess:
-                        print(f"Process does not exist.")
-                    except Exception as e:
-                        print(f"Error while killing process: {e}")
+class PlayerPool:
+    """
+    PlayerPool keeps player processes alive between games so that tournaments only
+    pay for process start-up, agent imports and sandboxing once per worker rather
+    than once per match. There is one worker per agent and side, since the side
+    decides which user and group a sandboxed worker runs as. Each game reuses the
+    worker with a new construct command.
+
+    A worker is replaced after max_games games, when its memory reaches
+    memory_high_water_mb, or when it timed out or crashed, since it may then
+    still be busy with an old command.
+    """
 
-                i = 0
-                while parent_process.status() == psutil.STATUS_STOPPED and i < 50:
-                    time.sleep(0.001)
-                    i += 1
+    def __init__(
+        self,
+        limit_resources=False,
+        use_gpu=False,
+        max_games=50,
+        memory_high_water_mb=PLAYER_MEMORY_LIMIT_MB * 3 // 4,
+    ):
+        """
+        Parameters:
+            limit_resources (bool, optional): Whether workers are sandboxed. Defaults to False.
+            use_gpu (bool, optional): Whether workers may use the GPU. Defaults to False.
+            max_games (int, optional): The number of games a worker plays before it is replaced. Defaults to 50.
+            memory_high_water_mb (float, optional): The memory use in MB at which a worker is
+                replaced after its game. Defaults to three quarters of the player memory limit.
+        """
+        from multiprocessing.util import Finalize
 
-            except:
-                print("error restarting processes")
+        self.limit_resources = limit_resources
+        self.use_gpu = use_gpu
+        self.max_games = max_games
+        self.memory_high_water_bytes = memory_high_water_mb * 1024 * 1024
+        self.out_queue = Queue()
+        # (submission_dir, player_name, is_player_a) -> (PlayerProcess, games played)
+        self.workers = {}
+
+        # workers never exit on their own, so close them before multiprocessing
+        # waits for its children at exit
+        self._finalizer = Finalize(
+            self, close_player_workers, args=(self.workers,), exitpriority=10
+        )
+
+    def acquire(self, submission_dir, player_name, is_player_a, start_timeout=1):
+        """
+        Returns a started, paused worker for an agent, starting one if needed.
+
+        Parameters:
+            submission_dir (str): The folder containing the agent folders.
+            player_name (str): The name of the agent's folder.
+            is_player_a (bool): Whether the agent plays as A.
+            start_timeout (float, optional): How long a new worker has to import the agent. Defaults to 1.
+
+        Returns:
+            (Tuple[PlayerProcess, bool, str]): The worker, whether it is ready and an error message.
+        """
+        import traceback
+
+        key = (submission_dir, player_name, is_player_a)
+        if key in self.workers:
+            return self.workers[key][0], True, ""
+
+        side = "a" if is_player_a else "b"
+        process = PlayerProcess(
+            is_player_a,
+            player_name,
+            submission_dir,
+            Queue(),
+            Queue(),
+            self.limit_resources,
+            self.use_gpu,
+            self.out_queue,
+            user_name=f"player_{side}_user",
+            group_name=f"player_{side}",
+        )
+        self.workers[key] = (process, 0)
+
+        try:
+            process.start()
+            ready = process.return_queue.get(block=True, timeout=start_timeout)
+            process.pause_process_and_children()
+            return process, ready, ""
+        except Exception:
+            # the worker may still signal that it is ready after the timeout
+            process.in_sync = False
+            return process, False, traceback.format_exc()
+
+    def release(self, process):
+        """
+        Hands a worker back after a game, replacing it if it should not be reused.
+
+        Parameters:
+            process (PlayerProcess): A worker returned by acquire.
+        """
+        for key, (worker, games) in list(self.workers.items()):
+            if worker is not process:
+                continue
+            games += 1
+            memory = process.get_memory_usage()
+            if (
+                not process.in_sync
+                or memory is None
+                or memory >= self.memory_high_water_bytes
+                or games >= self.max_games
+            ):
+                del self.workers[key]
+                process.terminate_process_and_children()
+            else:
+                self.workers[key] = (process, games)
+            return
+
+    def close(self):
+        """
+        Terminates every worker.
+        """
+        self._finalizer()
@@ -5,11 +5,12 @@ import time
 
 from board_utils import get_history_json
 from gameplay import play_game
+from match_archive import MatchArchive
 
 
 def main():
-    if len(sys.argv) != 3:
-        print(f"Usage: python3 {sys.argv[0]} <player_a_name> <player_b_name>")
+    if len(sys.argv) not in (3, 4):
+        print(f"Usage: python3 {sys.argv[0]} <player_a_name> <player_b_name> [seed]")
         sys.exit(1)
 
     sim_time = time.perf_counter()
@@ -19,6 +20,13 @@ def main():
 
     player_a_name = sys.argv[1]
     player_b_name = sys.argv[2]
+    seed = int(sys.argv[3]) if len(sys.argv) == 4 else None
+
+    records_dir = os.path.join(play_directory, "matches")
+    os.makedirs(records_dir, exist_ok=True)
+    # every local match is also kept in one archive, for match_archive and analysis
+    archive = MatchArchive(os.path.join(records_dir, "matches.bin"))
+    match_writer = archive.new_match(player_a_name, player_b_name)
 
     final_board, trapdoors, spawns, err_a, err_b = play_game(
         play_directory,
@@ -30,14 +38,14 @@ def main():
         clear_screen=False,
         record=True,
         limit_resources=False,
+        seed=seed,
+        match_writer=match_writer,
     )
 
     sim_time = time.perf_counter() - sim_time
     turn_count = final_board.turn_count
     print(f"{sim_time:.2f} seconds elapsed, {turn_count} rounds.")
 
-    records_dir = os.path.join(play_directory, "matches")
-    os.makedirs(records_dir, exist_ok=True)
     i = 0
     while True:
         out_file = f"{player_a_name}_{player_b_name}_{i}.json"
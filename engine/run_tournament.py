@@ -0,0 +1,433 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import pathlib
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from board_utils import encode_history_dict, get_history_json
+from game.enums import ResultArbiter, WinReason
+
+"""
+Plays round-robin or gauntlet tournaments between the agents in 3600-agents
+on a pool of worker processes. Every pairing is played from both sides with the
+same seeds, so each agent faces the same scenarios as A and as B.
+
+Each finished match is appended to results.jsonl in the tournament folder and
+its history is streamed into the matches.bin archive while it is played, see
+match_archive; with --json it is also written to matches/ for the renderer.
+Running the same command again skips every match already in results.jsonl, so
+an interrupted tournament resumes where it stopped. A match that was finished
+in matches.bin but not yet written to results.jsonl is recovered from the
+archive rather than played again. Matches that failed to run are played again.
+"""
+
+ELO_START = 1500
+ELO_K = 16
+
+# folders in 3600-agents that are outputs rather than agents
+NON_AGENT_DIRS = {"matches", "tournaments"}
+
+# per-worker cache of loaded matches, keyed by (player_a_name, player_b_name)
+_matches = {}
+
+# per-worker pool of warm player processes, used with --player-processes
+_player_pool = None
+
+# per-worker handle on the tournament's archive
+_archive = None
+
+
+def find_agents(play_directory):
+    """
+    Returns the name of every agent folder, i.e. every folder containing an agent.py.
+    """
+    agents = []
+    for name in sorted(os.listdir(play_directory)):
+        if name in NON_AGENT_DIRS:
+            continue
+        if os.path.isfile(os.path.join(play_directory, name, "agent.py")):
+            agents.append(name)
+    return agents
+
+
+def schedule_matches(agents, mode, challenger, games, seed):
+    """
+    Lists every match of the tournament, in a fixed order.
+
+    Parameters:
+        agents (List[str]): The agents taking part.
+        mode (str): "round-robin" to pair every agent with every other, or "gauntlet"
+            to pair the challenger with every other agent.
+        challenger (str): The challenger in gauntlet mode.
+        games (int): The number of seeds each pairing plays, from each side.
+        seed (int): The first seed.
+
+    Returns:
+        (List[dict]): The matches, each with a match_id, player_a, player_b and seed.
+    """
+    if mode == "gauntlet":
+        pairings = [(challenger, agent) for agent in agents if agent != challenger]
+    else:
+        pairings = [
+            (agents[i], agents[j])
+            for i in range(len(agents))
+            for j in range(i + 1, len(agents))
+        ]
+
+    matches = []
+    for first, second in pairings:
+        for game in range(games):
+            match_seed = seed + game
+            for player_a, player_b in ((first, second), (second, first)):
+                matches.append(
+                    {
+                        "match_id": f"{player_a}_{player_b}_{match_seed}",
+                        "player_a": player_a,
+                        "player_b": player_b,
+                        "seed": match_seed,
+                    }
+                )
+    return matches
+
+
+def run_match(match, play_directory, tournament_dir, player_processes, write_json):
+    """
+    Plays one match in a worker process and archives its history.
+
+    Returns:
+        (dict): The match, with its winner, win reason and archive record added.
+    """
+    from match_archive import MatchArchive
+
+    global _archive
+    if _archive is None:
+        _archive = MatchArchive(os.path.join(tournament_dir, "matches.bin"))
+
+    result = dict(match)
+    try:
+        match_writer = _archive.new_match(match["player_a"], match["player_b"])
+        result["record"] = match_writer.index
+        # for agents that use np.random directly; the match itself is seeded below
+        np.random.seed(match["seed"])
+        with contextlib.redirect_stdout(io.StringIO()):
+            if player_processes:
+                from gameplay import play_game
+                from player_process import PlayerPool
+
+                global _player_pool
+                if _player_pool is None:
+                    _player_pool = PlayerPool()
+                final_board, trapdoors, spawns, err_a, err_b = play_game(
+                    play_directory,
+                    play_directory,
+                    match["player_a"],
+                    match["player_b"],
+                    record=True,
+                    limit_resources=False,
+                    seed=match["seed"],
+                    player_pool=_player_pool,
+                    delta_turns=True,
+                    match_writer=match_writer,
+                )
+            else:
+                from in_process_match import InProcessMatch, load_agent
+
+                key = (match["player_a"], match["player_b"])
+                if not key in _matches:
+                    _matches[key] = InProcessMatch(
+                        load_agent(play_directory, match["player_a"]),
+                        load_agent(play_directory, match["player_b"]),
+                    )
+                final_board, trapdoors, spawns, err_a, err_b = _matches[key].play(
+                    match["seed"], match_writer
+                )
+
+        if write_json:
+            out_path = os.path.join(tournament_dir, "matches", match["match_id"] + ".json")
+            with open(out_path, "w") as fp:
+                fp.write(get_history_json(final_board, trapdoors, spawns, err_a, err_b))
+
+        result["winner"] = ResultArbiter(final_board.get_winner()).name
+        result["reason"] = final_board.get_win_reason().name
+        result["turn_count"] = final_board.turn_count
+    except:
+        result["winner"] = ResultArbiter.ERROR.name
+        result["reason"] = traceback.format_exc()
+    return result
+
+
+def load_results(results_path):
+    """
+    Reads the results of every match already played. A partly written last line,
+    left by an interrupted run, is ignored.
+    """
+    results = {}
+    if not os.path.exists(results_path):
+        return results
+    with open(results_path) as fp:
+        for line in fp:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            results[result["match_id"]] = result
+    return results
+
+
+def recover_results(archive_path, matches, results, write_json):
+    """
+    Adds the results of matches that were finished in the archive but not written
+    to results.jsonl, e.g. because the tournament was interrupted in between, so
+    that they are not played again and archived twice.
+
+    Parameters:
+        archive_path (str): The tournament's matches.bin.
+        matches (List[dict]): The scheduled matches.
+        results (Dict[str, dict]): The results already read, by match_id. Updated in place.
+        write_json (bool): Whether to write the recovered matches to matches/ as JSON
+            if they are not there yet.
+
+    Returns:
+        (List[dict]): The recovered results.
+    """
+    from match_archive import FINISHED, get_record_dict, get_seed, load_errlogs, load_records
+
+    if not os.path.exists(archive_path):
+        return []
+    scheduled = {match["match_id"]: match for match in matches}
+    records = load_records(archive_path)
+    errlogs = load_errlogs(archive_path) if write_json else {}
+    recovered = []
+    for index in np.flatnonzero(records["status"] == FINISHED).tolist():
+        record = records[index]
+        player_a = record["player_a"].decode()
+        player_b = record["player_b"].decode()
+        match_id = f"{player_a}_{player_b}_{get_seed(record)}"
+        # the first finished record of a match is the one kept
+        if not match_id in scheduled or match_id in results:
+            continue
+
+        if write_json:
+            out_path = os.path.join(
+                os.path.dirname(archive_path), "matches", match_id + ".json"
+            )
+            if not os.path.exists(out_path):
+                errlog_a, errlog_b = errlogs.get(index, ("", ""))
+                with open(out_path, "w") as fp:
+                    fp.write(
+                        encode_history_dict(get_record_dict(record, errlog_a, errlog_b))
+                    )
+
+        result = dict(scheduled[match_id])
+        result["record"] = index
+        result["winner"] = ResultArbiter(int(record["result"])).name
+        result["reason"] = WinReason(int(record["reason"])).name
+        result["turn_count"] = int(record["turn_count"])
+        results[match_id] = result
+        recovered.append(result)
+    return recovered
+
+
+def compute_elo(matches, results):
+    """
+    Computes Elo ratings by replaying the results in schedule order, so the ratings
+    do not depend on the order the matches finished in.
+
+    Returns:
+        (Dict[str, float]): The rating of every agent.
+    """
+    ratings = {}
+    for match in matches:
+        result = results.get(match["match_id"])
+        if result is None or result["winner"] == ResultArbiter.ERROR.name:
+            continue
+        a = match["player_a"]
+        b = match["player_b"]
+        rating_a = ratings.setdefault(a, ELO_START)
+        rating_b = ratings.setdefault(b, ELO_START)
+
+        if result["winner"] == ResultArbiter.PLAYER_A.name:
+            score_a = 1.0
+        elif result["winner"] == ResultArbiter.PLAYER_B.name:
+            score_a = 0.0
+        else:
+            score_a = 0.5
+
+        expected_a = 1 / (1 + 10 ** ((rating_b - rating_a) / 400))
+        ratings[a] = rating_a + ELO_K * (score_a - expected_a)
+        ratings[b] = rating_b - ELO_K * (score_a - expected_a)
+    return ratings
+
+
+def print_summary(agents, matches, results):
+    """
+    Prints the win/loss/tie matrix, from the point of view of the row agent,
+    followed by the Elo ratings.
+    """
+    table = {(a, b): [0, 0, 0] for a in agents for b in agents}
+    errors = 0
+    for match in matches:
+        result = results.get(match["match_id"])
+        if result is None:
+            continue
+        a = match["player_a"]
+        b = match["player_b"]
+        if result["winner"] == ResultArbiter.PLAYER_A.name:
+            table[(a, b)][0] += 1
+            table[(b, a)][1] += 1
+        elif result["winner"] == ResultArbiter.PLAYER_B.name:
+            table[(a, b)][1] += 1
+            table[(b, a)][0] += 1
+        elif result["winner"] == ResultArbiter.TIE.name:
+            table[(a, b)][2] += 1
+            table[(b, a)][2] += 1
+        else:
+            errors += 1
+
+    width = max(len(agent) for agent in agents) + 2
+    print("W-L-T".ljust(width) + "".join(agent.rjust(width) for agent in agents))
+    for a in agents:
+        row = [a.ljust(width)]
+        for b in agents:
+            cell = "-" if a == b else "-".join(str(n) for n in table[(a, b)])
+            row.append(cell.rjust(width))
+        print("".join(row))
+
+    print()
+    ratings = compute_elo(matches, results)
+    for agent in sorted(agents, key=lambda agent: -ratings.get(agent, ELO_START)):
+        print(f"{agent.ljust(width)}{ratings.get(agent, ELO_START):8.1f}")
+
+    if errors:
+        print(f"\n{errors} matches failed to run, see results.jsonl for details.")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Play a tournament between the agents in 3600-agents."
+    )
+    parser.add_argument(
+        "--mode", choices=["round-robin", "gauntlet"], default="round-robin"
+    )
+    parser.add_argument(
+        "--challenger", help="the agent that plays every match in gauntlet mode"
+    )
+    parser.add_argument(
+        "--agents", nargs="+", help="the agents taking part, defaults to every agent"
+    )
+    parser.add_argument(
+        "--games",
+        type=int,
+        default=10,
+        help="seeds per pairing, each played from both sides",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="the first seed")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="worker processes, defaults to one per core",
+    )
+    parser.add_argument(
+        "--name",
+        default="tournament",
+        help="the tournament's folder in 3600-agents/tournaments",
+    )
+    parser.add_argument(
+        "--player-processes",
+        action="store_true",
+        help="run agents in player processes as play_game does, instead of importing them into the workers. "
+        "Player processes are kept warm between matches. Resources are not limited, "
+        "use run_local_agents.py for that",
+    )
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="also write each match to matches/ as JSON for the renderer",
+    )
+    args = parser.parse_args()
+
+    top_level = pathlib.Path(__file__).parent.parent.resolve()
+    play_directory = os.path.join(top_level, "3600-agents")
+
+    agents = args.agents if args.agents else find_agents(play_directory)
+    if args.mode == "gauntlet":
+        if args.challenger is None:
+            parser.error("--challenger is required in gauntlet mode")
+        if not args.challenger in agents:
+            agents = [args.challenger] + agents
+    if len(agents) < 2:
+        parser.error("at least two agents are needed")
+
+    tournament_dir = os.path.join(play_directory, "tournaments", args.name)
+    os.makedirs(tournament_dir, exist_ok=True)
+    if args.json:
+        os.makedirs(os.path.join(tournament_dir, "matches"), exist_ok=True)
+    results_path = os.path.join(tournament_dir, "results.jsonl")
+
+    matches = schedule_matches(
+        agents, args.mode, args.challenger, args.games, args.seed
+    )
+    results = load_results(results_path)
+    # matches that failed to run are played again
+    results = {
+        match_id: result
+        for match_id, result in results.items()
+        if result["winner"] != ResultArbiter.ERROR.name
+    }
+    recovered = recover_results(
+        os.path.join(tournament_dir, "matches.bin"), matches, results, args.json
+    )
+    if recovered:
+        print(f"Recovered {len(recovered)} finished matches from matches.bin.")
+    # rewrite the results so that a line cut off by an interruption is dropped
+    with open(results_path, "w") as fp:
+        for result in results.values():
+            fp.write(json.dumps(result) + "\n")
+    pending = [match for match in matches if not match["match_id"] in results]
+    print(
+        f"{len(matches)} matches, {len(matches) - len(pending)} already played, "
+        f"running {len(pending)} on {args.workers} workers."
+    )
+
+    pool = ProcessPoolExecutor(args.workers)
+    try:
+        with open(results_path, "a") as fp:
+            futures = [
+                pool.submit(
+                    run_match,
+                    match,
+                    play_directory,
+                    tournament_dir,
+                    args.player_processes,
+                    args.json,
+                )
+                for match in pending
+            ]
+            for done, future in enumerate(as_completed(futures), 1):
+                result = future.result()
+                results[result["match_id"]] = result
+                fp.write(json.dumps(result) + "\n")
+                fp.flush()
+                print(
+                    f"[{done}/{len(pending)}] {result['player_a']} vs {result['player_b']} "
+                    f"(seed {result['seed']}): {result['winner']}"
+                )
+    except KeyboardInterrupt:
+        pool.shutdown(wait=False, cancel_futures=True)
+        print("Interrupted, run the same command again to resume.")
+        sys.exit(1)
+    pool.shutdown()
+
+    print()
+    print_summary(agents, matches, results)
+
+
+if __name__ == "__main__":
+    main()
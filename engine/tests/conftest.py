@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the engine's modules are imported as top-level packages, e.g. `from game import board`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,133 @@
+import numpy as np
+
+from game.batch_board import NONE, BatchBoard
+from game.board import Board
+from game.board_buffer import board_values
+from game.enums import Result, ResultArbiter, WinReason
+from game.game_map import GameMap
+from game.trapdoor_manager import TrapdoorManager
+
+"""
+Randomized differential tests of BatchBoard: random games are played on Boards
+and on a BatchBoard side by side, checking after every turn that valid moves,
+applied moves, trapdoors, timeouts, win checking and conversion in both
+directions agree. Some games are given little time and some moves are invalid,
+so that every way a game ends is reached.
+"""
+
+SEED = 0
+NUM_GAMES = 200
+TIME_TO_PLAY = 0.5
+
+
+def assert_same(batch, board, i, message):
+    assert board_values(board, include_hash=False) == board_values(
+        batch.to_board(i), include_hash=False
+    ), message
+
+
+def make_boards(game_map, seeds):
+    boards = []
+    trapdoors = []
+    for game_seed in seeds:
+        trapdoor_manager = TrapdoorManager(game_map, game_seed)
+        board = Board(game_map, TIME_TO_PLAY)
+        spawns = trapdoor_manager.choose_spawns()
+        trapdoors.append(trapdoor_manager.choose_trapdoors())
+        board.chicken_player.start(spawns[0], 0)
+        board.chicken_enemy.start(spawns[1], 1)
+        boards.append(board)
+    return boards, trapdoors
+
+
+def choose_moves(rng, batch, boards):
+    """
+    Checks every unfinished game against its Board and picks its next move,
+    mostly a random valid one and now and then a random code.
+    """
+    valid = {enemy: batch.get_valid_moves(enemy) for enemy in (False, True)}
+    moves = np.full(len(boards), -1, dtype=np.int64)
+    for i, board in enumerate(boards):
+        if board.is_game_over():
+            assert batch.winner[i] != NONE, "winner mismatch"
+            continue
+        assert_same(batch, board, i, "state mismatch")
+        assert_same(batch, BatchBoard.from_boards([board]).to_board(0), i, "conversion mismatch")
+        for enemy in (False, True):
+            assert np.flatnonzero(valid[enemy][i]).tolist() == board.get_valid_moves_encoded(
+                enemy
+            ), "valid moves mismatch"
+        codes = board.get_valid_moves_encoded()
+        if codes and rng.random() < 0.998:
+            moves[i] = codes[rng.integers(len(codes))]
+        else:
+            moves[i] = rng.integers(12)
+    return moves
+
+
+def apply_turn(board, move, timer, trapdoors):
+    """
+    Plays a move on a Board as gameplay.apply_turn and the turn loop of
+    gameplay.play_game do.
+
+    Returns:
+        (Tuple[bool, bool]): Whether the move was valid and whether it landed
+        the chicken on a trapdoor.
+    """
+    dir, move_type = divmod(move, 3)
+    valid_move = board.apply_move(dir, move_type, timer=timer)
+    if not valid_move:
+        board.set_winner(Result.ENEMY, WinReason.INVALID_TURN)
+        board.is_as_turn = not board.is_as_turn
+    elif board.player_time <= 0:
+        board.set_winner(Result.ENEMY, WinReason.TIMEOUT)
+    new_loc = board.chicken_player.get_location()
+    triggered = new_loc in trapdoors
+    if triggered:
+        board.apply_trapdoor(new_loc)
+    if not board.is_game_over():
+        board.reverse_perspective()
+    return valid_move, triggered
+
+
+def test_random_games():
+    rng = np.random.default_rng(SEED)
+    game_map = GameMap()
+    seeds = range(SEED, SEED + NUM_GAMES)
+    batch, trapdoor_cells = BatchBoard.from_seeds(game_map, seeds, TIME_TO_PLAY)
+    boards, trapdoors = make_boards(game_map, seeds)
+
+    while not batch.is_game_over().all():
+        moves = choose_moves(rng, batch, boards)
+        # mostly short moves, with a slow one now and then to reach timeouts
+        timers = np.where(rng.random(NUM_GAMES) < 0.02, 0.3, 0.001) * rng.random(NUM_GAMES)
+        applied, triggered = batch.step(moves, trapdoor_cells, timers)
+
+        for i, board in enumerate(boards):
+            if board.is_game_over():
+                continue
+            valid_move, on_trapdoor = apply_turn(
+                board, int(moves[i]), float(timers[i]), trapdoors[i]
+            )
+            assert valid_move == applied[i], "applied move mismatch"
+            assert on_trapdoor == triggered[i], "trapdoor mismatch"
+            assert_same(batch, board, i, "turn mismatch")
+
+    results = batch.get_results()
+    reasons = set()
+    for i, board in enumerate(boards):
+        assert_same(batch, board, i, "final state mismatch")
+        if board.is_as_turn:
+            expected = {Result.PLAYER: ResultArbiter.PLAYER_B, Result.ENEMY: ResultArbiter.PLAYER_A}
+        else:
+            expected = {Result.PLAYER: ResultArbiter.PLAYER_A, Result.ENEMY: ResultArbiter.PLAYER_B}
+        assert results[i] == expected.get(board.winner, ResultArbiter.TIE), "result mismatch"
+        reasons.add(board.win_reason)
+
+    # the games are only a useful test if they end in every way a game can end
+    assert reasons >= {
+        WinReason.EGGS_LAID,
+        WinReason.BLOCKING_END,
+        WinReason.TIMEOUT,
+        WinReason.INVALID_TURN,
+    }
@@ -0,0 +1,71 @@
+import random
+
+import numpy as np
+import pytest
+
+from game import fastcore
+from game.board import Board
+from game.game_map import GameMap
+from game.trapdoor_manager import TrapdoorManager
+
+"""
+Plays random games on a Board and on a fastcore state array side by side and
+checks after every step that move validity, valid moves, applied moves,
+trapdoors, win checking and conversion in both directions agree.
+"""
+
+NUM_GAMES = 100
+
+
+def assert_same_moves(state, board):
+    moves = np.empty(12, dtype=np.int64)
+    for enemy in (False, True):
+        for dir in range(4):
+            for move_type in range(3):
+                assert fastcore.is_valid_move(
+                    state, dir, move_type, enemy
+                ) == board.is_valid_move(dir, move_type, enemy), "validity mismatch"
+        count = fastcore.get_valid_moves(state, enemy, moves)
+        assert list(moves[:count]) == board.get_valid_moves_encoded(
+            enemy
+        ), "valid moves mismatch"
+
+
+@pytest.mark.parametrize("seed", range(NUM_GAMES))
+def test_random_game(seed):
+    rng = random.Random(seed)
+    game_map = GameMap()
+    trapdoor_manager = TrapdoorManager(game_map, seed)
+    board = Board(game_map, 360)
+    spawns = trapdoor_manager.choose_spawns()
+    trapdoors = trapdoor_manager.choose_trapdoors()
+    board.chicken_player.start(spawns[0], 0)
+    board.chicken_enemy.start(spawns[1], 1)
+    state = fastcore.board_to_state(board)
+
+    while not board.is_game_over():
+        assert np.array_equal(state, fastcore.board_to_state(board)), "state mismatch"
+        assert np.array_equal(
+            fastcore.board_to_state(fastcore.state_to_board(state, game_map)), state
+        ), "conversion mismatch"
+        assert_same_moves(state, board)
+
+        valid_moves = board.get_valid_moves()
+        if not valid_moves:
+            break
+        dir, move_type = valid_moves[rng.randrange(len(valid_moves))]
+        board.apply_move(dir, move_type, timer=0.01)
+        fastcore.apply_move(
+            state, int(dir), int(move_type), fastcore.NS_PER_SECOND // 100, True
+        )
+
+        new_loc = board.chicken_player.get_location()
+        if new_loc in trapdoors:
+            board.apply_trapdoor(new_loc)
+            fastcore.apply_trapdoor(state, new_loc[1] * game_map.MAP_SIZE + new_loc[0])
+
+        if not board.is_game_over():
+            board.reverse_perspective()
+            fastcore.reverse_perspective(state)
+
+    assert np.array_equal(state, fastcore.board_to_state(board)), "final state mismatch"